@@ -4,31 +4,53 @@ Clean, simple structure with specialized tools
 """
 
 import logging
+import time
+
+_module_start = time.perf_counter()
+
 from google.adk.agents import Agent
 from google.adk.tools import FunctionTool
 
-from app.config_simple import MODEL_CONFIG
+from app.config_simple import MODEL_CONFIG, STARTUP_CONFIG
 from app.prompt_simple import DDV_AGENT_INSTRUCTION
 from app.tools.search import search_products
 from app.tools.explore import explore_product
 from app.tools.compare import compare_products
+from app.tools.rank import rank_products
+from app.tools.similar import find_similar_products
+from app.tools.meilisearch_simple import warmup_search_engine
+from app.tools.diagnostics import instrument_tool
+from app.tracing import tracing_callbacks
 
 logger = logging.getLogger(__name__)
+logger.info(f"⏱️ Agent imports loaded in {(time.perf_counter() - _module_start) * 1000:.0f}ms")
 
 # Simple DDV Product Advisor Agent following personalized_shopping pattern
 ddv_simple_agent = Agent(
     model=MODEL_CONFIG["primary_model"],
     name="ddv_simple_advisor",
     instruction=DDV_AGENT_INSTRUCTION,
+    # instrument_tool is a no-op unless DDV_DIAGNOSTICS=1
     tools=[
-        search_products,
-        explore_product,
-        compare_products
+        instrument_tool(search_products),
+        instrument_tool(explore_product),
+        instrument_tool(compare_products),
+        instrument_tool(rank_products),
+        instrument_tool(find_similar_products)
     ],
-    output_key="product_simple_agent"
+    output_key="product_simple_agent",
+    # Turn/model/tool spans when DDV_TRACING=1
+    **tracing_callbacks()
 )
 
 # This is required for ADK web UI to find the agent
 root_agent = ddv_simple_agent
 
-logger.info("✅ Simple DDV Product Advisor Agent initialized")
+# Build the search engine and its indexes before the first request arrives
+if STARTUP_CONFIG["warmup"]:
+    try:
+        warmup_search_engine()
+    except Exception as e:
+        logger.error(f"❌ Search engine warmup failed: {e}")
+
+logger.info(f"✅ Simple DDV Product Advisor Agent initialized in {(time.perf_counter() - _module_start) * 1000:.0f}ms")
@@ -19,6 +19,20 @@ MEILISEARCH_CONFIG = {
     "timeout": 30
 }
 
+# Full-text backend behind the search engine: "meilisearch", "sqlite" (embedded FTS5) or "local"
+SEARCH_BACKEND_CONFIG = {
+    "backend": os.getenv("DDV_SEARCH_BACKEND", "meilisearch"),
+    "sqlite_path": Path(os.getenv("DDV_SQLITE_PATH", PROJECT_ROOT / "ddv.sqlite3"))  # python -m app.tools.sqlite_search
+}
+
+# Admission control for backend searches; shed requests are answered locally (app/tools/admission.py)
+ADMISSION_CONFIG = {
+    "max_concurrent": int(os.getenv("DDV_BACKEND_CONCURRENCY", "8")),  # backend searches in flight per process
+    "max_queue": int(os.getenv("DDV_BACKEND_QUEUE", "16")),            # requests allowed to wait for a slot
+    "queue_timeout": 0.25,                                             # seconds to wait before shedding
+    "page_cache_size": 256                                             # backend pages kept to answer shed requests
+}
+
 # Model configuration
 MODEL_CONFIG = {
     "primary_model": "gemini-2.0-flash",
@@ -34,10 +48,239 @@ SEARCH_CONFIG = {
         "price.current:asc",
         "price.current:desc", 
         "reviews.average_rating:desc",
+        "price.discount_percentage:desc",
+        "specs_numeric.battery_mah:desc",
+        "specs_numeric.camera_mp:desc",
+        "specs_numeric.promo_discount:desc",
+        "specs_numeric.effective_price:asc",
         "name:asc"
     ]
 }
 
+# Local vector index configuration (hashed char n-gram TF-IDF)
+VECTOR_CONFIG = {
+    "enabled": True,
+    "dim": 2 ** 16,
+    "ngram_range": (2, 3),
+    "min_score": 0.15,
+    "top_k": 20,
+    "posting_budget": 20000,  # Postings scored exhaustively per query
+    "max_budget_scale": 3,    # Filtered queries may read up to this many times the budget
+    "rerank_candidates": 128,
+    "rrf_k": 60  # Reciprocal rank fusion constant
+}
+
+# Typeahead suggestions for the chat input (app/tools/suggest_index.py, GET /suggest in app/server.py)
+SUGGEST_CONFIG = {
+    "enabled": True,
+    "limit": 8,                  # suggestions returned by default
+    "max_limit": 20,
+    "cached_prefix_chars": 2,    # prefixes this short have their top suggestions precomputed
+    "max_words": 6               # trailing words of the input tried as the prefix being typed
+}
+
+# API server (app/server.py); DDV_ALLOW_ORIGINS is a comma-separated list, "*" allows any origin
+SERVER_CONFIG = {
+    "allow_origins": [
+        origin.strip()
+        for origin in os.getenv("DDV_ALLOW_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",")
+        if origin.strip()
+    ],
+}
+
+# Product entity extraction (alias automaton)
+ENTITY_CONFIG = {
+    "enabled": True,
+    # Words users usually leave out when naming a model
+    "optional_phrases": ["apple", "samsung", "galaxy", "5g", "4g"],
+    # Normalized phrase -> common abbreviations
+    "phrase_aliases": {
+        "iphone": ["ip"],
+        "pro max": ["pm", "promax", "prm"],
+        "plus": ["pl"]
+    },
+    "brand_aliases": {
+        "Apple": ["apple", "iphone", "ip", "tao"],
+        "Samsung": ["samsung", "sam sung", "ss", "galaxy"]
+    },
+    # Tokens that end the model part of a product name
+    "name_stop_tokens": ["chinh", "vn", "bhdt"],
+    "storage_values_gb": [32, 64, 128, 256, 512, 1024, 2048]
+}
+
+# Local facet configuration
+FACET_CONFIG = {
+    # (min, max exclusive, label) in VND
+    "price_buckets": [
+        (0, 5_000_000, "Dưới 5 triệu"),
+        (5_000_000, 10_000_000, "5 - 10 triệu"),
+        (10_000_000, 15_000_000, "10 - 15 triệu"),
+        (15_000_000, 20_000_000, "15 - 20 triệu"),
+        (20_000_000, 30_000_000, "20 - 30 triệu"),
+        (30_000_000, None, "Trên 30 triệu")
+    ]
+}
+
+# Search result pagination
+PAGINATION_CONFIG = {
+    "cache_size": 64,              # ranked local result lists kept for "show more"
+    "state_key": "search_cursor"   # tool_context.state key holding the next-page cursor
+}
+
+# Comparison and best-value ranking over the spec matrix (app/tools/spec_matrix.py)
+COMPARE_CONFIG = {
+    "max_products": 10,
+    # Default "best value" weights per spec; users' priorities override them
+    "value_weights": {
+        "price": 0.3,
+        "rating": 0.2,
+        "battery_mah": 0.1,
+        "camera_mp": 0.1,
+        "storage_gb": 0.1,
+        "ram_gb": 0.1,
+        "discount": 0.05,
+        "refresh_hz": 0.05
+    },
+    "rank_limit": 5,
+    "max_rank_limit": 20
+}
+
+# "Similar products" neighbor lists, computed when the catalog is indexed (app/tools/similar_index.py)
+SIMILAR_CONFIG = {
+    "enabled": True,
+    "neighbors": 24,         # stored per product; query-time filters pick from these
+    "price_band": 2.0,       # neighbors cost between 1/2x and 2x the product
+    "brand_penalty": 0.15,   # added distance for another brand
+    # Spec matrix fields and their weight in the distance (discount changes with promotions, so it is left out)
+    "feature_weights": {
+        "price": 2.0,
+        "rating": 0.5,
+        "battery_mah": 1.0,
+        "ram_gb": 1.0,
+        "storage_gb": 1.0,
+        "camera_mp": 1.0,
+        "screen_inch": 1.0,
+        "refresh_hz": 1.0
+    },
+    "default_limit": 5,
+    "max_limit": 10
+}
+
+# Session working set of recently shown products
+WORKING_SET_CONFIG = {
+    "state_key": "working_set",
+    "max_items": 20
+}
+
+# Tool output: full cards for the frontend, compact summary for the model
+OUTPUT_CONFIG = {
+    "mode": "dual",                        # "dual" or "full" (one JSON blob for both)
+    "display_state_key": "product_display",  # state key the frontend reads from stateDelta
+    "token_budget": 600,                   # max estimated tokens of tool output sent to the model
+    "chars_per_token": 3.5,                # estimate for Vietnamese JSON text
+    "max_field_chars": 60
+}
+
+# Startup: prebuilt index snapshot and eager warmup
+STARTUP_CONFIG = {
+    "snapshot_file": DATA_DIR / "catalog_snapshot.pkl",  # written by index_products.py
+    "warmup": os.getenv("DDV_WARMUP", "1") != "0",       # build the engine when the agent module loads
+    "warmup_queries": ["iphone 16 pro max", "samsung galaxy"]
+}
+
+# Catalog shared by all worker processes through an mmap'd store
+SHARED_CATALOG_CONFIG = {
+    "enabled": os.getenv("DDV_SHARED_CATALOG", "0") == "1",  # attach instead of loading per process
+    "directory": DATA_DIR / "catalog_store",                 # written by python -m app.tools.shared_catalog
+    "keep_generations": 2
+}
+
+# Swap in a new catalog when merged_products.json (or the shared store's CURRENT) changes
+RELOAD_CONFIG = {
+    "enabled": os.getenv("DDV_HOT_RELOAD", "1") != "0",
+    "poll_interval": 2.0                                     # seconds; a change is confirmed on the next poll
+}
+
+# Opt-in tool timing, event-loop lag and slow-step stack dumps (app/tools/diagnostics.py)
+DIAGNOSTICS_CONFIG = {
+    "enabled": os.getenv("DDV_DIAGNOSTICS", "0") == "1",
+    "slow_step_ms": float(os.getenv("DDV_SLOW_STEP_MS", "100")),  # log the stack of a tool step holding the loop this long
+    "lag_interval": 0.5,                                         # seconds between event-loop lag samples
+    "watchdog_interval": 0.05,                                   # seconds between checks for slow steps
+    "report_interval": 60.0                                      # seconds between logged summaries
+}
+
+# Per-turn spans (agent, model, tools, engine) appended to a JSONL file; render with trace_report.py
+TRACING_CONFIG = {
+    "enabled": os.getenv("DDV_TRACING", "0") == "1",
+    "file": Path(os.getenv("DDV_TRACE_FILE", PROJECT_ROOT / "logs" / "traces.jsonl")),
+    "flush_every": 64                                            # spans buffered before a write; turns flush on end
+}
+
+# Every engine search appended to a rotating NDJSON log for replay_queries.py (app/tools/query_log.py)
+QUERY_LOG_CONFIG = {
+    "enabled": os.getenv("DDV_QUERY_LOG", "0") == "1",
+    "file": Path(os.getenv("DDV_QUERY_LOG_FILE", PROJECT_ROOT / "logs" / "queries.ndjson")),
+    "max_bytes": 64 * 1024 * 1024,                               # rotate to queries.ndjson.1 beyond this
+    "backups": 5,                                                # rotated files kept
+    "flush_interval": 1.0,                                       # seconds the writer waits for a batch
+    "max_pending": 10000                                         # queued records before new ones are dropped
+}
+
+# Materialized search_products payloads for frequent plain queries (app/tools/head_queries.py)
+HEAD_QUERY_CONFIG = {
+    "enabled": os.getenv("DDV_HEAD_QUERIES", "1") != "0",
+    "file": DATA_DIR / "head_queries.json",                     # written by index_products.py
+    "queries_file": DATA_DIR / "head_queries.txt",              # optional, one query per line
+    "queries": [
+        "iphone", "samsung", "iphone 16", "iphone 16 pro", "iphone 16 pro max", "iphone 16e",
+        "samsung galaxy", "galaxy s25 ultra", "galaxy z fold7", "galaxy z flip7", "galaxy a56",
+        "điện thoại", "điện thoại giá rẻ"
+    ],
+    "mine_top": 300,                                             # most frequent plain queries taken from the query log
+    "limits": [5, 10]                                            # page sizes materialized per query
+}
+
+# Individual reviews folded into running per-product aggregates (app/tools/reviews.py)
+REVIEW_CONFIG = {
+    "enabled": os.getenv("DDV_REVIEWS", "1") != "0",
+    "file": DATA_DIR / "reviews.json",
+    "state_file": DATA_DIR / "review_aggregates.pkl",           # so a restart only applies new and edited reviews
+    "half_life_days": 90,                                        # recency-weighted rating: a review this much older counts half
+    "snippets": 3,                                               # most helpful comments kept per product
+    "snippet_chars": 160
+}
+
+# Validation and normalization of merged_products.json before indexing (app/tools/catalog_validation.py)
+VALIDATION_CONFIG = {
+    "quarantine_file": DATA_DIR / "quarantine.ndjson",           # rejected records with their errors
+    "workers": int(os.getenv("DDV_VALIDATION_WORKERS", "0")),    # processes for large catalogs; 0 = every core
+    "chunk_size": 5000                                           # products per pool task
+}
+
+# Compressed random-access copy of the validated catalog (app/tools/catalog_blocks.py), written by index_products.py
+CATALOG_BLOCKS_CONFIG = {
+    "enabled": os.getenv("DDV_CATALOG_BLOCKS", "1") != "0",     # load_catalog reads fresh blocks instead of the JSON
+    "file": DATA_DIR / "merged_products.blocks",                 # index in merged_products.blocks.idx
+    "codec": os.getenv("DDV_CATALOG_CODEC", "zstd"),             # "zstd" (needs zstandard) or "gzip"
+    "zstd_level": 9,
+    "gzip_level": 6,
+    "block_bytes": 64 * 1024                                     # uncompressed NDJSON per block
+}
+
+# Store regions for region-scoped search (app/tools/regions.py)
+REGION_CONFIG = {
+    "stores_file": DATA_DIR / "stores.json",                     # store name -> region and city
+    "in_stock_statuses": ["con hang"],                           # normalized branch stock_status prefixes
+    # Region -> other ways customers name it (cities in stores.json map to their region too)
+    "aliases": {
+        "Hồ Chí Minh": ["hcm", "tphcm", "tp hcm", "sai gon", "saigon", "sg"],
+        "Hà Nội": ["hn", "hanoi", "thu do"],
+        "Đà Nẵng": ["danang"],
+        "Bà Rịa - Vũng Tàu": ["brvt", "vung tau"]
+    }
+}
+
 # Logging configuration
 LOGGING_CONFIG = {
     "level": "INFO",
@@ -0,0 +1,46 @@
+"""
+API Server for DDV Product Advisor
+The ADK agent API plus a typeahead endpoint for the chat input
+
+    GET /suggest?q=so sánh ip 16 p&k=8
+    {"query", "replace_words", "suggestions": [{"text", "kind", "id", "price"}, ...], "index_version", "ms"}
+
+replace_words is how many trailing words of q a picked suggestion replaces.
+Lookups run on the event loop: they are sub-millisecond prefix searches in the
+engine's in-memory catalog (app/tools/suggest_index.py), so a thread hop would
+cost more than the work.
+
+Usage: uvicorn app.server:app --host 0.0.0.0 --port 8000  (make dev-server)
+CORS origins come from SERVER_CONFIG (DDV_ALLOW_ORIGINS).
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Query
+from google.adk.cli.fast_api import get_fast_api_app
+
+from app.config_simple import PROJECT_ROOT, SERVER_CONFIG, SUGGEST_CONFIG
+from app.tools.meilisearch_simple import SimpleMeilisearchEngine, warmup_search_engine
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the catalog before the first keystroke arrives
+    await asyncio.to_thread(warmup_search_engine)
+    yield
+
+
+# The agents directory is the project root, so the agent is served as "app" (/apps/app/...)
+app = get_fast_api_app(agents_dir=str(PROJECT_ROOT), web=False, allow_origins=SERVER_CONFIG["allow_origins"],
+                       lifespan=lifespan)
+
+
+@app.get("/suggest")
+async def suggest(q: str = Query("", max_length=200), k: int = Query(SUGGEST_CONFIG["limit"], ge=1)):
+    """Completions for the word(s) being typed at the end of q"""
+    result = SimpleMeilisearchEngine().suggest(q, min(k, SUGGEST_CONFIG["max_limit"]))
+    return {"query": q, **result}
@@ -4,20 +4,32 @@ Clean, simple tools for product search and exploration
 """
 
 # Simple search engine
-from .meilisearch_simple import SimpleMeilisearchEngine
+from .meilisearch_simple import SimpleMeilisearchEngine, warmup_search_engine
+
+# Opt-in tool diagnostics
+from .diagnostics import instrument_tool, diagnostics_report
 
 # Simple tools
 from .search import search_products
 from .explore import explore_product
 from .compare import compare_products
+from .rank import rank_products
+from .similar import find_similar_products
 
 # Export all tools and classes
 __all__ = [
     # Search engine
     "SimpleMeilisearchEngine",
+    "warmup_search_engine",
+    
+    # Diagnostics
+    "instrument_tool",
+    "diagnostics_report",
     
     # Tools
     "search_products",
     "explore_product", 
     "compare_products",
+    "rank_products",
+    "find_similar_products",
 ]
\ No newline at end of file
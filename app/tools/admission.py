@@ -0,0 +1,109 @@
+"""
+Admission Control for DDV Product Advisor
+Bounded concurrency for full-text backend calls, with load shedding
+
+At most max_concurrent backend searches run at once. Further requests wait
+in a bounded queue for up to queue_timeout seconds; when the queue is full
+or the wait times out the request is shed, and the engine answers it from a
+cached backend page or the local indexes instead. A burst then costs some
+ranking quality rather than piling onto the server until every session
+times out together.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """Semaphore with a bounded, time-limited wait queue and queue-time metrics"""
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.Semaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.queue_ms = deque(maxlen=1024)   # waits of admitted requests that queued
+        self._shedding = False
+
+    def _acquire(self) -> Optional[str]:
+        """Take a slot; None when admitted, else why the request was shed"""
+        if self._slots.acquire(blocking=False):
+            with self._lock:
+                self.admitted += 1
+                self.in_flight += 1
+                self._shedding = False
+            return None
+
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.shed_queue_full += 1
+                return self._shed("queue_full")
+            self.waiting += 1
+            self.queued += 1
+
+        start = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        waited = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.waiting -= 1
+            if not acquired:
+                self.shed_timeout += 1
+                return self._shed("timeout")
+            self.admitted += 1
+            self.in_flight += 1
+            self.queue_ms.append(waited)
+        return None
+
+    def _shed(self, reason: str) -> str:
+        # Called with the lock held; log once per overload episode, not per request
+        if not self._shedding:
+            self._shedding = True
+            logger.warning(f"🚦 Backend saturated ({self.in_flight} in flight, {self.waiting} queued), "
+                           f"shedding to local search ({reason})")
+        return reason
+
+    @contextmanager
+    def admit(self):
+        """Yields None when admitted (the slot is released on exit), else the shed reason"""
+        shed = self._acquire()
+        if shed:
+            yield shed
+            return
+        try:
+            yield None
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self.queue_ms)
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "shed_queue_full": self.shed_queue_full,
+                "shed_timeout": self.shed_timeout,
+                "queue_ms": {
+                    "p50": round(waits[len(waits) // 2], 1) if waits else 0.0,
+                    "p95": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))], 1) if waits else 0.0,
+                    "max": round(waits[-1], 1) if waits else 0.0,
+                },
+            }
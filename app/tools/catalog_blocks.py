@@ -0,0 +1,279 @@
+"""
+Block Catalog for DDV Product Advisor
+Compressed, random-access copy of the validated catalog
+
+The products are written as NDJSON cut into blocks of about block_bytes.
+Each block is compressed on its own, as a zstd frame or a gzip member. The
+blocks are concatenated, so `zstdcat`/`zcat` still stream the whole file.
+A sidecar index is written next to it:
+    one JSON header line  {"format", "codec", "fingerprint", "products", "blocks", "keys", "data_bytes"}
+    block_offsets   int64[blocks + 1]   byte range of each block in the data file
+    block_rows      int64[blocks + 1]   first product row of each block
+    key_hashes      uint64[keys]        sorted 64-bit hashes of every id and SKU
+    key_rows        int64[keys]         product row for each hash
+Both files are memory-mapped. A lookup is one searchsorted over key_hashes
+plus one block decompress, and it checks the decoded id, so hash collisions
+cost an extra block read rather than a wrong product. A full scan streams
+one block at a time.
+
+fingerprint is the source_fingerprint of the merged_products.json the blocks
+were built from; load_catalog reads the blocks instead of re-parsing and
+re-validating the JSON while they match.
+
+This is a storage format. The engine still decodes every block at startup:
+its CatalogIndex needs all products to build the search indexes and layers
+review aggregates over them, so explore and find_product keep answering from
+memory. BlockCatalog.get is for the CLI and offline tools that need a few
+products without loading the whole catalog.
+
+Usage: python -m app.tools.catalog_blocks [products.json] [product_id]
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+from app.config_simple import CATALOG_BLOCKS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Bump when the data or index layout changes
+BLOCKS_FORMAT = 1
+
+
+def _gzip_compress(data: bytes) -> bytes:
+    compressor = zlib.compressobj(CATALOG_BLOCKS_CONFIG["gzip_level"], zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _codecs() -> Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    """codec name -> (compress, decompress) for the codecs installed here"""
+    codecs = {"gzip": (_gzip_compress, lambda data: zlib.decompress(data, 31))}
+    if ZSTD_AVAILABLE:
+        compressor = zstandard.ZstdCompressor(level=CATALOG_BLOCKS_CONFIG["zstd_level"])
+        # Decompressors are not thread-safe; one per call is cheap next to a block
+        codecs["zstd"] = (compressor.compress, lambda data: zstandard.ZstdDecompressor().decompress(data))
+    return codecs
+
+
+def key_hash(key: str) -> int:
+    """64-bit hash of a product id or SKU, as stored in key_hashes"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def index_path(path: Path) -> Path:
+    return Path(path).with_name(Path(path).name + ".idx")
+
+
+def write_catalog_blocks(products: Sequence[Dict[str, Any]], path: Path, fingerprint: Optional[str],
+                         codec: Optional[str] = None, block_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """Write the data file and its index, replacing any previous pair; returns the index header
+
+    An unavailable codec falls back to gzip.
+    """
+    path = Path(path)
+    codecs = _codecs()
+    codec = codec or CATALOG_BLOCKS_CONFIG["codec"]
+    if codec not in codecs:
+        logger.warning(f"Codec {codec} is not available (pip install zstandard), using gzip")
+        codec = "gzip"
+    compress = codecs[codec][0]
+    block_bytes = block_bytes or CATALOG_BLOCKS_CONFIG["block_bytes"]
+
+    block_offsets, block_rows = [0], [0]
+    keys: Dict[str, int] = {}
+    tmp_path = path.with_name(path.name + ".tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        lines: List[bytes] = []
+        size = 0
+        for row, product in enumerate(products):
+            line = json.dumps(product, ensure_ascii=False).encode("utf-8") + b"\n"
+            lines.append(line)
+            size += len(line)
+            for key in (product.get("id"), product.get("sku")):
+                if isinstance(key, str) and key:
+                    keys.setdefault(key, row)
+            if size >= block_bytes or row == len(products) - 1:
+                block_offsets.append(block_offsets[-1] + f.write(compress(b"".join(lines))))
+                block_rows.append(row + 1)
+                lines, size = [], 0
+
+    hashes = np.fromiter((key_hash(key) for key in keys), dtype=np.uint64, count=len(keys))
+    rows = np.fromiter(keys.values(), dtype=np.int64, count=len(keys))
+    order = np.argsort(hashes, kind="stable")
+    header = {
+        "format": BLOCKS_FORMAT, "codec": codec, "fingerprint": fingerprint, "products": len(products),
+        "blocks": len(block_offsets) - 1, "keys": len(keys), "data_bytes": block_offsets[-1],
+    }
+    encoded = json.dumps(header).encode("utf-8") + b"\n"
+    # Pad the header so the arrays that follow are 8-byte aligned in the mapping
+    encoded += b" " * (-len(encoded) % 8)
+
+    tmp_index = index_path(path).with_name(index_path(path).name + ".tmp")
+    with open(tmp_index, "wb") as f:
+        f.write(encoded)
+        for array in (np.asarray(block_offsets, dtype=np.int64), np.asarray(block_rows, dtype=np.int64),
+                      hashes[order], rows[order]):
+            f.write(array.tobytes())
+    # Data first: a reader that opens the new data with the old index sees a
+    # data_bytes mismatch and falls back to the JSON
+    os.replace(tmp_path, path)
+    os.replace(tmp_index, index_path(path))
+    return header
+
+
+class BlockCatalog:
+    """Read-only view of a block catalog through mmap"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(index_path(self.path), "rb") as f:
+            self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_end = self._index_map.find(b"\n") + 1
+        self.header = json.loads(self._index_map[:header_end])
+        if self.header.get("format") != BLOCKS_FORMAT:
+            raise ValueError(f"{self.path.name} has format {self.header.get('format')}")
+        codecs = _codecs()
+        if self.header["codec"] not in codecs:
+            raise ValueError(f"{self.path.name} needs codec {self.header['codec']} (pip install zstandard)")
+        self._decompress = codecs[self.header["codec"]][1]
+
+        blocks, keys = self.header["blocks"], self.header["keys"]
+        offset = header_end + (-header_end % 8)
+        arrays = []
+        for dtype, count in ((np.int64, blocks + 1), (np.int64, blocks + 1), (np.uint64, keys), (np.int64, keys)):
+            arrays.append(np.frombuffer(self._index_map, dtype=dtype, count=count, offset=offset))
+            offset += count * 8
+        self.block_offsets, self.block_rows, self.key_hashes, self.key_rows = arrays
+
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size != self.header["data_bytes"]:
+                raise ValueError(f"{self.path.name} does not match its index")
+            # An empty file cannot be mapped
+            self._data_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.header["data_bytes"] else b""
+
+    def __len__(self):
+        return self.header["products"]
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        return self.header.get("fingerprint")
+
+    def _lines(self, number: int) -> List[bytes]:
+        start, end = int(self.block_offsets[number]), int(self.block_offsets[number + 1])
+        return self._decompress(self._data_map[start:end]).splitlines()
+
+    def block(self, number: int) -> List[Dict[str, Any]]:
+        """Every product of one block"""
+        return [json.loads(line) for line in self._lines(number)]
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        number = int(np.searchsorted(self.block_rows, row, side="right")) - 1
+        return json.loads(self._lines(number)[row - int(self.block_rows[number])])
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The product with this id or SKU, from one block decompress"""
+        if not isinstance(key, str) or not key:
+            return None
+        target = np.uint64(key_hash(key))
+        lo = int(np.searchsorted(self.key_hashes, target, side="left"))
+        hi = int(np.searchsorted(self.key_hashes, target, side="right"))
+        for row in self.key_rows[lo:hi]:
+            product = self[int(row)]
+            if key in (product.get("id"), product.get("sku")):
+                return product
+        return None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Stream the products block by block"""
+        for number in range(self.header["blocks"]):
+            yield from self.block(number)
+
+    def close(self):
+        # The arrays are views of the index mapping, which cannot close while they exist
+        self.block_offsets = self.block_rows = self.key_hashes = self.key_rows = None
+        if isinstance(self._data_map, mmap.mmap):
+            self._data_map.close()
+        self._index_map.close()
+
+
+def open_blocks(path: Path, fingerprint: Optional[str] = None) -> Optional[BlockCatalog]:
+    """The block catalog at path, if it is readable and (given a fingerprint) built from that source"""
+    path = Path(path)
+    if not path.exists() or not index_path(path).exists():
+        return None
+    try:
+        blocks = BlockCatalog(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not open block catalog {path}: {e}")
+        return None
+    if fingerprint is not None and blocks.fingerprint != fingerprint:
+        logger.info(f"Block catalog {path.name} is stale, reading the JSON catalog")
+        blocks.close()
+        return None
+    return blocks
+
+
+def main():
+    """Build the block catalog from merged_products.json and report sizes and read timings"""
+    from app.config_simple import MERGED_PRODUCTS_FILE
+    from app.tools.catalog_snapshot import source_fingerprint
+    from app.tools.catalog_validation import load_catalog
+
+    logging.basicConfig(level=logging.INFO)
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else MERGED_PRODUCTS_FILE
+    product_id = sys.argv[2] if len(sys.argv) > 2 else None
+    path = CATALOG_BLOCKS_CONFIG["file"]
+
+    start = time.perf_counter()
+    with open(source, "r", encoding="utf-8") as f:
+        json.load(f)
+    parse_ms = (time.perf_counter() - start) * 1000
+    products = load_catalog(source)
+
+    start = time.perf_counter()
+    header = write_catalog_blocks(products, path, source_fingerprint(source))
+    print(f"✅ Wrote {header['products']} products in {header['blocks']} {header['codec']} blocks to {path} "
+          f"({(time.perf_counter() - start) * 1000:.0f}ms)")
+    json_bytes = source.stat().st_size
+    block_bytes = path.stat().st_size + index_path(path).stat().st_size
+    print(f"📦 {json_bytes / 1024:.0f} KB JSON -> {block_bytes / 1024:.0f} KB blocks + index "
+          f"({block_bytes / max(json_bytes, 1):.1%})")
+
+    blocks = BlockCatalog(path)
+    start = time.perf_counter()
+    count = sum(1 for _ in blocks)
+    print(f"⏱️ Full scan: {count} products in {(time.perf_counter() - start) * 1000:.1f}ms "
+          f"(JSON parse alone: {parse_ms:.1f}ms)")
+    product_id = product_id or (products[len(products) // 2]["id"] if products else None)
+    if product_id:
+        start = time.perf_counter()
+        product = blocks.get(product_id)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"🔎 get({product_id!r}): {'found ' + product['name'] if product else 'not found'} in {elapsed:.2f}ms")
+    blocks.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Local Catalog Index for DDV Product Advisor
+In-memory indexes built once per catalog load
+"""
+
+import copy
+import logging
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+from app.config_simple import VECTOR_CONFIG, ENTITY_CONFIG, SIMILAR_CONFIG, SUGGEST_CONFIG
+from app.tools.columnar import IdHashIndex, ProductOverlay, SearchText
+from app.tools.entity_matcher import ProductEntityMatcher
+from app.tools.filter_index import BitmapFilterIndex
+from app.tools.similar_index import SimilarityIndex
+from app.tools.spec_matrix import SpecMatrix
+from app.tools.specs import numeric_specs
+from app.tools.suggest_index import SuggestIndex
+from app.tools.vector_index import CharNgramVectorIndex
+
+logger = logging.getLogger(__name__)
+
+# Substring match score per field kind: name, brand, each spec string
+LEXICAL_WEIGHTS = (10, 8, 3)
+
+# Spec fields that go into the fuzzy-match document
+VECTOR_SPEC_FIELDS = ["chipset", "storage", "ram", "os"]
+
+
+def product_document(product: Dict[str, Any]) -> str:
+    """Build the text used for fuzzy matching: name, brand and key specs"""
+    specs = product.get("specs", {}) or {}
+    parts = [product.get("name", ""), product.get("brand", "")]
+    parts.extend(specs.get(field, "") for field in VECTOR_SPEC_FIELDS)
+    return " ".join(part for part in parts if isinstance(part, str) and part)
+
+
+class CatalogIndex:
+    """Products plus the local indexes built over them"""
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.products = products
+        id_rows = {}
+        for row, product in enumerate(products):
+            if product.get("sku"):
+                id_rows.setdefault(product["sku"], row)
+            id_rows[product.get("id")] = row
+        self.id_index = IdHashIndex({key: row for key, row in id_rows.items() if isinstance(key, str)})
+        self.search_text = SearchText(products)
+
+        self.vector_index = None
+        if VECTOR_CONFIG["enabled"] and products:
+            self.vector_index = CharNgramVectorIndex([product_document(p) for p in products])
+
+        self.entity_matcher = None
+        if ENTITY_CONFIG["enabled"] and products:
+            self.entity_matcher = ProductEntityMatcher(products)
+
+        self.filter_index = BitmapFilterIndex(products)
+        self.spec_matrix = SpecMatrix(self.filter_index.columns)
+
+        self.similar_index = None
+        if SIMILAR_CONFIG["enabled"] and products:
+            self.similar_index = SimilarityIndex(
+                self.spec_matrix, products, SIMILAR_CONFIG["neighbors"], SIMILAR_CONFIG["price_band"],
+                SIMILAR_CONFIG["brand_penalty"], SIMILAR_CONFIG["feature_weights"]
+            )
+
+        self.suggest_index = None
+        if SUGGEST_CONFIG["enabled"] and products:
+            self.suggest_index = SuggestIndex(
+                products, SUGGEST_CONFIG["max_limit"], SUGGEST_CONFIG["cached_prefix_chars"]
+            )
+
+    def __len__(self):
+        return len(self.products)
+
+    def with_products(self, updated: Dict[int, Dict[str, Any]]) -> "CatalogIndex":
+        """Copy with some rows' products replaced, for numeric updates such as ratings
+
+        Numeric columns and the spec matrix follow the new values; the text,
+        vector, entity, neighbor and suggestion indexes are shared with this
+        catalog, so the replacements must keep their ids, names and specs text
+        (suggestion popularity catches up on the next reload). Products are
+        an overlay on this catalog's, so a shared ProductStore stays shared.
+        """
+        catalog = copy.copy(self)
+        if updated:
+            catalog.products = ProductOverlay(self.products, dict(updated))
+            catalog.filter_index = self.filter_index.with_numeric_rows(
+                {row: numeric_specs(product) for row, product in updated.items()}
+            )
+            catalog.spec_matrix = SpecMatrix(catalog.filter_index.columns)
+        return catalog
+
+    def row_of(self, product_id: str) -> Optional[int]:
+        """Row number of a product id, or None"""
+        return self.id_index.get(product_id)
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Product by id or SKU"""
+        row = self.id_index.get(product_id)
+        return self.products[row] if row is not None else None
+
+    def mentioned_products(self, query: str) -> List[Dict[str, Any]]:
+        """Products of the single model named in the query, or [] if none/ambiguous"""
+        if not self.entity_matcher:
+            return []
+        extraction = self.entity_matcher.extract(query)
+        if not extraction.unambiguous:
+            return []
+        products = [self.get(product_id) for product_id in extraction.mentions[0].product_ids]
+        return [product for product in products if product is not None]
+
+    def filter_mask(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Bitmap of rows matching the filters"""
+        return self.filter_index.evaluate(filters)
+
+    def lexical_scores(self, query: str, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Per-row score of the name, brand and specs containing the query; 0 outside mask"""
+        scores = self.search_text.scores(query, LEXICAL_WEIGHTS, len(self.products))
+        if mask is not None:
+            scores[~mask] = 0
+        return scores
+
+    def lexical_rows(self, query: str, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rows of the lexical matches, best score first (ties in row order)"""
+        scores = self.lexical_scores(query, mask)
+        rows = np.flatnonzero(scores)
+        return rows[np.argsort(-scores[rows], kind="stable")]
+    
+    def vector_rows(self, query: str, top_k: int = None, mask: Optional[np.ndarray] = None) -> List[int]:
+        """Rows of the fuzzy matches over the n-gram vectors, best first, restricted to mask if given"""
+        if not self.vector_index or not query.strip():
+            return []
+        return [row for row, _ in self.vector_index.query(query, top_k or VECTOR_CONFIG["top_k"], mask=mask)]
+
+    def vector_search(self, query: str, top_k: int = None, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Fuzzy search over the n-gram vectors, restricted to mask if given"""
+        return [self.products[row] for row in self.vector_rows(query, top_k, mask)]
+
+    def match_mask(self, query: str, mask: np.ndarray) -> np.ndarray:
+        """Rows within mask that the query matches lexically or fuzzily"""
+        if not query.strip():
+            return mask
+        matched = self.lexical_scores(query, mask) > 0
+        matched[self.vector_rows(query, mask=mask)] = True
+        return matched & mask
+
+def fuse_rows(lexical: np.ndarray, semantic: Sequence[int]) -> np.ndarray:
+    """fuse_results over row numbers, vectorized for rankings that span the catalog"""
+    rrf_k = VECTOR_CONFIG["rrf_k"]
+    rows = np.concatenate([np.asarray(lexical, dtype=np.int64), np.asarray(semantic, dtype=np.int64)])
+    if len(rows) == 0:
+        return rows
+    ranks = np.concatenate([np.arange(len(lexical)), np.arange(len(semantic))])
+    unique, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    scores = np.bincount(inverse, weights=1.0 / (rrf_k + ranks + 1), minlength=len(unique))
+    # Ties keep the order rows were first seen in, as fuse_results does
+    return unique[np.lexsort((first, -scores))]
+
+
+def fuse_results(lexical: List[Dict[str, Any]], semantic: List[Dict[str, Any]], limit: Optional[int]) -> List[Dict[str, Any]]:
+    """Merge two ranked hit lists with reciprocal rank fusion (limit None keeps all)"""
+    rrf_k = VECTOR_CONFIG["rrf_k"]
+    scores: Dict[str, float] = {}
+    hits: Dict[str, Dict[str, Any]] = {}
+
+    for ranked in (lexical, semantic):
+        for rank, product in enumerate(ranked):
+            product_id = product.get("id")
+            scores[product_id] = scores.get(product_id, 0.0) + 1.0 / (rrf_k + rank + 1)
+            # Keep the lexical hit (may carry backend fields such as _formatted)
+            hits.setdefault(product_id, product)
+
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [hits[product_id] for product_id in ordered[:limit]]
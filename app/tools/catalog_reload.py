@@ -0,0 +1,93 @@
+"""
+Catalog Hot Reload for DDV Product Advisor
+Generations of the loaded catalog and a watcher that swaps in new ones
+
+The engine holds exactly one CatalogGeneration and replaces it with a single
+assignment, so a request that took a reference to the old generation finishes
+on it while new requests see the new one (copy-on-write, nothing is mutated).
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.tools.catalog_index import CatalogIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CatalogGeneration:
+    """One loaded catalog and where it came from"""
+    catalog: Optional[CatalogIndex]
+    index_version: Optional[str]  # cursors and working sets are tied to this
+    generation: int
+    source: str                   # "shared", "snapshot", "json" or "empty"
+    marker: Optional[str] = None  # what the watcher compares against
+    load_ms: float = 0.0
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def products(self) -> List[Dict[str, Any]]:
+        return self.catalog.products if self.catalog else []
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "index_version": self.index_version,
+            "source": self.source,
+            "products": len(self.products),
+            "load_ms": round(self.load_ms, 1),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at)),
+        }
+
+
+class CatalogWatcher:
+    """Polls a source marker and calls reload when it changes
+
+    A new marker must be seen on two consecutive polls before reloading, so a
+    products file that is still being written is not picked up half-way.
+    """
+
+    def __init__(self, probe: Callable[[], Optional[str]], reload: Callable[[], bool],
+                 marker: Optional[str], interval: float, name: str = "catalog"):
+        self.probe = probe
+        self.reload = reload
+        self.marker = marker
+        self.interval = interval
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"✅ Watching {self.name} source every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        pending = None
+        while not self._stop.wait(self.interval):
+            try:
+                marker = self.probe()
+            except Exception as e:
+                logger.warning(f"{self.name.capitalize()} watcher probe failed: {e}")
+                continue
+
+            if marker is None or marker == self.marker:
+                pending = None
+                continue
+            if marker != pending:
+                pending = marker
+                continue
+
+            # A failed reload is not retried until the source changes again
+            self.marker = marker
+            pending = None
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"❌ {self.name.capitalize()} reload failed: {e}")
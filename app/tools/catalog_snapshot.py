@@ -0,0 +1,132 @@
+"""
+Catalog Snapshot for DDV Product Advisor
+Prebuilt CatalogIndex written by index_products.py so workers start without rebuilding
+
+One file, memory-mapped on load:
+    arrays    every NumPy array, pickled out-of-band, 64-byte aligned
+    stream    pickle of the CatalogIndex object graph, products packed as a ProductStore
+    header    JSON: format, source fingerprint, stream and buffer offsets
+    trailer   header length, 8 bytes little-endian
+
+Loading reads the header from the end of the file, so a stale snapshot is
+rejected without unpickling anything, and the arrays become read-only views
+of the mapping instead of being copied. Only the small Python objects
+(token vocabulary, facet labels, automaton tables) are rebuilt, and products
+are JSON-decoded on access. With 100k synthetic products the file is about
+1.2GB, most of it product JSON, and loads in a few milliseconds; pages are
+read from disk as queries touch them.
+"""
+
+import copy
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import time
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+from app.tools.catalog_index import CatalogIndex
+from app.tools.columnar import ProductStore
+
+logger = logging.getLogger(__name__)
+
+# Bump when CatalogIndex's attributes or the file layout change so old snapshots are rebuilt
+SNAPSHOT_FORMAT = 11
+ALIGNMENT = 64
+TRAILER = struct.Struct("<Q")
+
+
+def source_fingerprint(path: Path) -> Optional[str]:
+    """Size and mtime of the products file; identifies the catalog a snapshot was built from"""
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def pack_catalog(catalog: CatalogIndex) -> Tuple[bytes, List[pickle.PickleBuffer]]:
+    """Pickle stream of the catalog and its out-of-band array buffers
+
+    Products travel as one packed JSON column instead of millions of small objects.
+    """
+    packed = copy.copy(catalog)
+    if not isinstance(packed.products, ProductStore):
+        packed.products = ProductStore(catalog.products)
+    buffers: List[pickle.PickleBuffer] = []
+    stream = pickle.dumps(packed, protocol=5, buffer_callback=buffers.append)
+    return stream, buffers
+
+
+def write_buffers(f: BinaryIO, buffers: List[pickle.PickleBuffer]) -> List[Tuple[int, int]]:
+    """Write buffers ALIGNMENT-aligned from the start of f: (offset, length) of each"""
+    layout = []
+    offset = f.tell()
+    for buffer in buffers:
+        raw = buffer.raw()
+        padding = -offset % ALIGNMENT
+        f.write(b"\0" * padding)
+        offset += padding
+        f.write(raw)
+        layout.append((offset, raw.nbytes))
+        offset += raw.nbytes
+    return layout
+
+
+def save_snapshot(catalog: CatalogIndex, path: Path, fingerprint: str):
+    """Write the catalog and its indexes, replacing any previous snapshot atomically"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    stream, buffers = pack_catalog(catalog)
+    with open(tmp_path, "wb") as f:
+        layout = write_buffers(f, buffers)
+        stream_offset = f.tell()
+        f.write(stream)
+        header = json.dumps({
+            "format": SNAPSHOT_FORMAT,
+            "fingerprint": fingerprint,
+            "products": len(catalog),
+            "stream": [stream_offset, len(stream)],
+            "buffers": layout,
+        }).encode("utf-8")
+        f.write(header)
+        f.write(TRAILER.pack(len(header)))
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: Path, fingerprint: Optional[str]) -> Optional[CatalogIndex]:
+    """The snapshotted catalog if it was built from the current products file, else None
+
+    Snapshots are pickles written by our own indexer; never point this at untrusted files.
+    """
+    path = Path(path)
+    if fingerprint is None or not path.exists():
+        return None
+
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        (length,) = TRAILER.unpack(data[-TRAILER.size:])
+        header = json.loads(bytes(data[-TRAILER.size - length:-TRAILER.size]))
+    except Exception as e:
+        logger.warning(f"Could not read catalog snapshot {path}: {e}")
+        return None
+
+    if header.get("format") != SNAPSHOT_FORMAT or header.get("fingerprint") != fingerprint:
+        logger.info(f"Catalog snapshot {path.name} is stale, rebuilding indexes")
+        return None
+
+    try:
+        offset, length = header["stream"]
+        buffers = [data[at:at + size] for at, size in header["buffers"]]
+        catalog = pickle.loads(data[offset:offset + length], buffers=buffers)
+    except Exception as e:
+        logger.warning(f"Could not read catalog snapshot {path}: {e}")
+        return None
+
+    logger.info(f"✅ Loaded catalog snapshot: {len(catalog)} products in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return catalog
@@ -0,0 +1,492 @@
+"""
+Catalog Validation for DDV Product Advisor
+Validates and normalizes merged_products.json before anything is indexed
+
+Every record is validated against compiled pydantic models that coerce what
+the crawler gets wrong into the shape the tools read:
+    "29.690.000đ" prices become ints, "15%" discounts floats, None or
+    malformed specs/display/battery/reviews/promotions sections their
+    defaults, stray numbers in text fields strings, and single strings in
+    list fields one-item lists
+Records that cannot be repaired (no price, a current price that is not a
+positive amount, no id or name, a duplicate id) are rejected and written with their errors to
+a quarantine NDJSON file; everything else keeps its unmodelled fields.
+
+Large catalogs are validated in chunks on a process pool. Per-field
+statistics (missing, coerced, rejected) are reported for every run.
+
+Usage: python -m app.tools.catalog_validation [products.json] [workers]
+"""
+
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Annotated, Any, Dict, Iterator, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+from pydantic import (
+    AfterValidator, BeforeValidator, ConfigDict, Field, TypeAdapter, ValidationError, ValidatorFunctionWrapHandler,
+    WrapValidator
+)
+from typing_extensions import NotRequired, TypedDict, is_typeddict
+
+from app.config_simple import VALIDATION_CONFIG, CATALOG_BLOCKS_CONFIG
+from app.tools.catalog_blocks import open_blocks
+from app.tools.catalog_snapshot import source_fingerprint
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+_DIGITS = re.compile(r"\D")
+
+
+def _money(value: Any) -> Any:
+    """VND amount as an int: 29690000, 29690000.0 and "29.690.000đ" all give 29690000"""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        return round(value) if math.isfinite(value) else None
+    if isinstance(value, str):
+        # Prices have no fractional part, so dots and commas are thousands separators
+        digits = _DIGITS.sub("", value)
+        return int(digits) if digits else None
+    return value
+
+
+def _optional_money(value: Any) -> Optional[int]:
+    value = _money(value)
+    return value if isinstance(value, int) and not isinstance(value, bool) and value > 0 else None
+
+
+def _number(value: Any) -> Optional[Union[int, float]]:
+    """First number in a value ("15%", "4,5"), or None; ints stay ints"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value if math.isfinite(value) else None
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            number = float(match.group().replace(",", "."))
+            return int(number) if number.is_integer() else number
+    return None
+
+
+def _count(value: Any) -> int:
+    number = _number(value)
+    return max(0, int(number)) if number is not None else 0
+
+
+def _text(value: Any) -> Any:
+    # Strings are stripped and numbers stringified by the compiled validator
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, list):
+        return ", ".join(_clean_list(value))
+    return ""
+
+
+def _clean_list(value: Any) -> List[str]:
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    items = (item for item in value if isinstance(item, (str, int, float)) and not isinstance(item, bool))
+    return [text for text in (str(item).strip() for item in items) if text]
+
+
+def _text_list(value: Any, handler: ValidatorFunctionWrapHandler) -> List[str]:
+    # Well-formed lists are validated natively; only bad ones pay for the Python cleanup
+    if isinstance(value, list):
+        try:
+            return handler(value)
+        except ValidationError:
+            pass
+    return handler(_clean_list(value))
+
+
+def _flag(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1", "có")
+    return bool(value)
+
+
+def _identifier(value: Any) -> Any:
+    if isinstance(value, (str, int)) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+def _section(value: Any) -> Dict[str, Any]:
+    """A nested object; anything else is treated as absent"""
+    return value if isinstance(value, dict) else {}
+
+
+def _price(value: Any) -> Any:
+    # A bare amount is the current price; anything else but an object is a missing price
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return {"current": value}
+    return _section(value)
+
+
+def _battery(value: Any) -> Dict[str, Any]:
+    # Some listings give the battery as a bare "5000 mAh"
+    if isinstance(value, str):
+        return {"capacity": value}
+    return _section(value)
+
+
+def _fill_price(price: Dict[str, Any]) -> Dict[str, Any]:
+    for key in ("original", "trade_in_price"):
+        if price.get(key) is None:
+            price.pop(key, None)
+    if not price["currency"]:
+        price["currency"] = "VND"
+    discount = price.get("discount_percentage")
+    if discount is None or not 0 <= discount <= 100:
+        original = price.get("original")
+        if original and original > price["current"]:
+            price["discount_percentage"] = round((1 - price["current"] / original) * 100, 2)
+        else:
+            price["discount_percentage"] = 0
+    return price
+
+
+def _clamp_rating(reviews: Dict[str, Any]) -> Dict[str, Any]:
+    if reviews["max_rating"] <= 0:
+        reviews["max_rating"] = 5
+    rating = reviews["average_rating"]
+    if rating is None or not 0 <= rating <= reviews["max_rating"]:
+        reviews["average_rating"], reviews["rating_count"] = 0.0, 0
+    return reviews
+
+
+def _section_of(schema: type, before=_section, after=None) -> Any:
+    """A nested TypedDict that defaults to (and fills) its own defaults when absent or malformed"""
+    validators = (BeforeValidator(before),) + ((AfterValidator(after),) if after else ())
+    # Built as a tuple: star-unpacking inside a subscript needs Python 3.11
+    metadata = (schema, Field(default_factory=dict, validate_default=True)) + validators
+    return Annotated[metadata]
+
+
+def _default(annotation: Any, value: Any) -> Any:
+    # A factory for lists, so pydantic does not deep-copy a shared default per record
+    field = Field(default_factory=list) if value == [] else Field(default=value)
+    return Annotated[annotation, field]
+
+
+Money = Annotated[int, BeforeValidator(_money), Field(gt=0)]
+OptionalMoney = Annotated[Optional[int], BeforeValidator(_optional_money)]
+Number = Annotated[Optional[Union[int, float]], BeforeValidator(_number)]
+Count = Annotated[int, BeforeValidator(_count)]
+Text = Annotated[str, BeforeValidator(_text)]
+TextList = Annotated[List[str], WrapValidator(_text_list)]
+Identifier = Annotated[str, BeforeValidator(_identifier), Field(min_length=1)]
+RequiredText = Annotated[str, BeforeValidator(_text), Field(min_length=1)]
+Flag = Annotated[bool, BeforeValidator(_flag)]
+
+# Unmodelled fields (store_info, warranty_policy, ...) pass through untouched, and
+# validation returns plain dicts, so nothing has to be dumped afterwards
+_CONFIG = ConfigDict(extra="allow", str_strip_whitespace=True, coerce_numbers_to_str=True)
+
+
+class Price(TypedDict):
+    __pydantic_config__ = _CONFIG
+    current: Money
+    original: NotRequired[OptionalMoney]
+    trade_in_price: NotRequired[OptionalMoney]
+    currency: _default(Text, "VND")
+    discount_percentage: NotRequired[Number]
+
+
+class Display(TypedDict):
+    __pydantic_config__ = _CONFIG
+    size: _default(Text, "")
+    technology: _default(Text, "")
+    resolution: _default(Text, "")
+    refresh_rate: _default(Text, "")
+    brightness: _default(Text, "")
+    features: _default(TextList, [])
+
+
+class Battery(TypedDict):
+    __pydantic_config__ = _CONFIG
+    capacity: _default(Text, "")
+    wired_charging: _default(Text, "")
+    wireless_charging: _default(Text, "")
+
+
+class Specs(TypedDict):
+    __pydantic_config__ = _CONFIG
+    display: _section_of(Display)
+    battery: _section_of(Battery, before=_battery)
+    camera_main: _default(Text, "")
+    camera_front: _default(Text, "")
+    camera_features: _default(TextList, [])
+    os: _default(Text, "")
+    chipset: _default(Text, "")
+    ram: _default(Text, "")
+    storage: _default(Text, "")
+
+
+class Reviews(TypedDict):
+    __pydantic_config__ = _CONFIG
+    average_rating: _default(Number, 0.0)
+    max_rating: _default(Count, 5)
+    rating_count: _default(Count, 0)
+
+
+class Promotions(TypedDict):
+    __pydantic_config__ = _CONFIG
+    free_gifts: _default(TextList, [])
+    vouchers: _default(TextList, [])
+    special_discounts: _default(TextList, [])
+    bundle_offers: _default(TextList, [])
+
+
+class InstallmentOptions(TypedDict):
+    __pydantic_config__ = _CONFIG
+    available: _default(Flag, False)
+    details: _default(Text, "")
+
+
+class Product(TypedDict):
+    __pydantic_config__ = _CONFIG
+    id: Identifier
+    name: RequiredText
+    brand: _default(Text, "")
+    category: _default(Text, "phone")
+    url: _default(Text, "")
+    images: _default(TextList, [])
+    availability: _default(Text, "unknown")
+    price: Annotated[Price, BeforeValidator(_price), AfterValidator(_fill_price)]
+    promotions: _section_of(Promotions)
+    installment_options: _section_of(InstallmentOptions)
+    specs: _section_of(Specs)
+    reviews: _section_of(Reviews, after=_clamp_rating)
+    colors: _default(TextList, [])
+    storage_options: _default(TextList, [])
+
+
+_validate = TypeAdapter(Product).validate_python
+
+
+def _field_tree(schema: type, prefix: str = "") -> List[Tuple[str, str, Any]]:
+    """(key, dotted field name, subtree or None) for every modelled field, for the per-field statistics"""
+    tree = []
+    for key, annotation in get_type_hints(schema, include_extras=True).items():
+        while get_origin(annotation) in (Annotated, NotRequired):
+            annotation = get_args(annotation)[0]
+        name = prefix + key
+        tree.append((key, name, _field_tree(annotation, name + ".") if is_typeddict(annotation) else None))
+    return tree
+
+
+def _leaf_names(tree: List[Tuple[str, str, Any]]) -> Iterator[str]:
+    for _, name, subtree in tree:
+        if subtree is None:
+            yield name
+        else:
+            yield from _leaf_names(subtree)
+
+
+_FIELD_TREE = _field_tree(Product)
+TRACKED_FIELDS = list(_leaf_names(_FIELD_TREE))
+
+
+def _tally(raw: Any, normalized: Dict[str, Any], tree: List[Tuple[str, str, Any]], stats: Counter):
+    """Count the fields a record was missing and those validation had to change"""
+    for key, name, subtree in tree:
+        value = raw.get(key) if isinstance(raw, dict) else None
+        if subtree is not None:
+            _tally(value, normalized[key], subtree, stats)
+        elif value is None:
+            stats[(name, "missing")] += 1
+        elif value != normalized.get(key):
+            stats[(name, "coerced")] += 1
+
+
+def _field_name(location: Tuple[Any, ...]) -> str:
+    # Drop list indices and the function-validator steps pydantic adds to error locations
+    return ".".join(str(part) for part in location if isinstance(part, str) and not part.startswith("function-"))
+
+
+def validate_records(records: List[Any], start: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Counter]:
+    """Validate one chunk; returns normalized products, rejects and per-field counts
+
+    Counter keys are (field, "missing" | "coerced" | "rejected"); start is the
+    chunk's offset in the catalog, so rejects carry their original position.
+    """
+    products: List[Dict[str, Any]] = []
+    rejects: List[Dict[str, Any]] = []
+    stats: Counter = Counter()
+    for index, record in enumerate(records, start):
+        try:
+            normalized = _validate(record)
+        except ValidationError as e:
+            errors = [{"field": _field_name(error["loc"]), "type": error["type"], "message": error["msg"]}
+                      for error in e.errors(include_url=False, include_input=False)]
+            for error in errors:
+                stats[(error["field"] or "record", "rejected")] += 1
+            rejects.append({"index": index, "id": record.get("id") if isinstance(record, dict) else None,
+                            "errors": errors, "record": record})
+            continue
+
+        _tally(record, normalized, _FIELD_TREE, stats)
+        products.append(normalized)
+    return products, rejects, stats
+
+
+class ValidationReport:
+    """Outcome of validating a whole catalog"""
+
+    def __init__(self, products: List[Dict[str, Any]], rejects: List[Dict[str, Any]], stats: Counter,
+                 total: int, elapsed: float, workers: int):
+        self.products = products
+        self.rejects = rejects
+        self.stats = stats
+        self.total = total
+        self.elapsed = elapsed
+        self.workers = workers
+
+    def field_rows(self) -> List[Tuple[str, int, int, int]]:
+        """(field, missing, coerced, rejected) for every field that needed attention"""
+        fields = list(TRACKED_FIELDS) + sorted({field for field, _ in self.stats} - set(TRACKED_FIELDS))
+        rows = [(field, self.stats[(field, "missing")], self.stats[(field, "coerced")], self.stats[(field, "rejected")])
+                for field in fields]
+        return [row for row in rows if any(row[1:])]
+
+    def summary(self) -> str:
+        return (f"{len(self.products)}/{self.total} products valid, {len(self.rejects)} quarantined "
+                f"in {self.elapsed:.2f}s on {self.workers} worker(s)")
+
+
+def _pool_context():
+    # Forked workers inherit the compiled models instead of re-importing the app
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def validate_catalog(records: List[Any], workers: Optional[int] = None,
+                     chunk_size: Optional[int] = None) -> ValidationReport:
+    """Validate and normalize a catalog, on a process pool when it spans several chunks
+
+    workers 0/None means every core. Ids must be unique across the catalog, so
+    later duplicates are rejected after the chunks are merged.
+    """
+    start = time.perf_counter()
+    workers = workers or VALIDATION_CONFIG["workers"] or os.cpu_count() or 1
+    chunk_size = chunk_size or VALIDATION_CONFIG["chunk_size"]
+    chunks = [(records[offset:offset + chunk_size], offset) for offset in range(0, len(records), chunk_size)]
+
+    if workers > 1 and len(chunks) > 1:
+        workers = min(workers, len(chunks))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+            results = list(pool.map(validate_records, *zip(*chunks)))
+    else:
+        workers = 1
+        results = [validate_records(chunk, offset) for chunk, offset in chunks]
+
+    products: List[Dict[str, Any]] = []
+    rejects: List[Dict[str, Any]] = []
+    stats: Counter = Counter()
+    for chunk_products, chunk_rejects, chunk_stats in results:
+        products.extend(chunk_products)
+        rejects.extend(chunk_rejects)
+        stats.update(chunk_stats)
+
+    seen = set()
+    unique = []
+    for product in products:
+        if product["id"] in seen:
+            stats[("id", "rejected")] += 1
+            rejects.append({"index": None, "id": product["id"],
+                            "errors": [{"field": "id", "type": "duplicate", "message": "Duplicate product id"}],
+                            "record": product})
+            continue
+        seen.add(product["id"])
+        unique.append(product)
+
+    return ValidationReport(unique, rejects, stats, len(records), time.perf_counter() - start, workers)
+
+
+def write_quarantine(rejects: List[Dict[str, Any]], path: Path):
+    """One rejected record per line with its errors; replaces the previous run's file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for reject in rejects:
+            f.write(json.dumps(reject, ensure_ascii=False, default=str) + "\n")
+    os.replace(tmp_path, path)
+
+
+def load_catalog(path: Path, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Read a products file and return only its validated, normalized products
+
+    Rejects go to the configured quarantine file. This is how every index
+    build reads merged_products.json, so the tools can rely on the model shape.
+    While the block catalog was built from this file, its already-validated
+    products are streamed from there instead of parsing the whole JSON; every
+    block is still decoded, since the indexes are built over all products.
+    """
+    fingerprint = source_fingerprint(path)
+    if CATALOG_BLOCKS_CONFIG["enabled"] and fingerprint:
+        blocks = open_blocks(CATALOG_BLOCKS_CONFIG["file"], fingerprint)
+        if blocks is not None:
+            start = time.perf_counter()
+            products = list(blocks)
+            blocks.close()
+            logger.info(f"✅ Read {len(products)} validated products from {CATALOG_BLOCKS_CONFIG['file'].name} "
+                        f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+            return products
+
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    if not isinstance(records, list):
+        raise ValueError(f"{path} does not hold a list of products")
+
+    report = validate_catalog(records, workers)
+    if report.rejects:
+        write_quarantine(report.rejects, VALIDATION_CONFIG["quarantine_file"])
+        logger.warning(f"⚠️ Quarantined {len(report.rejects)} invalid products to {VALIDATION_CONFIG['quarantine_file']}")
+    logger.info(f"✅ Validated catalog: {report.summary()}")
+    return report.products
+
+
+def main():
+    """Validate merged_products.json and print per-field statistics"""
+    from app.config_simple import MERGED_PRODUCTS_FILE
+
+    logging.basicConfig(level=logging.INFO)
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else MERGED_PRODUCTS_FILE
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    report = validate_catalog(records, workers)
+    print(f"🔎 {path}: {report.summary()}")
+    rows = report.field_rows()
+    if rows:
+        print(f"\n{'field':<36} {'missing':>8} {'coerced':>8} {'rejected':>9}")
+        for field, missing, coerced, rejected in rows:
+            print(f"{field:<36} {missing:>8} {coerced:>8} {rejected:>9}")
+
+    quarantine_file = VALIDATION_CONFIG["quarantine_file"]
+    write_quarantine(report.rejects, quarantine_file)
+    if report.rejects:
+        print(f"\n⚠️ {len(report.rejects)} products quarantined to {quarantine_file}")
+    else:
+        print("\n✅ No products rejected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Columnar Catalog Storage for DDV Product Advisor
+Products, IDs and match text packed into flat NumPy arrays
+
+Flat arrays pickle out-of-band, so a published catalog can be memory-mapped
+by every worker instead of each one holding its own copy of the dicts.
+"""
+
+import json
+import re
+import zlib
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Separates the fields of one product in SearchText
+FIELD_SEPARATOR = "\x1f"
+
+
+class PackedBytes:
+    """A list of byte strings stored as one uint8 array plus offsets"""
+
+    def __init__(self, items: Sequence[bytes]):
+        lengths = np.fromiter((len(item) for item in items), dtype=np.int64, count=len(items))
+        self.offsets = np.zeros(len(items) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.data = np.frombuffer(b"".join(items), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def get(self, index: int) -> bytes:
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes()
+
+
+class ProductStore:
+    """Read-only product sequence; each product is JSON-decoded on access"""
+
+    def __init__(self, products: Sequence[Dict[str, Any]]):
+        self.packed = PackedBytes([json.dumps(p, ensure_ascii=False).encode("utf-8") for p in products])
+
+    def __len__(self):
+        return len(self.packed)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return json.loads(self.packed.get(row))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self)):
+            yield self[row]
+
+
+class ProductOverlay:
+    """Product sequence with some rows replaced; the base sequence is shared, not copied
+
+    Lets a catalog swap a few products (review updates) without decoding a
+    shared ProductStore into per-process dicts.
+    """
+
+    def __init__(self, base: Sequence[Dict[str, Any]], replacements: Dict[int, Dict[str, Any]]):
+        # Overlays of overlays flatten, so a lookup is at most one dict probe plus the base
+        if isinstance(base, ProductOverlay):
+            replacements = {**base.replacements, **replacements}
+            base = base.base
+        self.base = base
+        self.replacements = replacements
+
+    def __len__(self):
+        return len(self.base)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        product = self.replacements.get(row)
+        return self.base[row] if product is None else product
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self)):
+            yield self[row]
+
+
+class IdHashIndex:
+    """Open-addressing hash table from product id/SKU to row, held in flat arrays"""
+
+    def __init__(self, mapping: Dict[str, int]):
+        keys = list(mapping)
+        self.keys = PackedBytes([key.encode("utf-8") for key in keys])
+        self.rows = np.fromiter(mapping.values(), dtype=np.int32, count=len(keys))
+
+        # Power-of-two table at most half full, linear probing
+        size = 1
+        while size < 2 * max(len(keys), 1):
+            size *= 2
+        self.mask = size - 1
+        self.table = np.full(size, -1, dtype=np.int32)
+        for slot_value, key in enumerate(keys):
+            slot = zlib.crc32(key.encode("utf-8")) & self.mask
+            while self.table[slot] != -1:
+                slot = (slot + 1) & self.mask
+            self.table[slot] = slot_value
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, key: Any, default: Optional[int] = None) -> Optional[int]:
+        if not isinstance(key, str):
+            return default
+        encoded = key.encode("utf-8")
+        slot = zlib.crc32(encoded) & self.mask
+        while True:
+            index = int(self.table[slot])
+            if index == -1:
+                return default
+            if self.keys.get(index) == encoded:
+                return int(self.rows[index])
+            slot = (slot + 1) & self.mask
+
+
+class SearchText:
+    """Lowercased name, brand and spec strings of every product in one byte array
+
+    Substring search runs as a single regex scan over the array instead of a
+    Python loop over product dicts; hits are mapped back to (row, field kind).
+    Each distinct string is stored once (spec values such as "iOS 18" repeat
+    across thousands of products), so a scan reads little more than the names.
+    """
+
+    NAME, BRAND, SPEC = 0, 1, 2
+
+    def __init__(self, products: Sequence[Dict[str, Any]]):
+        texts: Dict[str, int] = {}
+        text_ids: List[int] = []
+        rows: List[int] = []
+        kinds: List[int] = []
+        for row, product in enumerate(products):
+            values = [(self.NAME, product.get("name", "")), (self.BRAND, product.get("brand", ""))]
+            specs = product.get("specs", {}) or {}
+            values.extend((self.SPEC, value) for value in specs.values() if isinstance(value, str))
+            for kind, value in values:
+                text = (value or "").lower().replace(FIELD_SEPARATOR, " ")
+                text_ids.append(texts.setdefault(text, len(texts)))
+                rows.append(row)
+                kinds.append(kind)
+
+        packed = PackedBytes([(text + FIELD_SEPARATOR).encode("utf-8") for text in texts])
+        self.data = packed.data
+        self.starts = packed.offsets
+        # Fields (row, kind) grouped by distinct text: text t owns fields[field_ptr[t]:field_ptr[t + 1]]
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.kinds = np.asarray(kinds, dtype=np.uint8)
+        text_ids = np.asarray(text_ids, dtype=np.int32)
+        self.fields = np.argsort(text_ids, kind="stable").astype(np.int32)
+        self.field_ptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(text_ids, minlength=len(texts)), out=self.field_ptr[1:])
+
+    def matched_fields(self, query: str) -> np.ndarray:
+        """Indices of the fields that contain the lowercased query"""
+        if not query:
+            return np.arange(len(self.rows))
+        pattern = re.compile(re.escape(query.lower().encode("utf-8")))
+        positions = np.fromiter((match.start() for match in pattern.finditer(self.data)), dtype=np.int64)
+        # Several hits inside one text count once
+        matched = np.unique(np.searchsorted(self.starts, positions, side="right") - 1)
+        starts, ends = self.field_ptr[matched], self.field_ptr[matched + 1]
+        lengths = ends - starts
+        positions = np.repeat(starts - (lengths.cumsum() - lengths), lengths) + np.arange(lengths.sum())
+        return self.fields[positions]
+
+    def scores(self, query: str, weights: Tuple[int, int, int], size: int) -> np.ndarray:
+        """Per-row sum of weights[kind] over the fields that contain the query"""
+        fields = self.matched_fields(query)
+        kind_weights = np.asarray(weights, dtype=np.float64)
+        return np.bincount(self.rows[fields], weights=kind_weights[self.kinds[fields]], minlength=size)
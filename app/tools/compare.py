@@ -4,18 +4,30 @@ Product comparison functionality
 """
 
 from google.adk.tools import ToolContext
+import asyncio
 import logging
-import json
-from typing import List
+from typing import List, Optional
+
+from app.config_simple import COMPARE_CONFIG
+from app.tools.meilisearch_simple import SimpleMeilisearchEngine
+from app.tools.spec_matrix import DIMENSIONS
+from app.tools.formatting import product_card, render_tool_output
+from app.tools.working_set import remember_products, resolve_reference
+from app.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
-async def compare_products(product_ids: List[str], tool_context: ToolContext) -> str:
+async def compare_products(product_ids: List[str], tool_context: ToolContext, weights: Optional[dict] = None) -> str:
     """Compare multiple products side by side.
     
     Args:
-        product_ids (list): List of product IDs to compare
+        product_ids (list): List of product IDs, names, or references to products shown
+            earlier in this session (e.g. ["cái thứ 1", "cái thứ 3"])
         tool_context (ToolContext): The function context
+        weights (dict, optional): How much the user cares about each spec for the "best value"
+            pick (e.g. {"battery_mah": 3, "price": 1}). Keys: price, discount, rating,
+            battery_mah, ram_gb, storage_gb, camera_mp, screen_inch, refresh_hz,
+            effective_price, promo_discount, trade_in_bonus, installment_zero
         
     Returns:
         str: Comparison results
@@ -26,154 +38,63 @@ async def compare_products(product_ids: List[str], tool_context: ToolContext) ->
         if len(product_ids) < 2:
             return "Cần ít nhất 2 sản phẩm để so sánh"
         
-        if len(product_ids) > 5:
-            return "Chỉ có thể so sánh tối đa 5 sản phẩm cùng lúc"
-        
-        # Import Simple Meilisearch engine
-        from app.tools.meilisearch_simple import SimpleMeilisearchEngine
+        if len(product_ids) > COMPARE_CONFIG["max_products"]:
+            return f"Chỉ có thể so sánh tối đa {COMPARE_CONFIG['max_products']} sản phẩm cùng lúc"
         
-        # Get singleton instance
+        # Get singleton instance (built at startup by warmup_search_engine)
         search_engine = SimpleMeilisearchEngine()
         
         # Get product details for each ID
         products = []
-        for product_id in product_ids:
-            search_results = search_engine.search(product_id, limit=1)
-            if search_results:
-                products.append(search_results[0])
+        with tracer.span("engine.find_products", tool_context, requested=len(product_ids)) as span:
+            for product_id in product_ids:
+                # References to products shown earlier resolve from the session working set
+                card = resolve_reference(tool_context, product_id, search_engine.index_version, search_engine.get_product)
+                product = search_engine.get_product(card["id"]) if card else None
+                # Worker thread: a query-log write or the admission wait must not hold the event loop
+                if product is None:
+                    product = await asyncio.to_thread(search_engine.find_product, product_id, tool="compare_products")
+                if product is None:
+                    search_results = await asyncio.to_thread(search_engine.search, product_id, limit=1,
+                                                             tool="compare_products")
+                    product = search_results[0] if search_results else None
+                if product:
+                    products.append(product)
+            span.set(found=len(products))
         
         if len(products) < 2:
             return "Không tìm đủ sản phẩm để so sánh"
         
         # Convert to comprehensive product format for frontend
-        minimal_products = []
-        for product in products:
-            # Get first image from images array
-            images = product.get("images", [])
-            first_image = images[0] if images else ""
-            
-            # Get brand and category
-            brand = product.get("brand", "")
-            category = product.get("category", "")
-            
-            # Get specs for comparison
-            specs = product.get("specs", {})
-            display = specs.get("display", {})
-            camera_main = specs.get("camera_main", "")
-            battery = specs.get("battery", {})
-            ram = specs.get("ram", "")
-            storage = specs.get("storage", "")
-            
-            # Get reviews for rating
-            reviews = product.get("reviews", {})
-            rating = reviews.get("average_rating", 0)
-            rating_count = reviews.get("rating_count", 0)
-            
-            # Get availability
-            availability = product.get("availability", "unknown")
-            
-            # Get colors and storage options
-            colors = product.get("colors", [])
-            storage_options = product.get("storage_options", [])
-            
-            # Get promotions
-            promotions = product.get("promotions", {})
-            free_gifts = promotions.get("free_gifts", [])
-            special_discounts = promotions.get("special_discounts", [])
-            
-            minimal_products.append({
-                "id": product.get("id", ""),
-                "sku": product.get("sku", ""),
-                "name": product.get("name", ""),
-                "brand": brand,
-                "category": category,
-                "price": {
-                    "current": product.get("price", {}).get("current", 0),
-                    "original": product.get("price", {}).get("original"),
-                    "currency": product.get("price", {}).get("currency", "VND"),
-                    "discount": f"{product.get('price', {}).get('discount_percentage', 0)}%" if product.get('price', {}).get('discount_percentage', 0) > 0 else None
-                },
-                "image": {
-                    "url": first_image
-                },
-                "description": product.get("description", ""),
-                "productUrl": product.get("url", ""),
-                "availability": availability,
-                "rating": {
-                    "average": rating,
-                    "count": rating_count
-                },
-                "specs": {
-                    "display": {
-                        "size": display.get("size", ""),
-                        "technology": display.get("technology", ""),
-                        "resolution": display.get("resolution", "")
-                    },
-                    "camera": {
-                        "main": camera_main,
-                        "front": specs.get("camera_front", "")
-                    },
-                    "battery": {
-                        "capacity": battery.get("capacity", ""),
-                        "charging": battery.get("wired_charging", "")
-                    },
-                    "ram": ram,
-                    "storage": storage,
-                    "os": specs.get("os", ""),
-                    "chipset": specs.get("chipset", "")
-                },
-                "colors": colors,
-                "storage_options": storage_options,
-                "promotions": {
-                    "free_gifts": free_gifts[:3],  # Limit to first 3
-                    "special_discounts": special_discounts[:2]  # Limit to first 2
-                }
-            })
+        minimal_products = [product_card(product) for product in products]
+        remember_products(tool_context, minimal_products, search_engine.index_version, shown=False)
         
-        # Create comparison summary
-        # Safe comparison with proper type handling
-        def safe_float(value, default=0):
-            """Safely convert value to float, handling dict and other types"""
-            if isinstance(value, (int, float)):
-                return float(value)
-            elif isinstance(value, str):
-                try:
-                    return float(value)
-                except (ValueError, TypeError):
-                    return default
-            elif isinstance(value, dict):
-                # If it's a dict, try to get a numeric value from common keys
-                for key in ['value', 'amount', 'capacity', 'current', 'original']:
-                    if key in value and isinstance(value[key], (int, float)):
-                        return float(value[key])
-                return default
-            else:
-                return default
-        
-        cheapest = min(products, key=lambda p: safe_float(p.get("price", {}).get("current", 0), float('inf')))
-        highest_rated = max(products, key=lambda p: safe_float(p.get("reviews", {}).get("average_rating", 0)))
-        best_battery = max(products, key=lambda p: safe_float(p.get("specs", {}).get("battery", {}), 0))
+        # Per-spec winners and value scores come from the precomputed spec matrix
+        comparison = search_engine.compare_specs(products, weights)
         
         comparison_summary = f"**So sánh {len(products)} sản phẩm:**\n"
-        cheapest_price = safe_float(cheapest.get('price', {}).get('current', 0))
-        highest_rating = safe_float(highest_rated.get('reviews', {}).get('average_rating', 0))
-        best_battery_capacity = safe_float(best_battery.get('specs', {}).get('battery', {}))
+        for field, (index, value) in comparison["winners"].items():
+            label, _, value_format = DIMENSIONS[field]
+            comparison_summary += f"- {label}: {products[index].get('name', 'N/A')} ({value_format.format(value)})\n"
         
-        comparison_summary += f"- Giá rẻ nhất: {cheapest.get('name', 'N/A')} ({cheapest_price:,.0f} VND)\n"
-        comparison_summary += f"- Đánh giá cao nhất: {highest_rated.get('name', 'N/A')} ({highest_rating}/5)\n"
-        comparison_summary += f"- Pin tốt nhất: {best_battery.get('name', 'N/A')} ({best_battery_capacity}mAh)\n"
+        scores = comparison["scores"]
+        scored = [i for i, score in enumerate(scores) if score is not None]
+        if scored:
+            best = max(scored, key=lambda i: scores[i])
+            comparison_summary += f"- Đáng mua nhất: {products[best].get('name', 'N/A')} (điểm {scores[best] * 100:.0f}/100)\n"
         
         # Create JSON response for frontend
         json_response = {
             "type": "product-display",
             "message": comparison_summary,
+            "value_scores": {
+                card["id"]: round(score * 100) for card, score in zip(minimal_products, scores) if score is not None
+            },
             "products": minimal_products
         }
         
-        # Skip artifact saving to avoid import issues
-        # The comparison results are already returned as JSON
-        
-        return json.dumps(json_response, ensure_ascii=False)
+        # Full cards go to the frontend, a compact summary to the model
+        return render_tool_output(json_response, tool_context)
         
     except Exception as e:
         logger.error(f"Compare products error: {e}")
@@ -0,0 +1,233 @@
+"""
+Tool Diagnostics for DDV Product Advisor
+Per-tool timing, event-loop lag sampling and stacks of steps that block the loop
+
+Every await-free stretch of an async tool (a "step") runs on the event loop
+thread and stalls all other sessions while it runs: a sync Meilisearch call
+or file read inside a tool shows up here as a long step. Enable with
+DDV_DIAGNOSTICS=1:
+    instrument_tool(func)  wraps a tool; each coroutine step is timed
+    watchdog thread        logs the live stack of a step still running after
+                           slow_step_ms, so the blocking call is named
+    loop lag sampler       sleeps lag_interval on the loop and records overshoot
+    diagnostics_report()   per-tool and loop-lag aggregates, also logged every
+                           report_interval seconds
+"""
+
+import asyncio
+import functools
+import itertools
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from app.config_simple import DIAGNOSTICS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolStats:
+    """Aggregates for one tool"""
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    blocking_ms: float = 0.0   # time spent in steps, i.e. holding the loop
+    max_step_ms: float = 0.0
+    slow_steps: int = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "blocking_ms": round(self.blocking_ms, 1),
+            "max_step_ms": round(self.max_step_ms, 1),
+            "slow_steps": self.slow_steps,
+        }
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class Diagnostics:
+    """Shared collector; one per process"""
+
+    def __init__(self, slow_step_ms: float, lag_interval: float, watchdog_interval: float, report_interval: float):
+        self.slow_step_ms = slow_step_ms
+        self.lag_interval = lag_interval
+        self.watchdog_interval = watchdog_interval
+        self.report_interval = report_interval
+        self.tools: Dict[str, ToolStats] = {}
+        self.lag_samples = deque(maxlen=1024)
+        self.max_lag_ms = 0.0
+        self._lock = threading.Lock()
+        self._step_ids = itertools.count()
+        # step id -> [tool name, thread id, start, reported]
+        self._active: Dict[int, list] = {}
+        self._loops = weakref.WeakSet()
+        self._watchdog: Optional[threading.Thread] = None
+
+    # Steps
+
+    def step_started(self, tool: str) -> int:
+        step_id = next(self._step_ids)
+        with self._lock:
+            self._active[step_id] = [tool, threading.get_ident(), time.perf_counter(), False]
+        return step_id
+
+    def step_finished(self, step_id: int, stats: ToolStats) -> float:
+        with self._lock:
+            _, _, start, _ = self._active.pop(step_id)
+            elapsed = (time.perf_counter() - start) * 1000
+            stats.blocking_ms += elapsed
+            stats.max_step_ms = max(stats.max_step_ms, elapsed)
+            if elapsed >= self.slow_step_ms:
+                stats.slow_steps += 1
+        return elapsed
+
+    def stats(self, tool: str) -> ToolStats:
+        with self._lock:
+            return self.tools.setdefault(tool, ToolStats())
+
+    def call_finished(self, stats: ToolStats, elapsed_ms: float, failed: bool):
+        with self._lock:
+            stats.calls += 1
+            stats.errors += failed
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+
+    # Background samplers
+
+    def ensure_running(self):
+        """Start the watchdog thread and a lag sampler on the current loop, once each"""
+        if self._watchdog is None:
+            with self._lock:
+                if self._watchdog is None:
+                    self._watchdog = threading.Thread(target=self._watch, name="tool-watchdog", daemon=True)
+                    self._watchdog.start()
+
+        loop = asyncio.get_running_loop()
+        if loop not in self._loops:
+            self._loops.add(loop)
+            loop.create_task(self._sample_lag())
+
+    async def _sample_lag(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, (time.perf_counter() - start - self.lag_interval) * 1000)
+            self.lag_samples.append(lag)
+            self.max_lag_ms = max(self.max_lag_ms, lag)
+
+    def _watch(self):
+        next_report = time.monotonic() + self.report_interval
+        while True:
+            time.sleep(self.watchdog_interval)
+            now = time.perf_counter()
+            with self._lock:
+                slow = [step for step in self._active.values()
+                        if not step[3] and (now - step[2]) * 1000 >= self.slow_step_ms]
+                for step in slow:
+                    step[3] = True
+
+            frames = sys._current_frames() if slow else {}
+            for tool, thread_id, start, _ in slow:
+                frame = frames.get(thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame else "(thread gone)\n"
+                logger.warning(f"🐢 Tool {tool} has held the event loop for {(now - start) * 1000:.0f}ms:\n{stack}")
+
+            if time.monotonic() >= next_report:
+                next_report = time.monotonic() + self.report_interval
+                if self.tools:
+                    logger.info(f"📊 Tool diagnostics: {self.report()}")
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {name: stats.summary() for name, stats in self.tools.items()}
+        lags = list(self.lag_samples)
+        return {
+            "tools": tools,
+            "loop_lag_ms": {
+                "samples": len(lags),
+                "p50": round(_percentile(lags, 0.5), 1),
+                "p95": round(_percentile(lags, 0.95), 1),
+                "max": round(self.max_lag_ms, 1),
+            },
+        }
+
+
+class _TimedAwaitable:
+    """Drives a coroutine and times each step between its awaits"""
+
+    def __init__(self, coroutine, tool: str, stats: ToolStats):
+        self.coroutine = coroutine
+        self.tool = tool
+        self.stats = stats
+
+    def __await__(self):
+        inner = self.coroutine.__await__()
+        value, error = None, None
+        while True:
+            step_id = _diagnostics.step_started(self.tool)
+            try:
+                yielded = inner.throw(error) if error is not None else inner.send(value)
+            except StopIteration as stop:
+                _diagnostics.step_finished(step_id, self.stats)
+                return stop.value
+            except BaseException:
+                _diagnostics.step_finished(step_id, self.stats)
+                raise
+            _diagnostics.step_finished(step_id, self.stats)
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+
+_diagnostics = Diagnostics(
+    DIAGNOSTICS_CONFIG["slow_step_ms"],
+    DIAGNOSTICS_CONFIG["lag_interval"],
+    DIAGNOSTICS_CONFIG["watchdog_interval"],
+    DIAGNOSTICS_CONFIG["report_interval"],
+)
+
+
+def instrument_tool(func: Callable) -> Callable:
+    """Wrap an async tool with step timing when diagnostics are enabled; otherwise return it as is
+
+    functools.wraps keeps the name, docstring and signature ADK builds the tool declaration from.
+    """
+    if not DIAGNOSTICS_CONFIG["enabled"]:
+        return func
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        _diagnostics.ensure_running()
+        stats = _diagnostics.stats(func.__name__)
+        start = time.perf_counter()
+        failed = False
+        try:
+            return await _TimedAwaitable(func(*args, **kwargs), func.__name__, stats)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            _diagnostics.call_finished(stats, (time.perf_counter() - start) * 1000, failed)
+
+    return wrapper
+
+
+def diagnostics_report() -> Dict[str, Any]:
+    """Per-tool timing and event-loop lag collected so far"""
+    return _diagnostics.report()
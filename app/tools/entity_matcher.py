@@ -0,0 +1,354 @@
+"""
+Product Entity Matcher for DDV Product Advisor
+Aho-Corasick automaton over product names, abbreviations and storage variants
+"""
+
+import functools
+import itertools
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Callable, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config_simple import ENTITY_CONFIG
+from app.tools.columnar import PackedBytes
+from app.tools.text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+STORAGE_UNITS = {"gb": 1, "g": 1, "tb": 1024, "t": 1024}
+
+
+class TokenAutomaton:
+    """Aho-Corasick automaton whose alphabet is normalized tokens"""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, Any]]] = [[]]
+
+    def add(self, tokens: List[str], payload: Any):
+        """Add a token sequence; payload is reported on every match"""
+        state = 0
+        for token in tokens:
+            nxt = self.goto[state].get(token)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][token] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        self.output[state].append((len(tokens), payload))
+
+    def build(self):
+        """Compute failure links breadth-first"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self.goto[state].items():
+                queue.append(nxt)
+                if state:
+                    fallback = self.fail[state]
+                    while fallback and token not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[nxt] = self.goto[fallback].get(token, 0)
+                self.output[nxt].extend(self.output[self.fail[nxt]])
+
+    def find(self, tokens: List[str]) -> List[Tuple[int, int, Any]]:
+        """Return (start, end, payload) for every match in one pass"""
+        matches = []
+        state = 0
+        for end, token in enumerate(tokens, 1):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            for length, payload in self.output[state]:
+                matches.append((end - length, end, payload))
+        return matches
+
+
+class CompiledAutomaton:
+    """A built TokenAutomaton flattened into CSR arrays
+
+    Only the token vocabulary stays a dict; transitions, failure links and
+    outputs are NumPy arrays, so the automaton can be shared through the
+    mmap'd catalog store. Payloads are encoded to ints by the caller.
+    """
+
+    def __init__(self, automaton: TokenAutomaton, encode: Callable[[Any], int]):
+        self.vocabulary: Dict[str, int] = {}
+        for edges in automaton.goto:
+            for token in edges:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        states = len(automaton.goto)
+        self.edge_ptr = np.zeros(states + 1, dtype=np.int64)
+        self.out_ptr = np.zeros(states + 1, dtype=np.int64)
+        edge_tokens, edge_targets, out_lengths, out_payloads = [], [], [], []
+        for state in range(states):
+            # Edges sorted by token id for binary search
+            for token_id, nxt in sorted((self.vocabulary[t], n) for t, n in automaton.goto[state].items()):
+                edge_tokens.append(token_id)
+                edge_targets.append(nxt)
+            self.edge_ptr[state + 1] = len(edge_tokens)
+            for length, payload in automaton.output[state]:
+                out_lengths.append(length)
+                out_payloads.append(encode(payload))
+            self.out_ptr[state + 1] = len(out_lengths)
+
+        self.edge_tokens = np.asarray(edge_tokens, dtype=np.int32)
+        self.edge_targets = np.asarray(edge_targets, dtype=np.int32)
+        self.fail = np.asarray(automaton.fail, dtype=np.int32)
+        self.out_lengths = np.asarray(out_lengths, dtype=np.int32)
+        self.out_payloads = np.asarray(out_payloads, dtype=np.int32)
+
+    def _goto(self, state: int, token_id: int) -> int:
+        lo, hi = int(self.edge_ptr[state]), int(self.edge_ptr[state + 1])
+        i = lo + int(np.searchsorted(self.edge_tokens[lo:hi], token_id))
+        return int(self.edge_targets[i]) if i < hi and self.edge_tokens[i] == token_id else -1
+
+    def find(self, tokens: List[str]) -> List[Tuple[int, int, int]]:
+        """Return (start, end, payload id) for every match in one pass"""
+        matches = []
+        state = 0
+        for end, token in enumerate(tokens, 1):
+            token_id = self.vocabulary.get(token, -1)
+            nxt = self._goto(state, token_id) if token_id >= 0 else -1
+            while state and nxt == -1:
+                state = int(self.fail[state])
+                nxt = self._goto(state, token_id) if token_id >= 0 else -1
+            state = max(nxt, 0)
+            for i in range(int(self.out_ptr[state]), int(self.out_ptr[state + 1])):
+                matches.append((end - int(self.out_lengths[i]), end, int(self.out_payloads[i])))
+        return matches
+
+
+@dataclass
+class ProductMention:
+    """A product model named in a query"""
+    model: str
+    product_ids: List[str]
+    storage_gb: Optional[int] = None
+    start: int = 0
+    end: int = 0
+
+
+@dataclass
+class EntityExtraction:
+    """Everything the automaton found in a query"""
+    mentions: List[ProductMention] = field(default_factory=list)
+    brands: Set[str] = field(default_factory=set)
+
+    @property
+    def unambiguous(self) -> bool:
+        """True when the query names exactly one model"""
+        return len(self.mentions) == 1
+
+
+def parse_storage_tokens(tokens: List[str]) -> Optional[int]:
+    """Storage in GB from tokens like ["256", "gb"] or ["1", "tb"]"""
+    if len(tokens) == 2 and tokens[0].isdigit() and tokens[1] in STORAGE_UNITS:
+        storage = int(tokens[0]) * STORAGE_UNITS[tokens[1]]
+        # "5 g" in "Z Flip7 5G" is the network, not 5GB
+        if storage in ENTITY_CONFIG["storage_values_gb"]:
+            return storage
+    return None
+
+
+def split_product_name(name: str) -> Tuple[List[str], Optional[int]]:
+    """Split a product name into model tokens and storage (GB)"""
+    tokens = tokenize(name)
+    stop_tokens = set(ENTITY_CONFIG["name_stop_tokens"])
+    for i, token in enumerate(tokens):
+        storage = parse_storage_tokens(tokens[i:i + 2])
+        if storage is not None:
+            return tokens[:i], storage
+        if token in stop_tokens:
+            return tokens[:i], None
+    return tokens, None
+
+
+def _replace_phrase(tokens: List[str], phrase: List[str], replacement: List[str]) -> List[str]:
+    """Replace every occurrence of a token phrase"""
+    result, i = [], 0
+    while i < len(tokens):
+        if tokens[i:i + len(phrase)] == phrase:
+            result.extend(replacement)
+            i += len(phrase)
+        else:
+            result.append(tokens[i])
+            i += 1
+    return result
+
+
+@functools.lru_cache(maxsize=1)
+def _abbreviation_phrases() -> Tuple[Tuple[List[str], List[str]], ...]:
+    """(abbreviation tokens, phrase tokens) pairs from phrase_aliases"""
+    return tuple((tokenize(abbreviation), tokenize(phrase))
+                 for phrase, abbreviations in ENTITY_CONFIG["phrase_aliases"].items()
+                 for abbreviation in abbreviations)
+
+
+def expand_abbreviations(tokens: List[str]) -> List[str]:
+    """Spell out the phrase_aliases abbreviations in tokens ("ip 16 pm" -> "iphone 16 pro max")"""
+    for abbreviation, phrase in _abbreviation_phrases():
+        if abbreviation[0] in tokens:
+            tokens = _replace_phrase(tokens, abbreviation, phrase)
+    return tokens
+
+
+def model_aliases(model_tokens: List[str]) -> Set[Tuple[str, ...]]:
+    """Generate the ways users write a model: optional words dropped, abbreviations"""
+    optional = [tokenize(phrase) for phrase in ENTITY_CONFIG["optional_phrases"]]
+    present = [phrase for phrase in optional if _replace_phrase(model_tokens, phrase, []) != model_tokens]
+
+    variants = set()
+    for r in range(len(present) + 1):
+        for dropped in itertools.combinations(present, r):
+            tokens = model_tokens
+            for phrase in dropped:
+                tokens = _replace_phrase(tokens, phrase, [])
+            variants.add(tuple(tokens))
+
+    for phrase, abbreviations in ENTITY_CONFIG["phrase_aliases"].items():
+        phrase_tokens = tokenize(phrase)
+        for variant in list(variants):
+            for abbreviation in abbreviations:
+                replaced = _replace_phrase(list(variant), phrase_tokens, tokenize(abbreviation))
+                variants.add(tuple(replaced))
+
+    # A bare "pro" or "5 g" is not a product mention; require a model number
+    return {v for v in variants if len(v) >= 2 and any(t.isdigit() for t in v)}
+
+
+class ProductEntityMatcher:
+    """Extracts product mentions from a query in one linear pass
+
+    Models, variants and automaton payloads are kept in flat arrays (see
+    CompiledAutomaton) rather than dicts of lists.
+    """
+
+    MODEL, BRAND, STORAGE = 0, 1, 2
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        automaton = TokenAutomaton()
+        models: Dict[str, List[Tuple[str, Optional[int]]]] = {}
+
+        alias_models: Dict[Tuple[str, ...], Set[str]] = {}
+        for product in products:
+            model_tokens, storage = split_product_name(product.get("name", ""))
+            if not model_tokens:
+                continue
+            if storage is None:
+                storage = parse_storage_tokens(tokenize((product.get("specs", {}) or {}).get("storage", "") or ""))
+
+            model = " ".join(model_tokens)
+            models.setdefault(model, []).append((product.get("id"), storage))
+            for alias in model_aliases(model_tokens):
+                alias_models.setdefault(alias, set()).add(model)
+
+        for alias, names in alias_models.items():
+            automaton.add(list(alias), ("model", frozenset(names)))
+
+        for brand, aliases in ENTITY_CONFIG["brand_aliases"].items():
+            for alias in aliases:
+                automaton.add(tokenize(alias), ("brand", brand))
+
+        for value in ENTITY_CONFIG["storage_values_gb"]:
+            for unit, factor in STORAGE_UNITS.items():
+                if value % factor == 0:
+                    automaton.add([str(value // factor), unit], ("storage", value))
+            automaton.add([str(value)], ("storage", value))
+
+        automaton.build()
+
+        # Models in name order, so candidate sets come out sorted
+        model_names = sorted(models)
+        model_index = {name: i for i, name in enumerate(model_names)}
+        self.model_names = PackedBytes([name.encode("utf-8") for name in model_names])
+        variants = [models[name] for name in model_names]
+        self.variant_ptr = np.zeros(len(variants) + 1, dtype=np.int64)
+        np.cumsum([len(v) for v in variants], out=self.variant_ptr[1:])
+        self.variant_ids = PackedBytes([str(pid).encode("utf-8") for v in variants for pid, _ in v])
+        self.variant_storage = np.asarray(
+            [-1 if storage is None else storage for v in variants for _, storage in v], dtype=np.int32)
+        self.brands = sorted(ENTITY_CONFIG["brand_aliases"])
+
+        payload_ids: Dict[Any, int] = {}
+        payload_kinds: List[int] = []
+        payload_values: List[int] = []
+        model_sets: List[List[int]] = []
+
+        def encode(payload: Tuple[str, Any]) -> int:
+            if payload not in payload_ids:
+                kind, value = payload
+                if kind == "model":
+                    model_sets.append(sorted(model_index[name] for name in value))
+                    payload_kinds.append(self.MODEL)
+                    payload_values.append(len(model_sets) - 1)
+                elif kind == "brand":
+                    payload_kinds.append(self.BRAND)
+                    payload_values.append(self.brands.index(value))
+                else:
+                    payload_kinds.append(self.STORAGE)
+                    payload_values.append(value)
+                payload_ids[payload] = len(payload_ids)
+            return payload_ids[payload]
+
+        self.automaton = CompiledAutomaton(automaton, encode)
+        self.payload_kinds = np.asarray(payload_kinds, dtype=np.uint8)
+        self.payload_values = np.asarray(payload_values, dtype=np.int32)
+        self.model_set_ptr = np.zeros(len(model_sets) + 1, dtype=np.int64)
+        np.cumsum([len(m) for m in model_sets], out=self.model_set_ptr[1:])
+        self.model_set_members = np.asarray([i for m in model_sets for i in m], dtype=np.int32)
+        logger.info(f"✅ Built entity automaton: {len(model_names)} models, {len(alias_models)} aliases")
+
+    def _variants(self, model: int) -> List[Tuple[str, Optional[int]]]:
+        lo, hi = int(self.variant_ptr[model]), int(self.variant_ptr[model + 1])
+        return [(self.variant_ids.get(i).decode("utf-8"), int(self.variant_storage[i]) if self.variant_storage[i] >= 0 else None)
+                for i in range(lo, hi)]
+
+    def extract(self, text: str) -> EntityExtraction:
+        """Find model, storage and brand mentions in a query"""
+        extraction = EntityExtraction()
+        models, storages = [], []
+        for start, end, payload in self.automaton.find(tokenize(text)):
+            kind, value = self.payload_kinds[payload], int(self.payload_values[payload])
+            if kind == self.MODEL:
+                models.append((start, end, value))
+            elif kind == self.STORAGE:
+                storages.append((start, end, value))
+            else:
+                extraction.brands.add(self.brands[value])
+
+        # Leftmost-longest, non-overlapping model matches
+        models.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        last_end = -1
+        model_rows = []
+        for start, end, model_set in models:
+            if start < last_end:
+                continue
+            last_end = end
+            for i in range(int(self.model_set_ptr[model_set]), int(self.model_set_ptr[model_set + 1])):
+                model = int(self.model_set_members[i])
+                model_rows.append(model)
+                name = self.model_names.get(model).decode("utf-8")
+                extraction.mentions.append(ProductMention(name, [], start=start, end=end))
+
+        # Storage belongs to the closest preceding mention
+        for i, mention in enumerate(extraction.mentions):
+            next_start = extraction.mentions[i + 1].start if i + 1 < len(extraction.mentions) else float("inf")
+            following = [s for s in storages if mention.end <= s[0] and (s[0] < next_start or next_start <= mention.start)]
+            if following:
+                mention.storage_gb = min(following)[2]
+
+            variants = self._variants(model_rows[i])
+            mention.product_ids = [pid for pid, _ in variants]
+            if mention.storage_gb is not None:
+                mention.product_ids = [pid for pid, storage in variants if storage == mention.storage_gb] \
+                    or mention.product_ids
+
+        return extraction
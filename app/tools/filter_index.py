@@ -0,0 +1,259 @@
+"""
+Bitmap Filter Index for DDV Product Advisor
+Precomputed bitmaps and sorted numeric columns for local filtering and facets
+"""
+
+import copy
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.config_simple import FACET_CONFIG
+from app.tools.promotions import product_promotions
+from app.tools.regions import store_directory
+from app.tools.specs import NUMERIC_FIELDS, numeric_specs, parse_filter_value, parse_filter_flag, parse_capacity_gb
+from app.tools.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Categorical fields that get one bitmap per value
+CATEGORICAL_FIELDS = ["brand", "category", "availability"]
+
+# Multi-valued field: cards and wallets named in a product's promotions
+PARTNER_FIELD = "payment_partner"
+
+# Multi-valued field: regions with a store that has the product in stock (app/tools/regions.py)
+REGION_FIELD = "region"
+
+# enhanced_filters key -> (numeric column, bound, value parser)
+RANGE_FILTERS = {
+    "price_min": ("price", "min", parse_filter_value),
+    "price_max": ("price", "max", parse_filter_value),
+    "battery_min": ("battery_mah", "min", parse_filter_value),
+    "camera_min": ("camera_mp", "min", parse_filter_value),
+    "storage_min": ("storage_gb", "min", lambda v: parse_filter_value(v, parse_capacity_gb)),
+    "ram_min": ("ram_gb", "min", lambda v: parse_filter_value(v, parse_capacity_gb)),
+    "rating_min": ("rating", "min", parse_filter_value),
+    # Promotion columns (app/tools/promotions.py)
+    "effective_price_max": ("effective_price", "max", parse_filter_value),
+    "promo_discount_min": ("promo_discount", "min", parse_filter_value),
+    "installment_0": ("installment_zero", "min", parse_filter_flag),
+}
+
+# Filter keys accepted by the search tools
+FILTER_KEYS = list(RANGE_FILTERS) + CATEGORICAL_FIELDS + ["in_stock", PARTNER_FIELD, REGION_FIELD]
+
+# Sortable attribute (Meilisearch name) -> local numeric column
+SORT_COLUMNS = {
+    "price.current": "price",
+    "price.discount_percentage": "discount",
+    "reviews.average_rating": "rating",
+    "name": "name",
+}
+SORT_COLUMNS.update({f"specs_numeric.{field}": field for field in NUMERIC_FIELDS})
+
+
+def parse_sort(sort: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """Split "price.current:asc" into (attribute, column, descending); None if unsupported"""
+    if not sort:
+        return None
+    attribute, _, direction = sort.partition(":")
+    direction = direction or "asc"
+    if attribute not in SORT_COLUMNS or direction not in ("asc", "desc"):
+        return None
+    return attribute, SORT_COLUMNS[attribute], direction == "desc"
+
+
+class NumericColumn:
+    """A numeric column plus its sort order for binary-search range bitmaps"""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+        valid = np.flatnonzero(~np.isnan(values))
+        self.order = valid[np.argsort(values[valid], kind="stable")]
+        self.sorted_values = values[self.order]
+
+    def range_bitmap(self, size: int, low: Optional[float] = None, high: Optional[float] = None) -> np.ndarray:
+        """Rows with low <= value <= high (missing values never match)"""
+        start = 0 if low is None else np.searchsorted(self.sorted_values, low, side="left")
+        end = len(self.sorted_values) if high is None else np.searchsorted(self.sorted_values, high, side="right")
+        bitmap = np.zeros(size, dtype=bool)
+        bitmap[self.order[start:end]] = True
+        return bitmap
+
+
+class BitmapFilterIndex:
+    """Evaluates enhanced_filters as bitmap AND/OR and counts facets"""
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.size = len(products)
+
+        # One bitmap per categorical value, keyed by normalized value
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        self.labels: Dict[str, Dict[str, str]] = {}
+        for field in CATEGORICAL_FIELDS:
+            rows_by_value: Dict[str, List[int]] = {}
+            labels: Dict[str, str] = {}
+            for row, product in enumerate(products):
+                value = product.get(field)
+                if not isinstance(value, str) or not value:
+                    continue
+                key = normalize_text(value)
+                rows_by_value.setdefault(key, []).append(row)
+                labels.setdefault(key, value)
+            self.bitmaps[field] = {key: self._bitmap(rows) for key, rows in rows_by_value.items()}
+            self.labels[field] = labels
+
+        rows_by_partner: Dict[str, List[int]] = {}
+        partner_labels: Dict[str, str] = {}
+        for row, product in enumerate(products):
+            for offer in product_promotions(product).offers:
+                if offer.partner:
+                    key = normalize_text(offer.partner)
+                    rows_by_partner.setdefault(key, []).append(row)
+                    partner_labels.setdefault(key, offer.partner)
+        self.bitmaps[PARTNER_FIELD] = {key: self._bitmap(rows) for key, rows in rows_by_partner.items()}
+        self.labels[PARTNER_FIELD] = partner_labels
+
+        # One partition bitmap per region; region, city and alias names resolve to its key
+        directory = store_directory()
+        rows_by_region: Dict[str, List[int]] = {}
+        region_labels: Dict[str, str] = {}
+        for row, product in enumerate(products):
+            for key, label in directory.stock_regions(product).items():
+                rows_by_region.setdefault(key, []).append(row)
+                region_labels.setdefault(key, label)
+        self.bitmaps[REGION_FIELD] = {key: self._bitmap(rows) for key, rows in rows_by_region.items()}
+        self.labels[REGION_FIELD] = region_labels
+        self.region_keys = dict(directory.keys)
+
+        # Sorted numeric columns
+        specs = [numeric_specs(product) for product in products]
+        self.columns = {
+            field: NumericColumn(np.array([s[field] for s in specs], dtype=np.float64))
+            for field in NUMERIC_FIELDS
+        }
+
+        # Name sorts use each row's rank in normalized-name order
+        names = [normalize_text(product.get("name", "")) for product in products]
+        name_rank = np.empty(self.size, dtype=np.float64)
+        name_rank[sorted(range(self.size), key=names.__getitem__)] = np.arange(self.size)
+        self.columns["name"] = NumericColumn(name_rank)
+
+        # Price buckets are fixed, so precompute their bitmaps for facets
+        self.price_buckets = [
+            (label, self.columns["price"].range_bitmap(self.size, low, high - 1 if high else None))
+            for low, high, label in FACET_CONFIG["price_buckets"]
+        ]
+
+        logger.info(f"✅ Built bitmap filter index: {self.size} rows, "
+                    f"{sum(len(b) for b in self.bitmaps.values())} value bitmaps")
+
+    def _bitmap(self, rows: List[int]) -> np.ndarray:
+        bitmap = np.zeros(self.size, dtype=bool)
+        bitmap[rows] = True
+        return bitmap
+
+    def all(self) -> np.ndarray:
+        return np.ones(self.size, dtype=bool)
+
+    def value_bitmap(self, field: str, values: Any) -> np.ndarray:
+        """OR of the bitmaps for one or more values of a categorical field"""
+        if isinstance(values, str):
+            values = [values]
+        bitmap = np.zeros(self.size, dtype=bool)
+        for value in values:
+            match = self.bitmaps[field].get(normalize_text(str(value)))
+            if match is not None:
+                bitmap |= match
+        return bitmap
+
+    def evaluate(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """AND together every filter condition"""
+        mask = self.all()
+        if not filters:
+            return mask
+
+        for key, value in filters.items():
+            if value is None or value == "" or value == []:
+                continue
+            if key in RANGE_FILTERS:
+                column, bound, parser = RANGE_FILTERS[key]
+                number = parser(value)
+                if number is None:
+                    continue
+                low, high = (number, None) if bound == "min" else (None, number)
+                mask &= self.columns[column].range_bitmap(self.size, low, high)
+            elif key in CATEGORICAL_FIELDS or key == PARTNER_FIELD:
+                mask &= self.value_bitmap(key, value)
+            elif key == REGION_FIELD:
+                regions = [value] if isinstance(value, str) else value
+                keys = [normalize_text(str(region)) for region in regions]
+                mask &= self.value_bitmap(key, [self.region_keys.get(k, k) for k in keys])
+            elif key == "in_stock" and value:
+                mask &= self.value_bitmap("availability", "in_stock")
+        return mask
+
+    def with_numeric_rows(self, specs_by_row: Dict[int, Dict[str, float]]) -> "BitmapFilterIndex":
+        """Copy with new numeric_specs() values for some rows (e.g. updated ratings)
+
+        Only the columns that actually change are copied and re-sorted; the
+        categorical bitmaps are shared, so the rows' brand, category,
+        availability and branch stock must stay the same.
+        """
+        index = copy.copy(self)
+        index.columns = dict(self.columns)
+        rows = np.array(list(specs_by_row), dtype=np.int64)
+        for field in NUMERIC_FIELDS:
+            values = np.array([specs[field] for specs in specs_by_row.values()], dtype=np.float64)
+            current = self.columns[field].values[rows]
+            if np.array_equal(current, values, equal_nan=True):
+                continue
+            column = self.columns[field].values.copy()
+            column[rows] = values
+            index.columns[field] = NumericColumn(column)
+        return index
+
+    def top_k(self, rows: np.ndarray, column: str, descending: bool, k: int) -> np.ndarray:
+        """First k rows ordered by a numeric column, by partial selection (O(n + k log k))"""
+        if k <= 0 or len(rows) == 0:
+            return rows[:0]
+        keys = self.columns[column].values[rows]
+        if descending:
+            keys = -keys
+        # Missing values sort last in either direction
+        keys = np.where(np.isnan(keys), np.inf, keys)
+
+        if len(rows) > k:
+            # argpartition keeps an arbitrary subset of the rows tied with the k-th key;
+            # take those by row so every k is a prefix of the full (key, row) order
+            threshold = keys[np.argpartition(keys, k - 1)[k - 1]]
+            below = np.flatnonzero(keys < threshold)
+            ties = np.flatnonzero(keys == threshold)
+            ties = ties[np.argsort(rows[ties], kind="stable")][:k - len(below)]
+            selected = np.concatenate([below, ties])
+        else:
+            selected = np.arange(len(rows))
+        selected = selected[np.lexsort((rows[selected], keys[selected]))]
+        return rows[selected]
+
+    def facets(self, mask: np.ndarray) -> Dict[str, Any]:
+        """Value counts per categorical field and price bucket for the rows in mask"""
+        facets: Dict[str, Any] = {}
+        for field, bitmaps in self.bitmaps.items():
+            counts = {
+                self.labels[field][key]: int(np.count_nonzero(bitmap & mask))
+                for key, bitmap in bitmaps.items()
+            }
+            facets[field] = {label: count for label, count in sorted(counts.items(), key=lambda kv: -kv[1]) if count}
+
+        facets["price_buckets"] = {
+            label: int(np.count_nonzero(bitmap & mask)) for label, bitmap in self.price_buckets
+        }
+
+        prices = self.columns["price"].values[mask]
+        prices = prices[~np.isnan(prices)]
+        if len(prices):
+            facets["price_range"] = {"min": float(prices.min()), "max": float(prices.max())}
+        return facets
@@ -0,0 +1,197 @@
+"""
+Tool Output Formatting for DDV Product Advisor
+Full product cards for the frontend and token-budgeted summaries for the model
+"""
+
+import json
+import math
+from typing import Dict, Any, Optional
+
+from app.config_simple import OUTPUT_CONFIG
+from app.tools.promotions import product_promotions
+from app.tracing import tracer
+
+
+def product_card(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Full product card rendered by the frontend
+
+    Catalog rows are validated (app/tools/catalog_validation.py), but a backend
+    document for an id the catalog does not know yet is raw, so every field is
+    read with a default.
+    """
+    # Get first image from images array
+    images = product.get("images") or []
+    first_image = images[0] if images else ""
+
+    # Get specs for comparison
+    specs = product.get("specs") or {}
+    display = specs.get("display") or {}
+    battery = specs.get("battery") or {}
+
+    # Get reviews for rating
+    reviews = product.get("reviews") or {}
+    price = product.get("price") or {}
+    discount_percentage = price.get("discount_percentage") or 0
+
+    # Get promotions; parsed offers are cached per string, so the biggest discounts can go first
+    free_gifts = (product.get("promotions") or {}).get("free_gifts") or []
+    deals = product_promotions(product)
+    current_price = price.get("current", 0)
+    special_discounts = [
+        offer.text for offer in sorted(
+            (offer for offer in deals.offers if offer.kind == "discount"),
+            key=lambda offer: -offer.savings(current_price or 0)
+        )
+    ]
+
+    # Ingested reviews (app/tools/reviews.py) add a recency-weighted rating and snippets
+    rating = {
+        "average": reviews.get("average_rating", 0),
+        "count": reviews.get("rating_count", 0)
+    }
+    if reviews.get("recent_rating") is not None:
+        rating["recent"] = reviews["recent_rating"]
+    if reviews.get("snippets"):
+        rating["snippets"] = reviews["snippets"]
+
+    return {
+        "id": product.get("id", ""),
+        "sku": product.get("sku", ""),
+        "name": product.get("name", ""),
+        "brand": product.get("brand", ""),
+        "category": product.get("category", ""),
+        "price": {
+            "current": current_price,
+            "original": price.get("original"),
+            "currency": price.get("currency", "VND"),
+            "discount": f"{discount_percentage}%" if discount_percentage > 0 else None
+        },
+        "image": {
+            "url": first_image
+        },
+        "description": product.get("description", ""),
+        "productUrl": product.get("url", ""),
+        "availability": product.get("availability", "unknown"),
+        "rating": rating,
+        "specs": {
+            "display": {
+                "size": display.get("size", ""),
+                "technology": display.get("technology", ""),
+                "resolution": display.get("resolution", "")
+            },
+            "camera": {
+                "main": specs.get("camera_main", ""),
+                "front": specs.get("camera_front", "")
+            },
+            "battery": {
+                "capacity": battery.get("capacity", ""),
+                "charging": battery.get("wired_charging", "")
+            },
+            "ram": specs.get("ram", ""),
+            "storage": specs.get("storage", ""),
+            "os": specs.get("os", ""),
+            "chipset": specs.get("chipset", "")
+        },
+        "colors": product.get("colors", []),
+        "storage_options": product.get("storage_options", []),
+        "promotions": {
+            "free_gifts": free_gifts[:3],  # Limit to first 3
+            "special_discounts": special_discounts[:2],  # Limit to the 2 biggest
+            "best_discount": deals.promo_discount,
+            "effective_price": deals.effective_price,
+            "installment_zero": deals.installment_zero
+        }
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for model input (characters / chars_per_token)"""
+    return math.ceil(len(text) / OUTPUT_CONFIG["chars_per_token"])
+
+
+def _clip(text: Any, max_chars: int) -> str:
+    text = str(text or "").strip()
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+def product_summary(card: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact view of a product card: the fields the model needs to answer"""
+    max_chars = OUTPUT_CONFIG["max_field_chars"]
+    specs = card.get("specs", {})
+    key_specs = [
+        specs.get("display", {}).get("size"),
+        specs.get("chipset"),
+        specs.get("ram"),
+        specs.get("storage"),
+        specs.get("battery", {}).get("capacity"),
+        specs.get("camera", {}).get("main"),
+    ]
+
+    summary = {
+        "id": card.get("id", ""),
+        "name": _clip(card.get("name"), max_chars),
+        "price": card.get("price", {}).get("current", 0),
+    }
+    if card.get("price", {}).get("discount"):
+        summary["discount"] = card["price"]["discount"]
+    promotions = card.get("promotions", {})
+    if promotions.get("best_discount"):
+        summary["after_promo"] = promotions.get("effective_price")
+    if promotions.get("installment_zero"):
+        summary["installment_0"] = True
+    rating = card.get("rating", {})
+    if rating.get("count"):
+        summary["rating"] = f"{rating.get('average')}/5 ({rating.get('count')})"
+    if card.get("availability") not in (None, "", "in_stock"):
+        summary["availability"] = card["availability"]
+    summary["specs"] = " | ".join(_clip(value, max_chars) for value in key_specs if value)
+    gifts = card.get("promotions", {}).get("free_gifts", [])
+    if gifts:
+        summary["gift"] = _clip(gifts[0], max_chars)
+    return summary
+
+
+def compact_payload(payload: Dict[str, Any], budget: Optional[int] = None) -> Dict[str, Any]:
+    """Model-facing summary of a product-display payload within a token budget
+
+    Products are kept in result order and dropped from the end once the budget
+    is reached, so the same payload always yields the same summary.
+    """
+    budget = budget or OUTPUT_CONFIG["token_budget"]
+    products = payload.get("products", [])
+    summary = {"type": "product-summary"}
+    summary.update((key, value) for key, value in payload.items() if key not in ("products", "type"))
+    summary["products"] = []
+    summary["shown_to_user"] = len(products)
+
+    used = estimate_tokens(json.dumps(summary, ensure_ascii=False))
+    for card in products:
+        item = product_summary(card)
+        cost = estimate_tokens(json.dumps(item, ensure_ascii=False)) + 1
+        if used + cost > budget and summary["products"]:
+            break
+        summary["products"].append(item)
+        used += cost
+
+    omitted = len(products) - len(summary["products"])
+    if omitted:
+        summary["omitted"] = omitted
+    return summary
+
+
+def render_tool_output(payload: Dict[str, Any], tool_context, summary: Optional[str] = None) -> str:
+    """Publish the full payload to the frontend and return what the model should see
+
+    In "dual" mode the full product-display payload goes into session state (the
+    frontend reads it from actions.stateDelta) and the model gets compact_payload,
+    or summary when it was serialized ahead of time. In "full" mode the payload is
+    returned as before.
+    """
+    if OUTPUT_CONFIG["mode"] != "dual" or tool_context is None:
+        return json.dumps(payload, ensure_ascii=False)
+
+    with tracer.span("serialize", tool_context, products=len(payload.get("products", []))) as span:
+        tool_context.state[OUTPUT_CONFIG["display_state_key"]] = payload
+        output = summary if summary is not None else json.dumps(compact_payload(payload), ensure_ascii=False)
+        span.set(chars=len(output))
+    return output
@@ -0,0 +1,145 @@
+"""
+Head Query Table for DDV Product Advisor
+Final search_products payloads for the most frequent plain queries, built at index time
+
+index_products.py runs each head query (configured, listed in head_queries.txt
+or mined from the query log) through the normal search_products pipeline and
+writes the product-display payload plus the model-facing summary to a sidecar:
+    {"format", "index_version", "built_at", "entries": {"<normalized query>|<limit>": {...}}}
+
+The engine serves an entry only while its catalog has the index_version the
+table was built for, so a reload or review update falls back to normal search
+until the next index run.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.tools.catalog_snapshot import source_fingerprint
+from app.tools.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when the sidecar layout changes
+TABLE_FORMAT = 1
+
+# Logged ops that are a plain search_products call
+HEAD_OPS = ("search_page", "lookup", "materialized")
+
+
+def head_key(keywords: str, limit: int) -> str:
+    """Table key: diacritic-folded keywords and the page size"""
+    return f"{normalize_text(keywords)}|{limit}"
+
+
+def read_query_list(path: Path) -> List[str]:
+    """One query per line; blank lines and # comments are skipped"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def mine_query_log(paths: Iterable[Path], top: int) -> List[str]:
+    """Most frequent plain search_products keywords (no filters, sort or paging) in query logs"""
+    counts: Counter = Counter()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if (record.get("tool") == "search_products" and record.get("op") in HEAD_OPS and record.get("q")
+                        and not record.get("f") and not record.get("s") and not record.get("o")):
+                    counts[record["q"]] += 1
+    return [query for query, _ in counts.most_common(top)]
+
+
+def unique_queries(queries: Iterable[str]) -> List[str]:
+    """First spelling of each query, by normalized form"""
+    seen: Dict[str, str] = {}
+    for query in queries:
+        key = normalize_text(query)
+        if key:
+            seen.setdefault(key, query)
+    return list(seen.values())
+
+
+class HeadQueryTable:
+    """Materialized entries for one index version"""
+
+    def __init__(self, index_version: Optional[str], entries: Dict[str, Dict[str, Any]], built_at: float = 0.0):
+        self.index_version = index_version
+        self.entries = entries
+        self.built_at = built_at
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, keywords: str, limit: int) -> Optional[Dict[str, Any]]:
+        """{"payload": product-display dict, "summary": model-facing JSON string}, or None"""
+        return self.entries.get(head_key(keywords, limit))
+
+    def save(self, path: Path):
+        """Write the sidecar, replacing any previous one atomically"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format": TABLE_FORMAT, "index_version": self.index_version, "built_at": self.built_at,
+                       "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["HeadQueryTable"]:
+        """The sidecar's table, or None if it is missing, unreadable or another format"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        start = time.perf_counter()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read head query table {path}: {e}")
+            return None
+        if data.get("format") != TABLE_FORMAT:
+            logger.info(f"Head query table {path.name} has format {data.get('format')}, ignoring it")
+            return None
+        table = cls(data.get("index_version"), data.get("entries") or {}, data.get("built_at") or 0.0)
+        logger.info(f"✅ Loaded {len(table)} materialized head queries in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return table
+
+
+class HeadQuerySidecar:
+    """The engine's view of the sidecar file, re-read when the file changes"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.marker = source_fingerprint(self.path)
+        self.table = HeadQueryTable.load(self.path) if self.marker else None
+
+    def lookup(self, keywords: str, limit: int, index_version: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The entry for a query if the table matches index_version"""
+        table = self.table
+        if table is None or table.index_version != index_version:
+            # The sidecar is written after the catalog; pick it up once it is there
+            marker = source_fingerprint(self.path)
+            if marker == self.marker:
+                return None
+            self.marker, self.table = marker, HeadQueryTable.load(self.path)
+            table = self.table
+            if table is None or table.index_version != index_version:
+                return None
+        return table.get(keywords, limit)
+
+    def status(self) -> Dict[str, Any]:
+        table = self.table
+        return {"entries": len(table) if table else 0, "index_version": table.index_version if table else None}
@@ -3,11 +3,16 @@ Simple Meilisearch Engine for DDV Product Advisor
 Inspired by personalized_shopping structure
 """
 
-import json
 import logging
-from typing import List, Dict, Any, Optional
+import math
+import threading
+import time
+from dataclasses import replace
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
+
 try:
     import meilisearch
     from meilisearch.errors import MeilisearchError
@@ -17,101 +22,68 @@ except ImportError:
     meilisearch = None
     MeilisearchError = Exception
 
-from app.config_simple import MEILISEARCH_CONFIG, DATA_DIR, MERGED_PRODUCTS_FILE
+from app.config_simple import (
+    MEILISEARCH_CONFIG, SEARCH_BACKEND_CONFIG, ADMISSION_CONFIG, PAGINATION_CONFIG, COMPARE_CONFIG, STARTUP_CONFIG, SHARED_CATALOG_CONFIG,
+    RELOAD_CONFIG, REVIEW_CONFIG, HEAD_QUERY_CONFIG, SUGGEST_CONFIG, DATA_DIR, MERGED_PRODUCTS_FILE
+)
+from app.tools.admission import AdmissionController
+from app.tools.catalog_index import CatalogIndex, fuse_results, fuse_rows
+from app.tools.catalog_reload import CatalogGeneration, CatalogWatcher
+from app.tools.catalog_snapshot import load_snapshot, source_fingerprint
+from app.tools.catalog_validation import load_catalog
+from app.tools.filter_index import PARTNER_FIELD, RANGE_FILTERS, REGION_FIELD, parse_sort
+from app.tools.head_queries import HeadQuerySidecar
+from app.tools.pagination import RankedResultCache, results_key
+from app.tools.query_log import query_log
+from app.tools.regions import store_directory
+from app.tools.reviews import ReviewAggregator, read_reviews
+from app.tools.search_backend import SearchBackend
+from app.tools.shared_catalog import attach_catalog, current_generation
+from app.tools.specs import numeric_specs
+from app.tools.sqlite_search import SQLiteSearchBackend
+from app.tools.text_utils import normalize_text
 
 logger = logging.getLogger(__name__)
 
-class SimpleMeilisearchEngine:
-    """Simple search engine using Meilisearch"""
-    
-    _instance = None
-    _initialized = False
+
+class MeilisearchBackend(SearchBackend):
+    """Search on a Meilisearch server"""
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(SimpleMeilisearchEngine, cls).__new__(cls)
-        return cls._instance
+    name = "meilisearch"
     
     def __init__(self):
-        # Only initialize once
-        if not self._initialized:
-            self.client = None
-            self.index = None
-            self.products = []
-            
-            # Initialize Meilisearch client
-            self._setup_client()
-            
-            # Load products data
-            self._load_products()
-            
-            self._initialized = True
-    
-    def _setup_client(self):
-        """Setup Meilisearch client"""
-        if not MEILISEARCH_AVAILABLE:
-            logger.warning("Meilisearch not available, using fallback")
-            return
-        
-        try:
-            if MEILISEARCH_CONFIG["api_key"]:
-                self.client = meilisearch.Client(
-                    url=MEILISEARCH_CONFIG["url"],
-                    api_key=MEILISEARCH_CONFIG["api_key"],
-                    timeout=MEILISEARCH_CONFIG["timeout"]
-                )
-            else:
-                # No API key for development
-                self.client = meilisearch.Client(
-                    url=MEILISEARCH_CONFIG["url"],
-                    timeout=MEILISEARCH_CONFIG["timeout"]
-                )
-            
-            # Get or create index
-            self.index = self.client.index(MEILISEARCH_CONFIG["index_name"])
-            logger.info("✅ Meilisearch client initialized")
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Meilisearch: {e}")
-            self.client = None
-            self.index = None
-    
-    def _load_products(self):
-        """Load products from JSON file"""
-        try:
-            if MERGED_PRODUCTS_FILE.exists():
-                with open(MERGED_PRODUCTS_FILE, 'r', encoding='utf-8') as f:
-                    self.products = json.load(f)
-                logger.info(f"✅ Loaded {len(self.products)} products from file")
-            else:
-                logger.warning(f"Products file not found: {MERGED_PRODUCTS_FILE}")
-                self.products = []
-        except Exception as e:
-            logger.error(f"❌ Failed to load products: {e}")
-            self.products = []
-    
-    def search(self, query: str, limit: int = 20, enhanced_filters: Optional[Dict] = None) -> List[Dict[str, Any]]:
-        """Search products using Meilisearch or fallback"""
-        
-        # Try Meilisearch first
-        if self.client and self.index:
-            try:
-                return self._meilisearch_search(query, limit, enhanced_filters)
-            except Exception as e:
-                logger.warning(f"Meilisearch failed: {e}, using fallback")
+        if MEILISEARCH_CONFIG["api_key"]:
+            self.client = meilisearch.Client(
+                url=MEILISEARCH_CONFIG["url"],
+                api_key=MEILISEARCH_CONFIG["api_key"],
+                timeout=MEILISEARCH_CONFIG["timeout"]
+            )
+        else:
+            # No API key for development
+            self.client = meilisearch.Client(
+                url=MEILISEARCH_CONFIG["url"],
+                timeout=MEILISEARCH_CONFIG["timeout"]
+            )
         
-        # Fallback to simple text search
-        return self._fallback_search(query, limit)
+        # Get or create index
+        self.index = self.client.index(MEILISEARCH_CONFIG["index_name"])
     
-    def _meilisearch_search(self, query: str, limit: int, enhanced_filters: Optional[Dict]) -> List[Dict[str, Any]]:
+    def search(self, query: str, limit: int, offset: int, enhanced_filters: Optional[Dict],
+               sort_spec: Optional[tuple]) -> Dict[str, Any]:
         """Search using Meilisearch"""
         
         search_params = {
             "q": query,
             "limit": limit,
+            "offset": offset,
             "attributesToRetrieve": ["*"]
         }
         
+        # Push the sort down to Meilisearch sortable attributes
+        if sort_spec:
+            attribute, _, descending = sort_spec
+            search_params["sort"] = [f"{attribute}:{'desc' if descending else 'asc'}"]
+        
         # Add filters
         if enhanced_filters:
             filter_conditions = []
@@ -122,65 +94,62 @@ class SimpleMeilisearchEngine:
                 filter_conditions.append(f"price.current >= {enhanced_filters['price_min']}")
             if enhanced_filters.get("brand"):
                 filter_conditions.append(f"brand = '{enhanced_filters['brand']}'")
-            if enhanced_filters.get("battery_min"):
-                filter_conditions.append(f"specs.battery >= {enhanced_filters['battery_min']}")
-            if enhanced_filters.get("camera_min"):
-                filter_conditions.append(f"specs.camera >= {enhanced_filters['camera_min']}")
-            if enhanced_filters.get("storage_min"):
-                # Extract numeric value from storage string (e.g., "256GB" -> 256)
-                storage_min = enhanced_filters["storage_min"]
-                if isinstance(storage_min, str):
-                    storage_min = int(storage_min.replace("GB", "").replace("gb", ""))
-                filter_conditions.append(f"specs.storage >= {storage_min}")
+            if enhanced_filters.get("category"):
+                filter_conditions.append(f"category = '{enhanced_filters['category']}'")
+            if enhanced_filters.get("availability"):
+                filter_conditions.append(f"availability = '{enhanced_filters['availability']}'")
+            if enhanced_filters.get("in_stock"):
+                filter_conditions.append("availability = 'in_stock'")
+            if enhanced_filters.get(PARTNER_FIELD):
+                value = enhanced_filters[PARTNER_FIELD]
+                partners = [value] if isinstance(value, str) else list(value)
+                # Normalized partner names are indexed as payment_partners
+                filter_conditions.append(
+                    "payment_partners IN [" + ", ".join(f"'{normalize_text(str(p))}'" for p in partners) + "]"
+                )
+            if enhanced_filters.get(REGION_FIELD):
+                value = enhanced_filters[REGION_FIELD]
+                regions = [value] if isinstance(value, str) else list(value)
+                # Region keys are precomputed per product as regions_in_stock
+                directory = store_directory()
+                filter_conditions.append(
+                    "regions_in_stock IN [" + ", ".join(f"'{directory.region_key(r)}'" for r in regions) + "]"
+                )
+            
+            # Numeric specs are flattened into specs_numeric at index time
+            for key, (column, bound, parser) in RANGE_FILTERS.items():
+                if key.startswith("price") or not enhanced_filters.get(key):
+                    continue
+                value = parser(enhanced_filters[key])
+                if value is not None:
+                    operator = ">=" if bound == "min" else "<="
+                    filter_conditions.append(f"specs_numeric.{column} {operator} {value}")
             
             if filter_conditions:
                 search_params["filter"] = " AND ".join(filter_conditions)
         
         # Execute search
         results = self.index.search(query, search_params)
-        
-        # Return hits
-        return results.get("hits", [])
+        hits = results.get("hits", [])
+        return {"hits": hits, "total": results.get("estimatedTotalHits", offset + len(hits))}
     
-    def _fallback_search(self, query: str, limit: int) -> List[Dict[str, Any]]:
-        """Simple text-based fallback search"""
-        
-        if not self.products:
-            return []
-        
-        query_lower = query.lower()
-        results = []
-        
-        for product in self.products:
-            score = 0
-            name = product.get("name", "").lower()
-            brand = product.get("brand", "").lower()
-            
-            # Score based on name and brand matches
-            if query_lower in name:
-                score += 10
-            if query_lower in brand:
-                score += 8
-            
-            # Check specs
-            specs = product.get("specs", {})
-            for spec_value in specs.values():
-                if isinstance(spec_value, str) and query_lower in spec_value.lower():
-                    score += 3
-            
-            if score > 0:
-                product["_score"] = score
-                results.append(product)
-        
-        # Sort by score and return top results
-        results.sort(key=lambda x: x.get("_score", 0), reverse=True)
-        return results[:limit]
+    def update_reviews(self, products: List[Dict[str, Any]]):
+        """Partial document updates: the reviews object and the specs_numeric it feeds"""
+        documents = [
+            {
+                "id": product["id"],
+                "reviews": product.get("reviews") or {},
+                "specs_numeric": {
+                    field: value for field, value in numeric_specs(product).items() if not math.isnan(value)
+                }
+            }
+            for product in products if product.get("id")
+        ]
+        if documents:
+            self.index.update_documents(documents)
     
     def health_check(self) -> Dict[str, Any]:
         """Check Meilisearch health"""
-        if not self.client:
-            return {"status": "unavailable", "message": "Meilisearch client not initialized"}
-        
         try:
             # Try to get index stats
             stats = self.index.get_stats()
@@ -194,9 +163,600 @@ class SimpleMeilisearchEngine:
                 "status": "error", 
                 "message": f"Meilisearch error: {str(e)}"
             }
+
+
+def create_backend(name: str) -> Optional[SearchBackend]:
+    """The configured full-text backend, or None to search the local indexes only"""
+    try:
+        if name == "meilisearch":
+            if not MEILISEARCH_AVAILABLE:
+                logger.warning("Meilisearch not available, using fallback")
+                return None
+            backend = MeilisearchBackend()
+        elif name == "sqlite":
+            backend = SQLiteSearchBackend(SEARCH_BACKEND_CONFIG["sqlite_path"])
+        else:
+            return None
+    except Exception as e:
+        logger.error(f"❌ Failed to initialize {name} backend: {e}")
+        return None
+    logger.info(f"✅ {name} search backend initialized")
+    return backend
+
+class SimpleMeilisearchEngine:
+    """Simple search engine using Meilisearch"""
+    
+    _instance = None
+    _initialized = False
+    _init_lock = threading.Lock()
+    
+    def __new__(cls):
+        with cls._init_lock:
+            if cls._instance is None:
+                cls._instance = super(SimpleMeilisearchEngine, cls).__new__(cls)
+            return cls._instance
+    
+    def __init__(self):
+        # Only initialize once; a request arriving during warmup waits for it
+        with self._init_lock:
+            if self._initialized:
+                return
+            self.backend: Optional[SearchBackend] = None
+            self._current = CatalogGeneration(None, None, 0, "empty")
+            self._reload_lock = threading.Lock()
+            self._watcher = None
+            self._review_watcher = None
+            self.reloads = 0
+            self._ranked_results = RankedResultCache(PAGINATION_CONFIG["cache_size"])
+            self._backend_pages = RankedResultCache(ADMISSION_CONFIG["page_cache_size"])
+            self.admission = AdmissionController(
+                ADMISSION_CONFIG["max_concurrent"], ADMISSION_CONFIG["max_queue"], ADMISSION_CONFIG["queue_timeout"]
+            )
+            
+            # Initialize the full-text backend (Meilisearch unless configured otherwise)
+            self.backend = create_backend(SEARCH_BACKEND_CONFIG["backend"])
+            
+            # Running review aggregates, applied on top of every catalog generation
+            self.reviews = None
+            if REVIEW_CONFIG["enabled"]:
+                self.reviews = ReviewAggregator.load(
+                    REVIEW_CONFIG["state_file"], REVIEW_CONFIG["half_life_days"],
+                    REVIEW_CONFIG["snippets"], REVIEW_CONFIG["snippet_chars"]
+                )
+            
+            # Attach the shared store, load the prebuilt snapshot, or parse products and build indexes
+            self._load_catalog()
+            review_marker = self._review_marker()
+            if self.reviews:
+                self.refresh_reviews()
+            
+            # search_products payloads materialized by index_products.py for this catalog
+            self.head_queries = HeadQuerySidecar(HEAD_QUERY_CONFIG["file"]) if HEAD_QUERY_CONFIG["enabled"] else None
+            
+            if RELOAD_CONFIG["enabled"]:
+                self._watcher = CatalogWatcher(
+                    self._source_marker, self.reload_catalog, self._current.marker, RELOAD_CONFIG["poll_interval"]
+                )
+                self._watcher.start()
+                if self.reviews:
+                    self._review_watcher = CatalogWatcher(
+                        self._review_marker, self.refresh_reviews, review_marker, RELOAD_CONFIG["poll_interval"], "reviews"
+                    )
+                    self._review_watcher.start()
+            
+            self._initialized = True
+    
+    # The current generation; request paths take one reference and use it throughout
+    @property
+    def catalog(self) -> Optional[CatalogIndex]:
+        return self._current.catalog
+    
+    @property
+    def products(self) -> List[Dict[str, Any]]:
+        return self._current.products
+    
+    @property
+    def index_version(self) -> Optional[str]:
+        return self._current.index_version
+    
+    @property
+    def generation(self) -> int:
+        return self._current.generation
+    
+    def _load_products(self) -> List[Dict[str, Any]]:
+        """Load and validate products from JSON file
+        
+        Validates in-process: the watcher thread must not fork a pool from a
+        threaded server. index_products.py validates on every core instead.
+        """
+        if not MERGED_PRODUCTS_FILE.exists():
+            logger.warning(f"Products file not found: {MERGED_PRODUCTS_FILE}")
+            return []
+        products = load_catalog(MERGED_PRODUCTS_FILE, workers=1)
+        logger.info(f"✅ Loaded {len(products)} products from file")
+        return products
+    
+    def _source_marker(self) -> Optional[str]:
+        """Identifies the catalog source: the shared store's generation, else the products file"""
+        if SHARED_CATALOG_CONFIG["enabled"]:
+            generation = current_generation(SHARED_CATALOG_CONFIG["directory"])
+            if generation is not None:
+                return f"g{generation}"
+        return source_fingerprint(MERGED_PRODUCTS_FILE)
+    
+    def _load_generation(self) -> CatalogGeneration:
+        """Attach the shared catalog, else use the index snapshot, else build from JSON
+        
+        Runs without touching the current generation, so the watcher can call it
+        while requests are served.
+        """
+        start = time.perf_counter()
+        number = self._current.generation + 1
+        
+        if SHARED_CATALOG_CONFIG["enabled"]:
+            attached = attach_catalog(SHARED_CATALOG_CONFIG["directory"])
+            if attached is not None:
+                number, fingerprint, catalog = attached
+                return CatalogGeneration(catalog, f"g{number}-{fingerprint}", number, "shared",
+                                         f"g{number}", (time.perf_counter() - start) * 1000)
+        
+        # Cursors and cached rankings are only valid for the catalog they came from
+        fingerprint = source_fingerprint(MERGED_PRODUCTS_FILE)
+        catalog = load_snapshot(STARTUP_CONFIG["snapshot_file"], fingerprint)
+        source = "snapshot"
+        if catalog is None:
+            catalog = CatalogIndex(self._load_products())
+            source = "json"
+        return CatalogGeneration(catalog, fingerprint, number, source,
+                                 fingerprint, (time.perf_counter() - start) * 1000)
+    
+    def _review_marker(self) -> Optional[str]:
+        return source_fingerprint(REVIEW_CONFIG["file"])
+    
+    def _with_reviews(self, loaded: CatalogGeneration, product_ids=None) -> CatalogGeneration:
+        """loaded with the review aggregates applied to every reviewed product (or just product_ids)
+        
+        The index version gains the aggregates' version, so cursors, cached rankings and
+        working sets from before the update are not mixed with the new ratings.
+        """
+        catalog = loaded.catalog
+        if not self.reviews or not catalog or not self.reviews.aggregates:
+            return loaded
+        updated = {}
+        for product_id in (self.reviews.aggregates if product_ids is None else product_ids):
+            row = catalog.row_of(product_id)
+            if row is not None:
+                updated[row] = self.reviews.apply(catalog.products[row], product_id)
+        if not updated:
+            return loaded
+        # Strip the suffix of an earlier review update before adding the current one
+        base_version = (loaded.index_version or "").split("+r")[0]
+        return replace(loaded, catalog=catalog.with_products(updated),
+                       index_version=f"{base_version}+r{self.reviews.version}")
+    
+    def refresh_reviews(self) -> bool:
+        """Apply new and edited reviews to the current generation; True if a product's reviews changed
+        
+        Only the changed products are touched: their aggregates are updated in place, their rows
+        replaced in a copy of the catalog, and the backend gets partial document updates.
+        """
+        with self._reload_lock:
+            try:
+                changed = self.reviews.ingest(read_reviews(REVIEW_CONFIG["file"]))
+            except Exception as e:
+                logger.warning(f"⚠️ Could not read reviews, keeping the current aggregates: {e}")
+                return False
+            if not changed:
+                return False
+            try:
+                self.reviews.save(REVIEW_CONFIG["state_file"])
+            except OSError as e:
+                logger.warning(f"Could not save review aggregates: {e}")
+            
+            current = self._current
+            updated = self._with_reviews(current, changed)
+            if updated is current:
+                logger.info(f"Reviews for {len(changed)} products not in the catalog")
+                return False
+            self._swap(updated)
+            
+            products = [product for product in (updated.catalog.get(pid) for pid in changed) if product]
+            if self.backend and products:
+                try:
+                    self.backend.update_reviews(products)
+                except Exception as e:
+                    logger.warning(f"{self.backend.name} review update failed: {e}")
+            logger.info(f"✅ Applied reviews to {len(products)} products (review version {self.reviews.version})")
+            return True
+    
+    def _load_catalog(self):
+        """Initial load; an unreadable catalog leaves the engine empty rather than failing"""
+        try:
+            self._swap(self._with_reviews(self._load_generation()))
+        except Exception as e:
+            logger.error(f"❌ Failed to load catalog: {e}")
+    
+    def _swap(self, loaded: CatalogGeneration):
+        # One reference assignment: in-flight requests keep the generation they started with
+        self._current = loaded
+        self._ranked_results.clear()
+        self._backend_pages.clear()
+        logger.info(f"✅ Catalog generation {loaded.generation} ({loaded.source}): "
+                    f"{len(loaded.products)} products in {loaded.load_ms:.0f}ms")
+    
+    def reload_catalog(self) -> bool:
+        """Load the catalog source again and swap it in; on failure the old generation stays"""
+        with self._reload_lock:
+            try:
+                loaded = self._with_reviews(self._load_generation())
+            except Exception as e:
+                logger.warning(f"⚠️ Catalog reload failed, keeping generation {self.generation}: {e}")
+                return False
+            if loaded.index_version == self.index_version:
+                return False
+            if self.products and not loaded.products:
+                logger.warning(f"⚠️ Reloaded catalog is empty, keeping generation {self.generation}")
+                return False
+            self._swap(loaded)
+            self.reloads += 1
+            return True
+    
+    def catalog_status(self) -> Dict[str, Any]:
+        """Current generation, its source and how long it took to load"""
+        status = self._current.status()
+        status["reloads"] = self.reloads
+        status["watching"] = self._watcher is not None
+        if self.reviews:
+            status["reviews"] = {
+                "products": len(self.reviews.aggregates),
+                "reviews": len(self.reviews.applied),
+                "version": self.reviews.version
+            }
+        return status
+    
+    def search(self, query: str, limit: int = 20, enhanced_filters: Optional[Dict] = None, sort: Optional[str] = None,
+               tool: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search products using the full-text backend or fallback, fused with local vector hits
+        
+        sort is one of SEARCH_CONFIG["sort_options"] (e.g. "price.current:asc"); exactly
+        `limit` hits are requested from the backend.
+        """
+        return self.search_page(query, limit, enhanced_filters, sort, tool=tool)["hits"]
+    
+    def search_page(self, query: str, limit: int = 20, enhanced_filters: Optional[Dict] = None,
+                    sort: Optional[str] = None, offset: int = 0, exclude_ids: Optional[List[str]] = None,
+                    tool: Optional[str] = None) -> Dict[str, Any]:
+        """One page of results starting at offset
+        
+        Returns {"hits", "total", "next_offset", "exclude_ids", "source", "cache"}; pass
+        next_offset and exclude_ids back in to get the following page without repeating
+        hits. source is the backend that answered ("local" for the fallback), cache is
+        "hit"/"miss" when a cached ranking or page was used, and "shed" gives the reason
+        when admission control kept the request off a saturated backend. tool names the
+        caller in the query log.
+        """
+        started = time.perf_counter()
+        current = self._current
+        page = self._search_page(current, query, limit, enhanced_filters, sort, offset, exclude_ids)
+        if query_log:
+            query_log.record("search_page", tool, query, enhanced_filters, sort, limit, offset, exclude_ids,
+                             current.index_version, page, (time.perf_counter() - started) * 1000)
+        return page
+    
+    def _search_page(self, current: CatalogGeneration, query: str, limit: int, enhanced_filters: Optional[Dict],
+                     sort: Optional[str], offset: int, exclude_ids: Optional[List[str]]) -> Dict[str, Any]:
+        sort_spec = parse_sort(sort)
+        if sort and not sort_spec:
+            logger.warning(f"Unsupported sort '{sort}', using relevance")
+        
+        # Try the full-text backend first, if it has room for another request
+        shed = None
+        if self.backend:
+            page_key = (current.index_version, results_key(query, enhanced_filters, sort_spec),
+                        limit, offset, tuple(exclude_ids or ()))
+            with self.admission.admit() as shed:
+                if not shed:
+                    try:
+                        page = self._backend_page(current, query, limit, offset, enhanced_filters, sort_spec, exclude_ids)
+                        self._backend_pages.put(page_key, page)
+                        return dict(page, source=self.backend.name)
+                    except Exception as e:
+                        logger.warning(f"{self.backend.name} search failed: {e}, using fallback")
+            
+            # Shed: the same page served earlier keeps the backend's ranking and cursor
+            cached = self._backend_pages.get(page_key) if shed else None
+            if cached is not None:
+                return dict(cached, source=self.backend.name, cache="hit", shed=shed)
+        
+        # Fallback to the local indexes
+        page = self._local_page(current, query, limit, offset, enhanced_filters, sort_spec)
+        page["source"] = "local"
+        if shed:
+            page["shed"] = shed
+        return page
+    
+    def faceted_search(self, query: str, limit: int = 20, enhanced_filters: Optional[Dict] = None,
+                       sort: Optional[str] = None, offset: int = 0, exclude_ids: Optional[List[str]] = None,
+                       tool: Optional[str] = None) -> Dict[str, Any]:
+        """search_page plus total count and facet distributions from the local bitmap index"""
+        started = time.perf_counter()
+        current = self._current
+        page = self._search_page(current, query, limit, enhanced_filters, sort, offset, exclude_ids)
+        catalog = current.catalog
+        if not catalog:
+            page["facets"] = {}
+        else:
+            mask = catalog.match_mask(query, catalog.filter_mask(enhanced_filters))
+            page["total"] = int(mask.sum())
+            page["facets"] = catalog.filter_index.facets(mask)
+        if query_log:
+            query_log.record("faceted_search", tool, query, enhanced_filters, sort, limit, offset, exclude_ids,
+                             current.index_version, page, (time.perf_counter() - started) * 1000)
+        return page
+    
+    def materialized(self, keywords: str, limit: int, tool: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Index-time {"payload", "summary"} of a plain search_products query, if built for this catalog"""
+        if not self.head_queries:
+            return None
+        started = time.perf_counter()
+        current = self._current
+        entry = self.head_queries.lookup(keywords, limit, current.index_version)
+        if entry is not None and query_log:
+            products = entry["payload"]["products"]
+            query_log.record("materialized", tool, keywords, None, None, limit, 0, None, current.index_version,
+                             {"hits": products, "total": len(products), "source": "materialized"},
+                             (time.perf_counter() - started) * 1000)
+        return entry
+    
+    def suggest(self, text: str, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Typeahead completions for the end of a chat input, from the current catalog's suggest index"""
+        started = time.perf_counter()
+        current = self._current
+        index = current.catalog.suggest_index if current.catalog else None
+        result = index.suggest(text, limit or SUGGEST_CONFIG["limit"], SUGGEST_CONFIG["max_words"]) if index else None
+        result = result or {"replace_words": 0, "suggestions": []}
+        result["index_version"] = current.index_version
+        result["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+    
+    def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Direct ID/SKU lookup in the local ID index"""
+        catalog = self.catalog
+        if not catalog:
+            return None
+        return catalog.get(product_id)
+    
+    def lookup_mentioned_products(self, query: str, tool: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Products of the single model named in the query (e.g. "S25 Ultra"), skipping ranked search"""
+        started = time.perf_counter()
+        current = self._current
+        products = current.catalog.mentioned_products(query) if current.catalog else []
+        if query_log:
+            query_log.record("lookup", tool, query, None, None, 0, 0, None, current.index_version,
+                             {"hits": products, "total": len(products), "source": "local"},
+                             (time.perf_counter() - started) * 1000)
+        return products
+    
+    def find_product(self, identifier: str, tool: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Resolve an ID, SKU or unambiguous product name to one product"""
+        product = self.get_product(identifier)
+        if product is None:
+            mentioned = self.lookup_mentioned_products(identifier, tool)
+            if len(mentioned) == 1:
+                product = mentioned[0]
+        return product
+    
+    def compare_specs(self, products: List[Dict[str, Any]], weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Per-spec winners and weighted value scores for products from the catalog
+        
+        Returns {"winners": {field: (index into products, value)}, "scores": [0-1 or None]};
+        products not in the local catalog get no score and never win.
+        """
+        catalog = self.catalog
+        rows = [catalog.row_of(product.get("id")) for product in products] if catalog else []
+        known = [i for i, row in enumerate(rows) if row is not None]
+        if not known:
+            return {"winners": {}, "scores": [None] * len(products)}
+        
+        matrix = catalog.spec_matrix
+        known_rows = np.array([rows[i] for i in known])
+        winners = {
+            field: (known[position], float(matrix.values[known_rows[position], matrix.fields.index(field)]))
+            for field, position in matrix.winners(known_rows).items()
+        }
+        scores = [None] * len(products)
+        for i, score in zip(known, matrix.value_scores(weights or COMPARE_CONFIG["value_weights"], known_rows)):
+            scores[i] = float(score)
+        return {"winners": winners, "scores": scores}
+    
+    def rank_by_value(self, weights: Optional[Dict[str, float]] = None, limit: int = 5, query: str = "",
+                      enhanced_filters: Optional[Dict] = None) -> Dict[str, Any]:
+        """Best products in the whole catalog for the weights, within the filters and query
+        
+        Returns {"hits", "scores", "total"} where total counts the ranked candidates.
+        """
+        catalog = self.catalog
+        if not catalog or not len(catalog):
+            return {"hits": [], "scores": [], "total": 0}
+        
+        mask = catalog.filter_mask(enhanced_filters)
+        if query:
+            mask = catalog.match_mask(query, mask)
+        rows, scores = catalog.spec_matrix.rank(weights or COMPARE_CONFIG["value_weights"], mask, limit)
+        return {
+            "hits": [catalog.products[row] for row in rows],
+            "scores": [float(score) for score in scores],
+            "total": int(mask.sum())
+        }
+    
+    def similar_products(self, product_id: str, limit: int = 5, cheaper: bool = False, same_brand: bool = False,
+                         in_stock: bool = False) -> Dict[str, Any]:
+        """Nearest neighbors of a product from the precomputed lists, filtered
+        
+        Returns {"product", "hits", "distances"}; product is None for an unknown id.
+        """
+        catalog = self.catalog
+        row = catalog.row_of(product_id) if catalog else None
+        if row is None or not catalog.similar_index:
+            return {"product": None if row is None else catalog.products[row], "hits": [], "distances": []}
+        
+        rows, distances = catalog.similar_index.neighbors(row)
+        keep = np.ones(len(rows), dtype=bool)
+        if cheaper:
+            prices = catalog.spec_matrix.values[:, catalog.spec_matrix.fields.index("price")]
+            keep &= prices[rows] < prices[row]
+        if same_brand:
+            keep &= catalog.similar_index.brands[rows] == catalog.similar_index.brands[row]
+        if in_stock:
+            keep &= catalog.filter_mask({"in_stock": True})[rows]
+        rows, distances = rows[keep][:limit], distances[keep][:limit]
+        return {
+            "product": catalog.products[row],
+            "hits": [catalog.products[neighbor] for neighbor in rows],
+            "distances": [float(distance) for distance in distances]
+        }
+    
+    def _backend_page(self, current: CatalogGeneration, query: str, limit: int, offset: int,
+                      enhanced_filters: Optional[Dict], sort_spec: Optional[tuple],
+                      exclude_ids: Optional[List[str]]) -> Dict[str, Any]:
+        """One backend page; the first relevance page is fused with local vector hits"""
+        results = self.backend.search(query, limit, offset, enhanced_filters, sort_spec)
+        hits = results["hits"]
+        total = results["total"]
+        
+        # Serve the validated catalog row for each hit; backend documents are raw and may lag
+        catalog = current.catalog
+        if catalog:
+            hits = [catalog.get(hit.get("id")) or hit for hit in hits]
+        next_offset = offset + len(hits)
+        
+        # Hits already shown on the fused first page stay excluded until the backend reaches them
+        pending = []
+        if exclude_ids:
+            raw_ids = {hit.get("id") for hit in hits}
+            pending = [product_id for product_id in exclude_ids if product_id not in raw_ids]
+            hits = [hit for hit in hits if hit.get("id") not in exclude_ids]
+        
+        if offset > 0 or sort_spec or not catalog:
+            return {"hits": hits, "total": total, "next_offset": next_offset, "exclude_ids": pending}
+        
+        # Fusion may push some backend hits off this page: resume after the longest
+        # run that was kept, and skip the later ones that were shown here
+        mask = catalog.filter_mask(enhanced_filters) if enhanced_filters else None
+        fused = fuse_results(hits, catalog.vector_search(query, mask=mask), limit)
+        shown = [hit.get("id") for hit in fused]
+        kept = 0
+        while kept < len(hits) and hits[kept].get("id") in shown:
+            kept += 1
+        prefix = {hit.get("id") for hit in hits[:kept]}
+        return {
+            "hits": fused,
+            "total": total,
+            "next_offset": kept,
+            "exclude_ids": [product_id for product_id in shown if product_id not in prefix]
+        }
+    
+    def _local_page(self, current: CatalogGeneration, query: str, limit: int, offset: int,
+                    enhanced_filters: Optional[Dict], sort_spec: Optional[tuple]) -> Dict[str, Any]:
+        """One page from the local indexes; deeper pages slice a cached ranking"""
+        catalog = current.catalog
+        if not catalog or not len(catalog.products):
+            return {"hits": [], "total": 0, "next_offset": offset, "exclude_ids": []}
+        
+        # First sorted page: partial top-k over the numeric column, no full ordering;
+        # without keywords the filter bitmap is the candidate set as is
+        if sort_spec and offset == 0:
+            _, column, descending = sort_spec
+            rows = np.flatnonzero(catalog.match_mask(query, catalog.filter_mask(enhanced_filters)))
+            hits = [catalog.products[row] for row in catalog.filter_index.top_k(rows, column, descending, limit)]
+            return {"hits": hits, "total": len(rows), "next_offset": len(hits), "exclude_ids": []}
+        
+        ranking, cached = self._local_ranking(current, query, enhanced_filters, sort_spec)
+        # Only the rows of this page are decoded
+        hits = [catalog.products[row] for row in ranking[offset:offset + limit]]
+        return {"hits": hits, "total": len(ranking), "next_offset": offset + len(hits), "exclude_ids": [],
+                "cache": "hit" if cached else "miss"}
+    
+    def _local_ranking(self, current: CatalogGeneration, query: str, enhanced_filters: Optional[Dict],
+                       sort_spec: Optional[tuple]) -> Tuple[np.ndarray, bool]:
+        """Rows of every local match in result order, cached per index version; (rows, from cache)"""
+        key = (current.index_version, results_key(query, enhanced_filters, sort_spec))
+        ranking = self._ranked_results.get(key)
+        if ranking is not None:
+            return ranking, True
+        
+        catalog = current.catalog
+        if sort_spec:
+            _, column, descending = sort_spec
+            rows = np.flatnonzero(catalog.match_mask(query, catalog.filter_mask(enhanced_filters)))
+            ranking = catalog.filter_index.top_k(rows, column, descending, len(rows))
+        elif not query.strip():
+            # Filters only: nothing to rank by relevance, so no text scan; catalog order
+            ranking = np.flatnonzero(catalog.filter_mask(enhanced_filters))
+        else:
+            mask = catalog.filter_mask(enhanced_filters) if enhanced_filters else None
+            # Fuse with vector hits that pass the same filters
+            ranking = fuse_rows(catalog.lexical_rows(query, mask), catalog.vector_rows(query, mask=mask))
+        
+        self._ranked_results.put(key, ranking)
+        return ranking, False
+    
+    def health_check(self) -> Dict[str, Any]:
+        """Check the search backend and report the loaded catalog generation"""
+        if not self.backend:
+            status = {"status": "unavailable", "message": "Search backend not initialized"}
+        else:
+            status = self.backend.health_check()
+            status["backend"] = self.backend.name
+            status["admission"] = self.admission.stats()
+        status["catalog"] = self.catalog_status()
+        if query_log:
+            status["query_log"] = query_log.stats()
+        if self.head_queries:
+            status["head_queries"] = self.head_queries.status()
+        return status
     
     @classmethod
     def reset_instance(cls):
         """Reset singleton instance (for testing)"""
+        if cls._instance is not None and cls._initialized:
+            for watcher in (cls._instance._watcher, cls._instance._review_watcher):
+                if watcher:
+                    watcher.stop()
         cls._instance = None
         cls._initialized = False
+
+
+def warmup_search_engine() -> Dict[str, float]:
+    """Build the engine and exercise the local indexes before the first request
+    
+    The backend health check runs in a background thread so an unreachable
+    server cannot hold up startup. Returns the timings in milliseconds.
+    """
+    timings = {}
+    
+    start = time.perf_counter()
+    engine = SimpleMeilisearchEngine()
+    timings["engine_ms"] = (time.perf_counter() - start) * 1000
+    
+    # First queries pay for lazy allocations in the vector, entity and filter indexes
+    start = time.perf_counter()
+    catalog = engine.catalog
+    if catalog:
+        for query in STARTUP_CONFIG["warmup_queries"]:
+            catalog.vector_search(query)
+            catalog.mentioned_products(query)
+            engine.suggest(query)
+        catalog.filter_index.facets(catalog.filter_mask({"in_stock": True}))
+    timings["queries_ms"] = (time.perf_counter() - start) * 1000
+    
+    if engine.backend:
+        def ping():
+            started = time.perf_counter()
+            status = engine.health_check()["status"]
+            logger.info(f"{engine.backend.name} warmup: {status} in {(time.perf_counter() - started) * 1000:.0f}ms")
+        threading.Thread(target=ping, name="search-backend-warmup", daemon=True).start()
+    
+    logger.info(f"✅ Search engine warm: build {timings['engine_ms']:.0f}ms, "
+                f"first queries {timings['queries_ms']:.1f}ms, {len(engine.products)} products")
+    return timings
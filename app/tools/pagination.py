@@ -0,0 +1,58 @@
+"""
+Search Pagination for DDV Product Advisor
+Opaque next-page cursors and a small LRU of ranked local results
+"""
+
+import base64
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Hashable
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Encode query, filters, sort, offset and index version as an opaque token"""
+    raw = json.dumps(state, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Dict[str, Any]]:
+    """Decode a cursor from encode_cursor, or None if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, UnicodeError):
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def results_key(query: str, filters: Optional[Dict[str, Any]], sort: Any) -> str:
+    """Canonical cache key for a ranked result list"""
+    return json.dumps([query, filters or {}, sort], ensure_ascii=False, sort_keys=True, default=str)
+
+
+class RankedResultCache:
+    """Thread-safe LRU of ranked result lists, so later pages are a slice"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,209 @@
+"""
+Promotions Parser for DDV Product Advisor
+Typed offers from the free-text Vietnamese promotion strings
+
+    "Giảm 7% tối đa 500.000₫ khi thanh toán qua Kredivo"
+        -> Offer(kind="discount", percent=7.0, cap=500000.0, partner="Kredivo")
+    "Giảm 300K và miễn phí chuyển đổi trả góp 0% kỳ hạn 6 Tháng"
+        -> Offer(kind="discount", amount=300000.0, installment_zero=True)
+    "Mở Thẻ MB JCB KOC – Giảm 1.000.000đ mua iPhone 16 Series"
+        -> Offer(kind="discount", amount=1000000.0, partner="MB JCB KOC", scope="iphone 16", conditional=True)
+
+Each distinct string is parsed once (the same offers repeat across most
+products). product_promotions() drops offers scoped to another product line
+and rolls the rest up into the values numeric_specs() indexes:
+effective_price, promo_discount, trade_in_bonus and installment_zero, plus the
+payment partners behind the payment_partner filter. Only offers every buyer
+gets count towards effective_price and promo_discount; card, wallet, member
+and customer-group offers, and "up to N%" offers, are conditional.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.tools.text_utils import fold_diacritics, normalize_text, tokenize
+
+# promotions key -> offer kind
+OFFER_KINDS = {
+    "special_discounts": "discount",
+    "vouchers": "voucher",
+    "bundle_offers": "bundle",
+    "free_gifts": "gift",
+}
+
+# Kinds that take money off the phone itself (bundles discount the add-on)
+PHONE_OFFER_KINDS = ("discount", "voucher")
+
+# On diacritic-folded, lowercased text ("đ" -> "d")
+_MONEY = re.compile(r"(?<![\w.,])(\d{1,3}(?:[.,]\d{3})+|\d+(?:[.,]\d+)?)\s*(trieu|tr\b|k\b|d\b|₫|vnd\b)?")
+_PERCENT = re.compile(r"(?<![\w.,])(\d+(?:[.,]\d+)?)\s*%")
+_INSTALLMENT_ZERO = re.compile(r"tra gop 0\s*%|0\s*% lai|lai suat 0\s*%")
+_TRADE_IN = re.compile(r"thu cu|len doi")
+# The discount is on something bought with the phone ("khi mua AirPods", "giá gói VieON khi mua kèm máy",
+# "Miếng dán bảo vệ máy giảm ngay 10%")
+_ADD_ON = re.compile(
+    r"mua kem|mua cung|khi mua|gia goi|mieng dan|dan man hinh|cuong luc|op lung|\bop\b|bao da"
+    r"|\bsac\b|cap sac|tai nghe|phu kien"
+)
+# Only some buyers or variants qualify ("cho thành viên", "HSSV - Tài xế công nghệ", "Chỉ áp dụng cho phiên bản ...")
+_ELIGIBILITY = re.compile(r"thanh vien|member|hssv|hoc sinh|sinh vien|tai xe|chi ap dung")
+# "mua iPhone 16 Series": the product line the offer is limited to, up to a connecting word
+_SCOPE = re.compile(
+    r"(?<!\w)mua\s+([a-z0-9][a-z0-9 ]*?)\s*(?=$|[^a-z0-9 ]|\s(?:tai|qua|khi|bang|voi|tu|den|trong|va)\b)"
+)
+# Words of a scope that do not name the product line
+_SCOPE_FILLER = {"series", "dong", "dien", "thoai", "may", "san", "pham"}
+_DATE = r"(\d{1,2})\.(\d{1,2})(?![\d.,]|\s*(?:trieu|tr\b|k\b))"
+_DATE_RANGE = re.compile(r"(?<![\d.,])" + _DATE + r"\s*-\s*" + _DATE)
+_SINGLE_DAY = re.compile(r"duy nhat\s+" + _DATE)
+
+# Context just before an amount
+_UP_TO = re.compile(r"(?:den|toi)\s*$")
+_CAP = re.compile(r"toi da\s*$")
+_MIN_ORDER = re.compile(r"don hang(?: tu)?\s*$")
+_FIXED_PRICE = re.compile(r"gia chi(?: con| tu)?\s*$|chi con\s*$")
+
+# On the original text: the card, wallet or program after "qua", "bằng", "với" or "thẻ"
+_PARTNER = re.compile(r"(?:qua|bằng|với|[Tt]hẻ)\s+(?:thẻ\s+)?(?:tín dụng\s+)?([A-ZĐ][\w.]*(?:\s+[A-ZĐ][\w.]*)*)")
+
+
+@dataclass(frozen=True)
+class Offer:
+    """One promotion string, parsed"""
+    kind: str
+    text: str
+    amount: Optional[float] = None        # VND off ("đến"/"tới" amounts are upper bounds), or a gift's value
+    percent: Optional[float] = None
+    cap: Optional[float] = None           # "tối đa"
+    min_order: Optional[float] = None     # "đơn hàng (từ)"
+    price: Optional[float] = None         # "giá chỉ (còn/từ)": a fixed price
+    partner: Optional[str] = None         # card, wallet or membership program
+    installment_zero: bool = False
+    trade_in: bool = False
+    add_on: bool = False                  # applies to an accessory or service, not the phone
+    scope: Optional[str] = None           # normalized product line after "mua" ("iphone 16"); None for any phone
+    conditional: bool = False             # only with a card or wallet, for members or a customer group, or "up to"
+    valid_from: Optional[Tuple[int, int]] = None   # (day, month); the strings never give a year
+    valid_to: Optional[Tuple[int, int]] = None
+
+    def savings(self, price: float) -> float:
+        """VND this offer takes off a phone costing price; 0 if it does not apply to the phone"""
+        if self.kind not in PHONE_OFFER_KINDS or self.trade_in or self.add_on or not price > 0:
+            return 0.0
+        if self.min_order and price < self.min_order:
+            return 0.0
+        best = self.amount or 0.0
+        if self.percent:
+            off = price * self.percent / 100
+            best = max(best, min(off, self.cap) if self.cap else off)
+        if self.price and self.price < price:
+            best = max(best, price - self.price)
+        return min(best, price)
+
+
+@dataclass(frozen=True)
+class ProductPromotions:
+    """A product's offers and the values indexed from them"""
+    offers: Tuple[Offer, ...]    # the offers scoped to this product
+    promo_discount: float        # best single unconditional phone offer in VND (offers do not stack)
+    effective_price: float
+    trade_in_bonus: float
+    installment_zero: bool
+    partners: Tuple[str, ...]    # normalized ("kredivo", "d member")
+
+
+def _money(number: str, unit: Optional[str]) -> Optional[float]:
+    if unit in ("trieu", "tr"):
+        return float(number.replace(",", ".")) * 1_000_000
+    grouped = re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", number)
+    value = float(number.replace(".", "").replace(",", "")) if grouped else float(number.replace(",", "."))
+    if unit == "k":
+        return value * 1000
+    # A bare number is money only with thousands separators ("365.000"), not "25W" or "6 tháng"
+    return value if unit or grouped else None
+
+
+def _date(day: str, month: str) -> Optional[Tuple[int, int]]:
+    day, month = int(day), int(month)
+    return (day, month) if 1 <= day <= 31 and 1 <= month <= 12 else None
+
+
+@lru_cache(maxsize=4096)
+def parse_offer(text: str, kind: str) -> Offer:
+    """Typed fields of one promotion string"""
+    folded = fold_diacritics(text)
+    fields: Dict[str, Any] = {}
+
+    for match in _MONEY.finditer(folded):
+        value = _money(match.group(1), match.group(2))
+        if value is None:
+            continue
+        before = folded[max(0, match.start() - 16):match.start()]
+        if _CAP.search(before):
+            fields.setdefault("cap", value)
+        elif _MIN_ORDER.search(before):
+            fields.setdefault("min_order", value)
+        elif _FIXED_PRICE.search(before):
+            fields.setdefault("price", value)
+        else:
+            fields.setdefault("amount", value)
+
+    installment = _INSTALLMENT_ZERO.search(folded)
+    up_to_percent = False
+    for match in _PERCENT.finditer(folded):
+        # The 0% of "trả góp 0%" is a financing term, not a discount
+        if installment and installment.start() <= match.start() < installment.end():
+            continue
+        fields["percent"] = float(match.group(1).replace(",", "."))
+        up_to_percent = bool(_UP_TO.search(folded[max(0, match.start() - 8):match.start()]))
+        break
+
+    partner = _PARTNER.search(text)
+    if partner:
+        fields["partner"] = partner.group(1).strip()
+
+    dates = _DATE_RANGE.search(folded)
+    if dates:
+        fields["valid_from"], fields["valid_to"] = _date(*dates.group(1, 2)), _date(*dates.group(3, 4))
+    else:
+        day = _SINGLE_DAY.search(folded)
+        if day:
+            fields["valid_from"] = fields["valid_to"] = _date(*day.group(1, 2))
+
+    add_on = kind == "bundle" or bool(_ADD_ON.search(folded))
+    scope = _SCOPE.search(folded) if not add_on else None
+    if scope:
+        words = [word for word in normalize_text(scope.group(1)).split() if word not in _SCOPE_FILLER]
+        if words:
+            fields["scope"] = " ".join(words)
+
+    conditional = bool(fields.get("partner")) or up_to_percent or bool(_ELIGIBILITY.search(folded))
+    return Offer(kind=kind, text=text, installment_zero=bool(installment), trade_in=bool(_TRADE_IN.search(folded)),
+                 add_on=add_on, conditional=conditional, **fields)
+
+
+def product_promotions(product: Dict[str, Any]) -> ProductPromotions:
+    """Parse a product's promotions and roll them up"""
+    promotions = product.get("promotions") or {}
+    offers: List[Offer] = []
+    for key, kind in OFFER_KINDS.items():
+        offers.extend(parse_offer(text, kind) for text in promotions.get(key) or () if isinstance(text, str))
+    # "mua iPhone 16 Series" on a Galaxy A56 is another product's offer
+    words = set(tokenize(f"{product.get('name') or ''} {product.get('brand') or ''}"))
+    offers = [offer for offer in offers if not offer.scope or set(offer.scope.split()) <= words]
+
+    # Validated prices are positive ints; a raw backend document may have none
+    current = (product.get("price") or {}).get("current")
+    price = float(current) if isinstance(current, (int, float)) and not isinstance(current, bool) else 0.0
+    promo_discount = max((offer.savings(price) for offer in offers if not offer.conditional), default=0.0)
+    partners = dict.fromkeys(normalize_text(offer.partner) for offer in offers if offer.partner)
+    return ProductPromotions(
+        offers=tuple(offers),
+        promo_discount=promo_discount,
+        effective_price=price - promo_discount,
+        trade_in_bonus=max((offer.amount or 0.0 for offer in offers if offer.trade_in), default=0.0),
+        installment_zero=any(offer.installment_zero for offer in offers),
+        partners=tuple(partner for partner in partners if partner),
+    )
@@ -0,0 +1,161 @@
+"""
+Query Log for DDV Product Advisor
+Compact record of every engine search, for replaying real traffic offline
+
+One NDJSON object per request:
+    {"t", "op", "tool", "q", "f", "s", "l", "o", "x", "v", "backend", "cache", "ms", "hits", "total", "ids"}
+q is the lowercased, whitespace-collapsed keywords, f the filters, s the sort,
+l/o/x the limit, offset and excluded ids, v the index version and ids the
+result ids in order.
+
+record() only puts the object on a bounded queue; a background thread
+serializes and appends in batches, rotating the file at max_bytes
+(queries.ndjson -> queries.ndjson.1 -> ...). When the writer falls behind,
+records are dropped and counted rather than slowing requests down.
+Replay a log with replay_queries.py. Enable with DDV_QUERY_LOG=1.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config_simple import QUERY_LOG_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_keywords(query: str) -> str:
+    """Lowercase and collapse whitespace; diacritics are kept so a replay sends the same query"""
+    return " ".join((query or "").lower().split())
+
+
+def log_files(path: Path) -> List[Path]:
+    """A log and its rotated backups, oldest first"""
+    path = Path(path)
+    rotated = [p for p in path.parent.glob(path.name + ".*") if p.suffix[1:].isdigit()]
+    rotated.sort(key=lambda p: int(p.suffix[1:]), reverse=True)
+    return rotated + ([path] if path.exists() else [])
+
+
+def log_entry(op: str, tool: Optional[str], query: str, enhanced_filters: Optional[Dict], sort: Optional[str],
+              limit: int, offset: int, exclude_ids: Optional[List[str]], index_version: Optional[str],
+              page: Dict[str, Any], ms: float) -> Dict[str, Any]:
+    """The logged object for one request"""
+    entry = {
+        "t": round(time.time(), 3),
+        "op": op,
+        "tool": tool,
+        "q": normalize_keywords(query),
+        "f": dict(enhanced_filters or {}),
+        "s": sort,
+        "l": limit,
+        "o": offset,
+        "v": index_version,
+        "backend": page.get("source"),
+        "cache": page.get("cache"),
+        "ms": round(ms, 3),
+        "hits": len(page.get("hits") or []),
+        "total": page.get("total"),
+        "ids": [hit.get("id") for hit in page.get("hits") or []],
+    }
+    if exclude_ids:
+        entry["x"] = list(exclude_ids)
+    return entry
+
+
+class QueryLog:
+    """Bounded queue in front of a rotating NDJSON file"""
+
+    def __init__(self, path: Path, max_bytes: int, backups: int, flush_interval: float, max_pending: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def record(self, op: str, tool: Optional[str], query: str, enhanced_filters: Optional[Dict], sort: Optional[str],
+               limit: int, offset: int, exclude_ids: Optional[List[str]], index_version: Optional[str],
+               page: Dict[str, Any], ms: float):
+        """Queue one request; never blocks"""
+        entry = log_entry(op, tool, query, enhanced_filters, sort, limit, offset, exclude_ids, index_version, page, ms)
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        # Started on first use, so processes forked after import each get their own writer
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            self._write(self._drain(batch))
+
+    def _drain(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def flush(self):
+        """Write whatever is queued (at exit, or before reading the log)"""
+        batch = self._drain([])
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        data = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in batch).encode("utf-8")
+        with self._write_lock:
+            self._append(data, len(batch))
+
+    def _append(self, data: bytes, count: int):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self.written += count
+        except OSError as e:
+            self.dropped += count
+            logger.warning(f"Could not write query log {self.path}: {e}")
+
+    def _rotate(self):
+        for number in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{number}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{number + 1}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"file": str(self.path), "written": self.written, "dropped": self.dropped, "pending": self._queue.qsize()}
+
+
+query_log = QueryLog(
+    QUERY_LOG_CONFIG["file"], QUERY_LOG_CONFIG["max_bytes"], QUERY_LOG_CONFIG["backups"],
+    QUERY_LOG_CONFIG["flush_interval"], QUERY_LOG_CONFIG["max_pending"]
+) if QUERY_LOG_CONFIG["enabled"] else None
@@ -0,0 +1,69 @@
+"""
+Simple Rank Tool for DDV Product Advisor
+Best-value ranking of the whole catalog against the user's priorities
+"""
+
+from google.adk.tools import ToolContext
+import logging
+from typing import Optional
+
+from app.config_simple import COMPARE_CONFIG
+from app.tools.filter_index import FILTER_KEYS
+from app.tools.meilisearch_simple import SimpleMeilisearchEngine
+from app.tools.formatting import product_card, render_tool_output
+from app.tools.working_set import remember_products
+from app.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+async def rank_products(tool_context: ToolContext, weights: Optional[dict] = None, filters: Optional[dict] = None, keywords: Optional[str] = None, limit: int = 5) -> str:
+    """Find the best-value smartphones in the whole catalog for what the user cares about.
+
+    Args:
+        tool_context (ToolContext): The function context
+        weights (dict, optional): Importance of each spec (e.g. {"battery_mah": 3, "camera_mp": 2, "price": 1}).
+            Keys: price (cheaper is better), discount, rating, battery_mah, ram_gb, storage_gb,
+            camera_mp, screen_inch, refresh_hz, effective_price (price after promotions), promo_discount,
+            trade_in_bonus, installment_zero. Omit for a balanced "best value" ranking.
+        filters (dict, optional): Same filters as search_products (e.g. {"price_max": 10000000, "brand": "Samsung"})
+        keywords (str, optional): Restrict the ranking to products matching these keywords
+        limit (int, optional): Number of products to return (default 5, max 20)
+
+    Returns:
+        str: JSON string with the top products and their value scores
+    """
+    try:
+        logger.info(f"Ranking products: weights={weights}, filters={filters}, keywords={keywords}")
+
+        # Get singleton instance (built at startup by warmup_search_engine)
+        search_engine = SimpleMeilisearchEngine()
+
+        enhanced_filters = {key: value for key, value in (filters or {}).items() if key in FILTER_KEYS}
+        limit = max(1, min(int(limit or COMPARE_CONFIG["rank_limit"]), COMPARE_CONFIG["max_rank_limit"]))
+
+        with tracer.span("engine.rank_by_value", tool_context, limit=limit) as span:
+            ranked = search_engine.rank_by_value(weights, limit, keywords or "", enhanced_filters)
+            span.set(hits=len(ranked["hits"]), total=ranked["total"])
+
+        if not ranked["hits"]:
+            return "Không tìm thấy sản phẩm phù hợp với tiêu chí của bạn. Hãy thử nới lỏng bộ lọc."
+
+        minimal_products = [product_card(product) for product in ranked["hits"]]
+        remember_products(tool_context, minimal_products, search_engine.index_version)
+
+        json_response = {
+            "type": "product-display",
+            "message": f"Top {len(minimal_products)} sản phẩm đáng mua nhất theo tiêu chí của bạn "
+                       f"(trong {ranked['total']} sản phẩm phù hợp)",
+            "value_scores": {
+                card["id"]: round(score * 100) for card, score in zip(minimal_products, ranked["scores"])
+            },
+            "products": minimal_products
+        }
+
+        # Full cards go to the frontend, a compact summary to the model
+        return render_tool_output(json_response, tool_context)
+
+    except Exception as e:
+        logger.error(f"Rank products error: {e}")
+        return f"Lỗi khi xếp hạng sản phẩm: {str(e)}"
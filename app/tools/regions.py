@@ -0,0 +1,141 @@
+"""
+Store Regions for DDV Product Advisor
+Regions where each product is in stock, from its branch list and stores.json
+
+Products embed store_info.branches ({"name", "address", "stock_status"}). A
+branch belongs to the region of the store with that name in stores.json, or
+else to the last part of its address ("..., Quận 10, Hồ Chí Minh"). Regions
+are matched by normalized key, and REGION_CONFIG aliases and the cities in
+stores.json resolve to their region ("hcm" -> ho chi minh, "Biên Hòa" ->
+dong nai). The keys feed the region bitmaps of BitmapFilterIndex, the
+search_regions table of the SQLite backend and the regions_in_stock
+attribute in Meilisearch.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config_simple import REGION_CONFIG
+from app.tools.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def load_stores(path: Path) -> List[Dict[str, Any]]:
+    """Store records from stores.json; empty if the file is missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            stores = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read stores {path}: {e}")
+        return []
+    return [store for store in stores if isinstance(store, dict)] if isinstance(stores, list) else []
+
+
+class StoreDirectory:
+    """Store and city names resolved to region keys"""
+
+    def __init__(self, stores: List[Dict[str, Any]], aliases: Dict[str, List[str]], in_stock_statuses: List[str]):
+        self.in_stock_statuses = tuple(in_stock_statuses)
+        self.store_regions: Dict[str, str] = {}   # normalized store name -> region label
+        self.keys: Dict[str, str] = {}            # normalized region, city or alias -> region key
+        self.labels: Dict[str, str] = {}          # region key -> display label
+        # (name, address, stock_status) -> (region key, label) of an in-stock branch, else None;
+        # catalogs repeat the same few branches on every product
+        self._branch_stock: Dict[Tuple[str, str, str], Optional[Tuple[str, str]]] = {}
+        cities: List[Tuple[str, str]] = []
+        for store in stores:
+            region = store.get("region") or store.get("city")
+            if not isinstance(region, str) or not normalize_text(region):
+                continue
+            key = self._add_region(region)
+            if isinstance(store.get("name"), str):
+                self.store_regions[normalize_text(store["name"])] = region
+            if isinstance(store.get("city"), str) and normalize_text(store["city"]):
+                cities.append((normalize_text(store["city"]), key))
+        for region, names in aliases.items():
+            key = self._add_region(region)
+            for name in names:
+                self.keys[normalize_text(name)] = key
+        # A city never shadows a region of the same name
+        for city, key in cities:
+            self.keys.setdefault(city, key)
+
+    def _add_region(self, label: str) -> str:
+        key = normalize_text(label)
+        self.keys[key] = key
+        self.labels.setdefault(key, label)
+        return key
+
+    def region_key(self, value: Any) -> str:
+        """Region key for a region, city or alias; unknown names are only normalized"""
+        key = normalize_text(str(value))
+        return self.keys.get(key, key)
+
+    def label(self, key: str) -> str:
+        return self.labels.get(key, key)
+
+    def branch_region(self, branch: Dict[str, Any]) -> Optional[str]:
+        """Region label of a branch: its store's region, else the end of its address"""
+        region = self.store_regions.get(normalize_text(branch.get("name") or ""))
+        if region is None:
+            region = (branch.get("address") or "").rsplit(",", 1)[-1].strip() or None
+        return region
+
+    def regions_in_stock(self, product: Dict[str, Any]) -> List[str]:
+        """Keys of the regions with a branch that has the product, in branch order"""
+        return list(self.stock_regions(product))
+
+    def stock_regions(self, product: Dict[str, Any]) -> Dict[str, str]:
+        """Region key -> label for the regions with a branch that has the product, in branch order
+
+        Regions known only from addresses keep their accented spelling as label.
+        """
+        regions: Dict[str, str] = {}
+        for branch in (product.get("store_info") or {}).get("branches") or []:
+            if not isinstance(branch, dict):
+                continue
+            signature = (_text(branch.get("name")), _text(branch.get("address")), _text(branch.get("stock_status")))
+            try:
+                region = self._branch_stock[signature]
+            except KeyError:
+                region = self._branch_stock[signature] = self._stock_region(*signature)
+            if region is not None:
+                regions.setdefault(*region)
+        return regions
+
+    def _stock_region(self, name: str, address: str, stock_status: str) -> Optional[Tuple[str, str]]:
+        if not normalize_text(stock_status).startswith(self.in_stock_statuses):
+            return None
+        region = self.branch_region({"name": name, "address": address})
+        if not region or not normalize_text(region):
+            return None
+        key = self.region_key(region)
+        return key, self.labels.get(key, region)
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else ""
+
+
+_directory: Tuple[Optional[int], Optional[StoreDirectory]] = (None, None)
+
+
+def store_directory() -> StoreDirectory:
+    """The directory for REGION_CONFIG["stores_file"], re-read when the file changes"""
+    global _directory
+    path = REGION_CONFIG["stores_file"]
+    try:
+        marker = os.stat(path).st_mtime_ns
+    except OSError:
+        marker = None
+    cached_marker, directory = _directory
+    if directory is None or cached_marker != marker:
+        directory = StoreDirectory(load_stores(path), REGION_CONFIG["aliases"], REGION_CONFIG["in_stock_statuses"])
+        _directory = (marker, directory)
+    return directory
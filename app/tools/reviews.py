@@ -0,0 +1,231 @@
+"""
+Review Aggregates for DDV Product Advisor
+Running per-product rating aggregates, updated as individual reviews arrive
+
+profiles/reviews.json holds one record per review:
+    {"id", "product_id", "rating", "comment", "created_at", "last_updated_at", ...}
+
+Each record is applied once: ReviewAggregator remembers the last_updated_at it
+applied per review id, so a new review adds to its product's aggregate and an
+edited one replaces its old contribution. Nothing is ever recomputed from all
+reviews; the aggregates are pickled so a restart only applies what changed.
+
+Per product: count, rating sum, a 1-5 histogram, a recency-weighted mean
+(a review half_life_days older counts half as much) and the most helpful
+comment snippets. apply() merges them with the catalog's scraped
+average_rating/rating_count, which stay as the baseline.
+"""
+
+import json
+import logging
+import os
+import pickle
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the pickled aggregate state changes
+STATE_FORMAT = 1
+
+MAX_RATING = 5
+
+# Recency weights are 2 ** (age from this epoch / half-life); only their ratios matter
+RECENCY_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+
+# Snippet candidates kept per product beyond the shown ones, so an edited or
+# removed review does not leave a gap that only a full rescan could fill
+SNIPPET_POOL_FACTOR = 3
+
+
+def parse_time(value: Any) -> Optional[float]:
+    """Epoch seconds of an ISO 8601 timestamp ("2025-08-25T15:52:14Z"), or None"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def helpfulness(record: Dict[str, Any], comment: str) -> Tuple[float, int]:
+    """Sort key for snippets: helpful votes first, then how much the comment says"""
+    votes = record.get("helpful_count", record.get("helpful_votes")) or 0
+    votes = votes if isinstance(votes, (int, float)) and not isinstance(votes, bool) else 0
+    return float(votes), min(len(comment.split()), 50)
+
+
+class ReviewAggregate:
+    """Running totals for one product"""
+
+    def __init__(self):
+        self.count = 0
+        self.rating_sum = 0.0
+        self.histogram = [0] * MAX_RATING
+        self.recency_sum = 0.0
+        self.recency_weight = 0.0
+        self.latest: Optional[float] = None
+        # (helpfulness, review id, snippet, rating), most helpful first
+        self.snippets: List[Tuple[Tuple[float, int], str, str, int]] = []
+
+    def add(self, rating: int, weight: float, timestamp: Optional[float], sign: int = 1):
+        """Add (sign 1) or take back (sign -1) one review's contribution"""
+        self.count += sign
+        self.rating_sum += sign * rating
+        self.histogram[rating - 1] += sign
+        self.recency_sum += sign * weight * rating
+        self.recency_weight += sign * weight
+        if sign > 0 and timestamp is not None:
+            self.latest = max(self.latest or timestamp, timestamp)
+
+    def offer_snippet(self, key: Tuple[float, int], review_id: str, text: str, rating: int, pool: int):
+        self.snippets.append((key, review_id, text, rating))
+        self.snippets.sort(key=lambda snippet: snippet[0], reverse=True)
+        del self.snippets[pool:]
+
+    def drop_snippet(self, review_id: str):
+        self.snippets = [snippet for snippet in self.snippets if snippet[1] != review_id]
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.rating_sum / self.count if self.count > 0 else None
+
+    @property
+    def recent_average(self) -> Optional[float]:
+        return self.recency_sum / self.recency_weight if self.recency_weight > 0 else None
+
+
+class ReviewAggregator:
+    """Aggregates per product id, plus what was applied per review id"""
+
+    def __init__(self, half_life_days: float, snippets: int, snippet_chars: int):
+        self.half_life_days = half_life_days
+        self.snippets = snippets
+        self.snippet_chars = snippet_chars
+        self.aggregates: Dict[str, ReviewAggregate] = {}
+        # review id -> (product id, last_updated_at, rating, recency weight)
+        self.applied: Dict[str, Tuple[str, str, int, float]] = {}
+        self.version = 0  # bumped by every ingest that changed an aggregate
+
+    def _weight(self, timestamp: Optional[float]) -> float:
+        if timestamp is None:
+            return 0.0
+        return 2.0 ** ((timestamp - RECENCY_EPOCH) / (self.half_life_days * 86400))
+
+    def ingest(self, records: Iterable[Dict[str, Any]]) -> Set[str]:
+        """Apply new and edited reviews; returns the product ids whose aggregates changed"""
+        changed: Set[str] = set()
+        skipped = 0
+        for record in records:
+            review_id = str(record.get("id") or "")
+            product_id = str(record.get("product_id") or "")
+            rating = record.get("rating")
+            if not review_id or not product_id or not isinstance(rating, (int, float)) or isinstance(rating, bool) \
+                    or not 1 <= rating <= MAX_RATING:
+                skipped += 1
+                continue
+            rating = int(round(rating))
+            updated_at = str(record.get("last_updated_at") or record.get("created_at") or "")
+
+            previous = self.applied.get(review_id)
+            if previous is not None:
+                if updated_at <= previous[1]:
+                    continue
+                # An edit: take back what the old version contributed
+                old_product, _, old_rating, old_weight = previous
+                old = self.aggregates[old_product]
+                old.add(old_rating, old_weight, None, sign=-1)
+                old.drop_snippet(review_id)
+                changed.add(old_product)
+
+            timestamp = parse_time(record.get("created_at"))
+            weight = self._weight(timestamp)
+            aggregate = self.aggregates.setdefault(product_id, ReviewAggregate())
+            aggregate.add(rating, weight, timestamp)
+            comment = record.get("comment")
+            if isinstance(comment, str) and comment.strip():
+                comment = comment.strip()
+                aggregate.offer_snippet(helpfulness(record, comment), review_id, comment[:self.snippet_chars],
+                                        rating, self.snippets * SNIPPET_POOL_FACTOR)
+            self.applied[review_id] = (product_id, updated_at, rating, weight)
+            changed.add(product_id)
+
+        if skipped:
+            logger.debug(f"Skipped {skipped} review records without an id, product id or 1-{MAX_RATING} rating")
+        if changed:
+            self.version += 1
+        return changed
+
+    def apply(self, product: Dict[str, Any], product_id: str) -> Dict[str, Any]:
+        """Copy of product whose reviews combine the catalog baseline with the ingested aggregate"""
+        aggregate = self.aggregates.get(product_id)
+        reviews = dict(product.get("reviews") or {})
+        # The scraped figures are kept aside, so applying again starts from them, not from our own output
+        base_rating = reviews.setdefault("catalog_average_rating", reviews.get("average_rating"))
+        base_count = reviews.setdefault("catalog_rating_count", reviews.get("rating_count") or 0)
+        base_rating = base_rating if isinstance(base_rating, (int, float)) else 0.0
+        base_count = base_count if isinstance(base_count, int) and base_rating else 0
+
+        if aggregate is None or aggregate.count <= 0:
+            reviews.update(average_rating=reviews["catalog_average_rating"], rating_count=reviews["catalog_rating_count"])
+            for key in ("histogram", "recent_rating", "snippets", "latest_review"):
+                reviews.pop(key, None)
+            return {**product, "reviews": reviews}
+
+        count = base_count + aggregate.count
+        reviews.update(
+            average_rating=round((base_rating * base_count + aggregate.rating_sum) / count, 2),
+            rating_count=count,
+            max_rating=reviews.get("max_rating", MAX_RATING),
+            # Only the ingested reviews have individual ratings
+            histogram={str(stars): aggregate.histogram[stars - 1] for stars in range(1, MAX_RATING + 1)},
+            snippets=[{"text": text, "rating": rating} for _, _, text, rating in aggregate.snippets[:self.snippets]],
+        )
+        if aggregate.recent_average is not None:
+            reviews["recent_rating"] = round(aggregate.recent_average, 2)
+        if aggregate.latest is not None:
+            reviews["latest_review"] = datetime.fromtimestamp(aggregate.latest, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return {**product, "reviews": reviews}
+
+    def save(self, path: Path):
+        """Pickle the aggregates, replacing the previous state atomically"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"format": STATE_FORMAT, "half_life_days": self.half_life_days, "aggregator": self}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, half_life_days: float, snippets: int, snippet_chars: int) -> "ReviewAggregator":
+        """Saved aggregates if they match the settings, else an empty aggregator
+
+        The state is a pickle written by this module; never point this at untrusted files.
+        """
+        path = Path(path)
+        if path.exists():
+            try:
+                with open(path, "rb") as f:
+                    state = pickle.load(f)
+                if state.get("format") == STATE_FORMAT and state.get("half_life_days") == half_life_days:
+                    aggregator = state["aggregator"]
+                    aggregator.snippets, aggregator.snippet_chars = snippets, snippet_chars
+                    return aggregator
+                logger.info(f"Review state {path.name} is stale, aggregating from scratch")
+            except Exception as e:
+                logger.warning(f"Could not read review state {path}: {e}")
+        return cls(half_life_days, snippets, snippet_chars)
+
+
+def read_reviews(path: Path) -> List[Dict[str, Any]]:
+    """Review records from a JSON array file ([] if it is missing)"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    return [record for record in records if isinstance(record, dict)] if isinstance(records, list) else []
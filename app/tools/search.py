@@ -5,152 +5,182 @@ Basic product search functionality
 
 from google.adk.tools import ToolContext
 from google.genai import types
+import asyncio
 import logging
 import json
-from typing import Optional
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config_simple import SEARCH_CONFIG, PAGINATION_CONFIG
+from app.tools.filter_index import FILTER_KEYS, REGION_FIELD
+from app.tools.head_queries import HeadQueryTable, head_key, unique_queries
+from app.tools.meilisearch_simple import SimpleMeilisearchEngine
+from app.tools.formatting import product_card, compact_payload, render_tool_output
+from app.tools.pagination import encode_cursor, decode_cursor
+from app.tools.working_set import remember_products
+from app.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
-async def search_products(keywords: str, tool_context: ToolContext, filters: Optional[dict] = None) -> str:
+async def search_products(keywords: str, tool_context: ToolContext, filters: Optional[dict] = None, include_facets: bool = False, sort: Optional[str] = None, limit: int = 10, cursor: Optional[str] = None, region: Optional[str] = None) -> str:
     """Search for smartphones based on keywords and filters.
     
     Args:
-        keywords (str): Search keywords (e.g., "iPhone 16 Pro", "Samsung Galaxy")
-        filters (dict, optional): Search filters (e.g., {"price_max": 20000000, "brand": "Apple"})
+        keywords (str): Search keywords (e.g., "iPhone 16 Pro", "Samsung Galaxy"); may be empty when only filtering
+        filters (dict, optional): Search filters (e.g., {"price_max": 20000000, "brand": "Apple"}).
+            Supported keys: price_min, price_max, brand, category, availability, in_stock,
+            battery_min (mAh), camera_min (MP), storage_min (GB), ram_min (GB), rating_min,
+            effective_price_max (price after the best promotion), promo_discount_min (VND off),
+            installment_0 (true: 0% installment offers), payment_partner (e.g. "Kredivo", "VIB"), region
+        include_facets (bool, optional): Also return counts per brand, availability, payment partner, region and price range,
+            e.g. for "what is available under 10 million"
+        sort (str, optional): Sort order, one of "price.current:asc", "price.current:desc",
+            "reviews.average_rating:desc", "price.discount_percentage:desc",
+            "specs_numeric.battery_mah:desc", "specs_numeric.camera_mp:desc",
+            "specs_numeric.promo_discount:desc" (biggest promotion), "specs_numeric.effective_price:asc",
+            "name:asc" (e.g. "price.current:asc" for "the cheapest ..."); default is relevance
+        limit (int, optional): Number of products to return (default 10)
+        cursor (str, optional): "next_cursor" from a previous result (or "next") to get the
+            next page of that search; keywords, filters and sort are then taken from the cursor
+        region (str, optional): Only products in stock at a store in this region or city
+            (e.g. "Hồ Chí Minh", "Hà Nội", "Biên Hòa", "hcm")
         tool_context (ToolContext): The function context
         
     Returns:
         str: Search results with product information
     """
     try:
-        logger.info(f"Searching for: {keywords} with filters: {filters}")
-        
-        # Import Simple Meilisearch engine
-        from app.tools.meilisearch_simple import SimpleMeilisearchEngine
+        logger.info(f"Searching for: {keywords} with filters: {filters}, region: {region}, sort: {sort}, limit: {limit}")
         
-        # Get singleton instance
+        # Get singleton instance (built at startup by warmup_search_engine)
         search_engine = SimpleMeilisearchEngine()
         
         # Convert filters to MeilisearchEngine format
         enhanced_filters = {}
         if filters:
-            if "price_max" in filters:
-                enhanced_filters["price_max"] = filters["price_max"]
-            if "price_min" in filters:
-                enhanced_filters["price_min"] = filters["price_min"]
-            if "brand" in filters:
-                enhanced_filters["brand"] = filters["brand"]
-            if "battery_min" in filters:
-                enhanced_filters["battery_min"] = filters["battery_min"]
-            if "camera_min" in filters:
-                enhanced_filters["camera_min"] = filters["camera_min"]
-            if "storage_min" in filters:
-                enhanced_filters["storage_min"] = filters["storage_min"]
+            enhanced_filters = {key: value for key, value in filters.items() if key in FILTER_KEYS}
+        if region:
+            enhanced_filters[REGION_FIELD] = region
         
-        # Execute search using MeilisearchEngine
-        products = search_engine.search(keywords, limit=20, enhanced_filters=enhanced_filters)
+        # Resume a previous search from its cursor
+        offset = 0
+        exclude_ids = []
+        if cursor:
+            if cursor == "next":
+                cursor = tool_context.state.get(PAGINATION_CONFIG["state_key"]) or ""
+            page_state = decode_cursor(cursor)
+            if page_state is None or not {"q", "f", "s", "l", "o", "x", "v"} <= page_state.keys():
+                return "Không còn trang kết quả tiếp theo. Hãy tìm kiếm lại."
+            keywords, enhanced_filters = page_state["q"], page_state["f"]
+            sort, limit = page_state["s"], page_state["l"]
+            if page_state["v"] == search_engine.index_version:
+                offset, exclude_ids = page_state["o"], page_state["x"]
+            else:
+                logger.info("Catalog changed since cursor was issued, restarting from the first page")
         
-        # Format results for display
-        if not products:
-            return "Không tìm thấy sản phẩm phù hợp với yêu cầu của bạn. Hãy thử từ khóa khác hoặc điều chỉnh bộ lọc."
+        # Honor the requested limit exactly (capped by config)
+        limit = max(1, min(int(limit or SEARCH_CONFIG["default_limit"]), SEARCH_CONFIG["max_limit"]))
+        if sort and sort not in SEARCH_CONFIG["sort_options"]:
+            logger.warning(f"Ignoring unsupported sort: {sort}")
+            sort = None
         
-        # Convert to comprehensive product format for frontend
-        minimal_products = []
-        for product in products[:10]:  # Limit to top 10
-            # Get first image from images array
-            images = product.get("images", [])
-            first_image = images[0] if images else ""
-            
-            # Get brand and category
-            brand = product.get("brand", "")
-            category = product.get("category", "")
-            
-            # Get specs for comparison
-            specs = product.get("specs", {})
-            display = specs.get("display", {})
-            camera_main = specs.get("camera_main", "")
-            battery = specs.get("battery", {})
-            ram = specs.get("ram", "")
-            storage = specs.get("storage", "")
-            
-            # Get reviews for rating
-            reviews = product.get("reviews", {})
-            rating = reviews.get("average_rating", 0)
-            rating_count = reviews.get("rating_count", 0)
-            
-            # Get availability
-            availability = product.get("availability", "unknown")
-            
-            # Get colors and storage options
-            colors = product.get("colors", [])
-            storage_options = product.get("storage_options", [])
-            
-            # Get promotions
-            promotions = product.get("promotions", {})
-            free_gifts = promotions.get("free_gifts", [])
-            special_discounts = promotions.get("special_discounts", [])
-            
-            minimal_products.append({
-                "id": product.get("id", ""),
-                "sku": product.get("sku", ""),
-                "name": product.get("name", ""),
-                "brand": brand,
-                "category": category,
-                "price": {
-                    "current": product.get("price", {}).get("current", 0),
-                    "original": product.get("price", {}).get("original"),
-                    "currency": product.get("price", {}).get("currency", "VND"),
-                    "discount": f"{product.get('price', {}).get('discount_percentage', 0)}%" if product.get('price', {}).get('discount_percentage', 0) > 0 else None
-                },
-                "image": {
-                    "url": first_image
-                },
-                "description": product.get("description", ""),
-                "productUrl": product.get("url", ""),
-                "availability": availability,
-                "rating": {
-                    "average": rating,
-                    "count": rating_count
-                },
-                "specs": {
-                    "display": {
-                        "size": display.get("size", ""),
-                        "technology": display.get("technology", ""),
-                        "resolution": display.get("resolution", "")
-                    },
-                    "camera": {
-                        "main": camera_main,
-                        "front": specs.get("camera_front", "")
-                    },
-                    "battery": {
-                        "capacity": battery.get("capacity", ""),
-                        "charging": battery.get("wired_charging", "")
-                    },
-                    "ram": ram,
-                    "storage": storage,
-                    "os": specs.get("os", ""),
-                    "chipset": specs.get("chipset", "")
-                },
-                "colors": colors,
-                "storage_options": storage_options,
-                "promotions": {
-                    "free_gifts": free_gifts[:3],  # Limit to first 3
-                    "special_discounts": special_discounts[:2]  # Limit to first 2
-                }
-            })
+        # Frequent plain queries were materialized at index time: no backend call, no reshaping
+        if not enhanced_filters and not include_facets and not sort and not cursor:
+            with tracer.span("engine.materialized", tool_context) as span:
+                entry = search_engine.materialized(keywords, limit, tool="search_products")
+                span.set(hit=entry is not None)
+            if entry is not None:
+                payload = entry["payload"]
+                tool_context.state[PAGINATION_CONFIG["state_key"]] = payload.get("next_cursor")
+                remember_products(tool_context, payload["products"], search_engine.index_version)
+                return render_tool_output(payload, tool_context, entry["summary"])
         
-        # Create JSON response for frontend
-        json_response = {
-            "type": "product-display",
-            "message": f"Tìm thấy {len(products)} sản phẩm phù hợp với '{keywords}'",
-            "products": minimal_products
-        }
+        json_response = await search_response(
+            search_engine, keywords, enhanced_filters, include_facets, sort, limit, offset, exclude_ids, cursor, tool_context
+        )
+        tool_context.state[PAGINATION_CONFIG["state_key"]] = json_response.get("next_cursor") if json_response else None
         
-        # Skip artifact saving to avoid import issues
-        # The search results are already returned as JSON
+        if json_response is None:
+            return "Không tìm thấy sản phẩm phù hợp với yêu cầu của bạn. Hãy thử từ khóa khác hoặc điều chỉnh bộ lọc."
+        remember_products(tool_context, json_response["products"], search_engine.index_version)
         
-        return json.dumps(json_response, ensure_ascii=False)
+        # Full cards go to the frontend, a compact summary to the model
+        return render_tool_output(json_response, tool_context)
         
     except Exception as e:
         logger.error(f"Search error: {e}")
         return f"Lỗi khi tìm kiếm sản phẩm: {str(e)}"
+
+
+async def search_response(search_engine: SimpleMeilisearchEngine, keywords: str, enhanced_filters: Dict[str, Any],
+                          include_facets: bool, sort: Optional[str], limit: int, offset: int = 0,
+                          exclude_ids: Optional[List[str]] = None, cursor: Optional[str] = None,
+                          tool_context: Optional[ToolContext] = None,
+                          tool: str = "search_products") -> Optional[Dict[str, Any]]:
+    """The product-display payload for one page of a search, or None when nothing matched"""
+    # A single named model goes straight to the ID index
+    products = []
+    facets = None
+    total = None
+    page = None
+    if not enhanced_filters and not include_facets and not sort and not cursor:
+        with tracer.span("engine.lookup_mentioned", tool_context) as span:
+            products = search_engine.lookup_mentioned_products(keywords, tool=tool)[:limit]
+            span.set(hits=len(products))
+    
+    # Execute search using MeilisearchEngine
+    if not products:
+        with tracer.span("engine.search_page", tool_context, offset=offset, facets=include_facets) as span:
+            # Worker thread: a backend call (or its admission wait) must not hold the event loop
+            search = search_engine.faceted_search if include_facets else search_engine.search_page
+            page = await asyncio.to_thread(search, keywords, limit, enhanced_filters, sort, offset, exclude_ids,
+                                           tool=tool)
+            facets = page.get("facets")
+            products, total = page["hits"], page["total"]
+            span.set(backend=page.get("source"), cache=page.get("cache"), shed=page.get("shed"),
+                     hits=len(products), total=total)
+    
+    if not products:
+        return None
+    
+    # Remember where the next page starts
+    next_cursor = None
+    if page and page["next_offset"] < total:
+        next_cursor = encode_cursor({
+            "q": keywords, "f": enhanced_filters, "s": sort, "l": limit,
+            "o": page["next_offset"], "x": page["exclude_ids"], "v": search_engine.index_version
+        })
+    
+    # Convert to comprehensive product format for frontend
+    with tracer.span("tool.reshape", tool_context, products=len(products)):
+        minimal_products = [product_card(product) for product in products]
+    
+    # Create JSON response for frontend
+    message = f"Tìm thấy {total if total is not None else len(products)} sản phẩm phù hợp với '{keywords}'"
+    if offset or next_cursor:
+        message += f" (hiển thị {offset + 1}-{offset + len(products)})"
+    json_response = {
+        "type": "product-display",
+        "message": message,
+        "products": minimal_products
+    }
+    if facets is not None:
+        json_response["facets"] = facets
+    if next_cursor:
+        json_response["next_cursor"] = next_cursor
+    return json_response
+
+
+async def materialize_head_queries(search_engine: SimpleMeilisearchEngine, queries: List[str],
+                                   limits: List[int]) -> HeadQueryTable:
+    """search_products payloads and model summaries for plain head queries, for the engine's current catalog"""
+    entries = {}
+    for query in unique_queries(queries):
+        for limit in limits:
+            payload = await search_response(search_engine, query, {}, False, None, limit, tool="index_products")
+            if payload is not None:
+                entries[head_key(query, limit)] = {
+                    "payload": payload,
+                    "summary": json.dumps(compact_payload(payload), ensure_ascii=False)
+                }
+    return HeadQueryTable(search_engine.index_version, entries, time.time())
@@ -0,0 +1,40 @@
+"""
+Search Backend Interface for DDV Product Advisor
+What SimpleMeilisearchEngine needs from a full-text backend
+
+Backends return raw ranked pages; fusion with the local vector index,
+pagination cursors and the local fallback stay in the engine.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class SearchBackend(ABC):
+    """A full-text search backend (Meilisearch server, embedded SQLite FTS5)
+
+    search and health_check are abstract, so a backend missing one fails
+    when it is created rather than on its first query.
+    """
+
+    name = "backend"
+
+    @abstractmethod
+    def search(self, query: str, limit: int, offset: int, enhanced_filters: Optional[Dict[str, Any]],
+               sort_spec: Optional[Tuple[str, str, bool]]) -> Dict[str, Any]:
+        """One ranked page: {"hits": [product dicts], "total": matching count}
+
+        sort_spec is parse_sort() output; None means relevance order. Raise on
+        failure so the engine can fall back to the local indexes.
+        """
+
+    def update_reviews(self, products: List[Dict[str, Any]]):
+        """Push new review aggregates for these products, if the backend can update in place
+
+        Backends that cannot (the read-only SQLite tables) keep the indexed
+        ratings until the next index_products.py run.
+        """
+
+    @abstractmethod
+    def health_check(self) -> Dict[str, Any]:
+        """{"status": "healthy" | "error" | "unavailable", "message": ..., optional "stats"}"""
@@ -0,0 +1,138 @@
+"""
+Shared Catalog for DDV Product Advisor
+One loader publishes the built catalog to an mmap'd file; workers attach read-only
+
+Layout of the store directory:
+    CURRENT             generation number workers should attach to
+    gen-000007/
+        catalog.pkl     pickle stream of the CatalogIndex object graph
+        arrays.bin      every NumPy array, pickled out-of-band, 64-byte aligned
+        meta.json       format, generation, source fingerprint, buffer offsets
+
+Workers map arrays.bin and unpickle with those buffers, so the products, ID
+hash table, search text, filter bitmaps, spec matrix, neighbor lists, n-gram
+postings, suggestion keys and the compiled entity automaton are zero-copy views shared through
+the page cache. Only small Python objects (token vocabulary, facet labels) are
+materialized per process.
+
+Usage: python -m app.tools.shared_catalog
+"""
+
+import json
+import logging
+import mmap
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.tools.catalog_index import CatalogIndex
+from app.tools.catalog_snapshot import pack_catalog, source_fingerprint, write_buffers
+
+logger = logging.getLogger(__name__)
+
+# Bump when CatalogIndex or the store layout changes
+STORE_FORMAT = 9
+
+
+def _generation_dir(directory: Path, generation: int) -> Path:
+    return Path(directory) / f"gen-{generation:06d}"
+
+
+def current_generation(directory: Path) -> Optional[int]:
+    """Generation named by the CURRENT file, or None if nothing is published"""
+    try:
+        return int((Path(directory) / "CURRENT").read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def publish_catalog(catalog: CatalogIndex, directory: Path, fingerprint: Optional[str], keep: int = 2) -> int:
+    """Write the catalog as a new generation and point CURRENT at it"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    generation = (current_generation(directory) or 0) + 1
+    gen_dir = _generation_dir(directory, generation)
+    tmp_dir = gen_dir.with_name(gen_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    stream, buffers = pack_catalog(catalog)
+    with open(tmp_dir / "arrays.bin", "wb") as f:
+        layout = write_buffers(f, buffers)
+    (tmp_dir / "catalog.pkl").write_bytes(stream)
+    (tmp_dir / "meta.json").write_text(json.dumps({
+        "format": STORE_FORMAT,
+        "generation": generation,
+        "fingerprint": fingerprint,
+        "products": len(catalog),
+        "buffers": layout,
+    }))
+    os.replace(tmp_dir, gen_dir)
+
+    # Readers switch only once the generation is complete
+    current_tmp = directory / "CURRENT.tmp"
+    current_tmp.write_text(str(generation))
+    os.replace(current_tmp, directory / "CURRENT")
+
+    # Workers still mapping an old generation keep their pages after unlink
+    for old in sorted(directory.glob("gen-*[0-9]")):
+        if int(old.name.split("-")[1]) <= generation - keep:
+            shutil.rmtree(old, ignore_errors=True)
+
+    logger.info(f"✅ Published catalog generation {generation}: {len(catalog)} products")
+    return generation
+
+
+def attach_catalog(directory: Path, generation: Optional[int] = None) -> Optional[Tuple[int, Optional[str], CatalogIndex]]:
+    """Map a published generation read-only: (generation, source fingerprint, catalog)"""
+    generation = generation or current_generation(directory)
+    if generation is None:
+        return None
+
+    start = time.perf_counter()
+    gen_dir = _generation_dir(directory, generation)
+    try:
+        meta = json.loads((gen_dir / "meta.json").read_text())
+        if meta.get("format") != STORE_FORMAT:
+            logger.warning(f"Shared catalog generation {generation} has format {meta.get('format')}, ignoring")
+            return None
+
+        with open(gen_dir / "arrays.bin", "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b"")
+        buffers = [data[offset:offset + length] for offset, length in meta["buffers"]]
+        catalog = pickle.loads((gen_dir / "catalog.pkl").read_bytes(), buffers=buffers)
+    except Exception as e:
+        logger.warning(f"Could not attach shared catalog generation {generation}: {e}")
+        return None
+
+    logger.info(f"✅ Attached shared catalog generation {generation}: {len(catalog)} products "
+                f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return generation, meta.get("fingerprint"), catalog
+
+
+def main():
+    """Build the catalog from merged_products.json and publish it for the workers"""
+    from app.config_simple import MERGED_PRODUCTS_FILE, SHARED_CATALOG_CONFIG
+    from app.tools.catalog_validation import load_catalog
+
+    logging.basicConfig(level=logging.INFO)
+    products = load_catalog(MERGED_PRODUCTS_FILE)
+
+    start = time.perf_counter()
+    catalog = CatalogIndex(products)
+    generation = publish_catalog(
+        catalog,
+        SHARED_CATALOG_CONFIG["directory"],
+        source_fingerprint(MERGED_PRODUCTS_FILE),
+        SHARED_CATALOG_CONFIG["keep_generations"],
+    )
+    print(f"🎉 Published generation {generation} ({len(products)} products) "
+          f"in {time.perf_counter() - start:.2f}s to {SHARED_CATALOG_CONFIG['directory']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Simple Similar Products Tool for DDV Product Advisor
+Alternatives to a product from precomputed neighbor lists
+"""
+
+from google.adk.tools import ToolContext
+import asyncio
+import logging
+
+from app.config_simple import SIMILAR_CONFIG
+from app.tools.meilisearch_simple import SimpleMeilisearchEngine
+from app.tools.formatting import product_card, render_tool_output
+from app.tools.working_set import remember_products, resolve_reference
+from app.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+async def find_similar_products(product_id: str, tool_context: ToolContext, cheaper: bool = False, same_brand: bool = False, in_stock: bool = False, limit: int = 5) -> str:
+    """Find products similar to a given one (specs and price), e.g. "máy nào tương tự nhưng rẻ hơn?".
+
+    Args:
+        product_id (str): Product ID, SKU, name, or a reference to a product shown earlier
+            in this session (e.g. "cái thứ 2")
+        tool_context (ToolContext): The function context
+        cheaper (bool, optional): Only products cheaper than this one
+        same_brand (bool, optional): Only products of the same brand
+        in_stock (bool, optional): Only products in stock
+        limit (int, optional): Number of alternatives to return (default 5, max 10)
+
+    Returns:
+        str: JSON string with the similar products
+    """
+    try:
+        logger.info(f"Finding products similar to: {product_id}")
+
+        # Get singleton instance (built at startup by warmup_search_engine)
+        search_engine = SimpleMeilisearchEngine()
+        limit = max(1, min(int(limit or SIMILAR_CONFIG["default_limit"]), SIMILAR_CONFIG["max_limit"]))
+
+        # Products shown earlier in the session need no lookup
+        card = resolve_reference(tool_context, product_id, search_engine.index_version, search_engine.get_product)
+        base = search_engine.get_product(card["id"]) if card else None
+        # Worker thread: a query-log write or the admission wait must not hold the event loop
+        if base is None:
+            base = await asyncio.to_thread(search_engine.find_product, product_id, tool="find_similar_products")
+        if base is None:
+            search_results = await asyncio.to_thread(search_engine.search, product_id, limit=1,
+                                                     tool="find_similar_products")
+            base = search_results[0] if search_results else None
+        if base is None:
+            return f"Không tìm thấy sản phẩm '{product_id}'"
+
+        with tracer.span("engine.similar_products", tool_context, cheaper=cheaper, same_brand=same_brand,
+                         in_stock=in_stock) as span:
+            similar = search_engine.similar_products(base.get("id"), limit, cheaper, same_brand, in_stock)
+            span.set(hits=len(similar["hits"]))
+
+        qualifiers = [text for flag, text in ((cheaper, "rẻ hơn"), (same_brand, "cùng hãng"), (in_stock, "còn hàng")) if flag]
+        wanted = f"sản phẩm tương tự {base.get('name', product_id)}" + (f" ({', '.join(qualifiers)})" if qualifiers else "")
+        if not similar["hits"]:
+            return f"Không có {wanted}."
+
+        minimal_products = [product_card(product) for product in similar["hits"]]
+        remember_products(tool_context, minimal_products, search_engine.index_version)
+
+        base_price = (base.get("price") or {}).get("current") or 0
+        json_response = {
+            "type": "product-display",
+            "message": f"Tìm thấy {len(minimal_products)} {wanted}",
+            "reference_id": base.get("id"),
+            # Positive: more expensive than the reference product, in VND
+            "price_difference": {
+                card["id"]: card["price"]["current"] - base_price
+                for card in minimal_products if card["price"]["current"] and base_price
+            },
+            "products": minimal_products
+        }
+
+        # Full cards go to the frontend, a compact summary to the model
+        return render_tool_output(json_response, tool_context)
+
+    except Exception as e:
+        logger.error(f"Find similar products error: {e}")
+        return f"Lỗi khi tìm sản phẩm tương tự: {str(e)}"
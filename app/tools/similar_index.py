@@ -0,0 +1,226 @@
+"""
+Similar Products Index for DDV Product Advisor
+Nearest-neighbor lists over normalized specs and price, computed at index time
+
+Each product is a point in the spec matrix's percentile space (price, rating,
+battery, memory, camera, screen), weighted by SIMILAR_CONFIG["feature_weights"].
+Candidates must sit within a price band of the product (a 3-million phone is
+no alternative to a 30-million one), and another brand adds a fixed distance,
+so same-brand alternatives rank first among equals. The k nearest are stored
+as CSR arrays:
+    neighbor_ptr[row]:neighbor_ptr[row + 1]  slice of neighbor_rows / neighbor_distances
+
+Queries ("similar but cheaper", "same brand", "in stock") are a slice lookup
+plus filtering of at most k rows.
+
+Building avoids the full n x n distance matrix. Products sharing brand and
+every spec but price form a cell (the variants of one model), and the spec
+distance between two cells plus the brand penalty bounds the distance between
+any of their rows from below. Within a cell, distance only grows with the
+price gap, so a row's nearest rows in a cell are among the k on either side of
+its price. Each row is compared with those few rows of the cells nearest to
+it, in bound order, until its k-th neighbor is provably closer than every cell
+left out. The result equals a full scan.
+"""
+
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from app.tools.spec_matrix import SpecMatrix
+from app.tools.text_utils import normalize_text
+
+# Rows searched together
+BLOCK_ROWS = 256
+
+# Distances computed at once (rows x candidates)
+BLOCK_DISTANCES = 1 << 21
+
+# Nearest cells searched first; quadrupled while some row's neighbors are unproven
+FIRST_CELLS = 16
+
+# Beyond this many cells (specs that vary product by product) ranking cells costs more than it saves,
+# and every row is compared with every other instead
+MAX_CELLS = 4096
+
+# Float32 rounding allowance when proving a row's k-th neighbor is closer than a cell
+DISTANCE_SLACK = 1e-3
+
+
+class SimilarityIndex:
+    """k nearest neighbors of every catalog row"""
+
+    def __init__(self, spec_matrix: SpecMatrix, products: List[Dict[str, Any]], neighbors: int,
+                 price_band: float, brand_penalty: float, feature_weights: Dict[str, float]):
+        size = len(spec_matrix.values)
+        brands = [product.get("brand") or "" for product in products]
+        brand_keys = {brand: normalize_text(brand) for brand in set(brands)}
+        brand_codes = {key: code for code, key in enumerate(sorted(set(brand_keys.values())))}
+        self.brands = np.array([brand_codes[brand_keys[brand]] for brand in brands], dtype=np.int32)
+
+        k = max(0, min(neighbors, size - 1))
+        search = _NeighborSearch(spec_matrix, self.brands, price_band, brand_penalty, feature_weights)
+        nearest_rows, nearest_distances = search.run(k)
+
+        # Rows with fewer than k candidates in their price band keep only the real ones
+        found = np.isfinite(nearest_distances)
+        self.neighbor_ptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(found.sum(axis=1), out=self.neighbor_ptr[1:])
+        self.neighbor_rows = nearest_rows[found]
+        self.neighbor_distances = nearest_distances[found]
+
+    def neighbors(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, distances) of a row's neighbors, nearest first"""
+        start, end = self.neighbor_ptr[row], self.neighbor_ptr[row + 1]
+        return self.neighbor_rows[start:end], self.neighbor_distances[start:end]
+
+
+class _NeighborSearch:
+    """Build-time state of a SimilarityIndex: weighted features, and priced rows grouped into cells"""
+
+    def __init__(self, spec_matrix: SpecMatrix, brands: np.ndarray, price_band: float,
+                 brand_penalty: float, feature_weights: Dict[str, float]):
+        weights = np.array([feature_weights.get(field, 0.0) for field in spec_matrix.fields], dtype=np.float32)
+        price_field = spec_matrix.fields.index("price")
+        # float64: the expansion below loses small distances to rounding in float32
+        self.features = (spec_matrix.scores * np.sqrt(weights)).astype(np.float64)
+        self.squared = (self.features ** 2).sum(axis=1)
+        self.prices = spec_matrix.values[:, price_field]
+        self.brands = brands
+        self.price_band = price_band
+        self.brand_penalty = brand_penalty
+
+        # A missing price is not constrained: such rows are candidates for every row and scan everything
+        self.unpriced = np.flatnonzero(np.isnan(self.prices)).astype(np.int32)
+        priced = np.flatnonzero(~np.isnan(self.prices)).astype(np.int32)
+
+        # Cells of priced rows: same brand and specs but price
+        keys = np.column_stack([np.delete(self.features[priced], price_field, axis=1), brands[priced]])
+        cells, cell_of = np.unique(keys, axis=0, return_inverse=True)
+        cell_of = cell_of.reshape(-1)
+        self.cell_specs = cells[:, :-1]
+        self.cell_squared = (self.cell_specs ** 2).sum(axis=1)
+        self.cell_brands = cells[:, -1]
+
+        # Priced rows by (cell, price); cell c owns order[cell_ptr[c]:cell_ptr[c + 1]]
+        by_cell = np.lexsort((self.prices[priced], cell_of))
+        self.order = priced[by_cell]
+        self.cell_of = cell_of[by_cell]
+        self.cell_ptr = np.searchsorted(self.cell_of, np.arange(len(cells) + 1))
+        self.order_prices = self.prices[self.order]
+        self.order_price_scores = self.features[self.order, price_field].astype(np.float32)
+        # Sortable (cell, price rank) key, to find where a price falls within any cell by bisection
+        self.price_ranks = np.searchsorted(np.sort(self.order_prices), self.order_prices)
+        self.cell_price_keys = self.cell_of.astype(np.int64) * (len(priced) + 1) + self.price_ranks
+
+    def run(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, distances), each n x k, nearest first; rows with fewer candidates are padded with inf"""
+        size = len(self.prices)
+        nearest_rows = np.zeros((size, k), dtype=np.int32)
+        nearest_distances = np.full((size, k), np.inf, dtype=np.float32)
+        if not k:
+            return nearest_rows, nearest_distances
+
+        scanned = self.unpriced
+        if len(self.cell_ptr) - 1 <= MAX_CELLS:
+            for start in range(0, len(self.order), BLOCK_ROWS):
+                stop = min(start + BLOCK_ROWS, len(self.order))
+                block = self.order[start:stop]
+                nearest_rows[block], nearest_distances[block] = self._search_cells(start, stop, k)
+        else:
+            scanned = np.arange(size, dtype=np.int32)
+
+        all_rows = np.arange(size, dtype=np.int32)
+        for start in range(0, len(scanned), BLOCK_ROWS):
+            block = scanned[start:start + BLOCK_ROWS]
+            candidates = np.broadcast_to(all_rows, (len(block), size))
+            nearest_rows[block], nearest_distances[block] = _closest(candidates, self._distances(block, all_rows), k)
+        return nearest_rows, nearest_distances
+
+    def _search_cells(self, start: int, stop: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest neighbors of the priced rows order[start:stop], searching cells nearest first"""
+        block = self.order[start:stop]
+        first, last = self.cell_of[start], self.cell_of[stop - 1]
+        # Squared spec distance and brand penalty from each cell in the block to every cell;
+        # together they bound the distance between any of their rows from below
+        spec_squared = np.maximum(self.cell_squared[first:last + 1, None] + self.cell_squared[None, :]
+                                  - 2 * self.cell_specs[first:last + 1] @ self.cell_specs.T, 0)
+        penalty = self.brand_penalty * (self.cell_brands[first:last + 1, None] != self.cell_brands[None, :])
+        spec_squared, penalty = spec_squared.astype(np.float32), penalty.astype(np.float32)
+        bounds = np.sqrt(spec_squared) + penalty
+        # Each block cell's cells, nearest first
+        ranked = np.argsort(bounds, axis=1, kind="stable")
+        bounds, spec_squared, penalty = (np.take_along_axis(values, ranked, axis=1) for values in (bounds, spec_squared, penalty))
+        row_cells = self.cell_of[start:stop] - first
+
+        rows = np.zeros((len(block), k), dtype=np.int32)
+        distances = np.full((len(block), k), np.inf, dtype=np.float32)
+        pending = np.arange(len(block))
+        # k rows on either side of a price, plus one for the row itself
+        offsets = np.arange(-k, k + 1)
+        searched = FIRST_CELLS
+        while len(pending):
+            searched = min(searched, ranked.shape[1])
+            chunk = max(1, BLOCK_DISTANCES // (searched * len(offsets) + len(self.unpriced)))
+            for at in range(0, len(pending), chunk):
+                part = pending[at:at + chunk]
+                rows[part], distances[part] = self._search_part(start + part, row_cells[part], ranked, spec_squared,
+                                                                penalty, searched, offsets, k)
+            if searched == ranked.shape[1]:
+                break
+            # Done once the k-th neighbor is closer than the bound of every cell left out
+            pending = pending[bounds[row_cells[pending], searched] <= distances[pending, -1] + DISTANCE_SLACK]
+            searched *= 4
+        return rows, distances
+
+    def _search_part(self, positions: np.ndarray, row_cells: np.ndarray, ranked: np.ndarray, spec_squared: np.ndarray,
+                     penalty: np.ndarray, searched: int, offsets: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest neighbors of the rows at order[positions] among the nearest `searched` cells of their own"""
+        cells = ranked[row_cells, :searched]
+        # Rows of each cell within k of the row's price: position of that price in the cell, plus offsets
+        candidates = np.searchsorted(
+            self.cell_price_keys, cells.astype(np.int64) * (len(self.order) + 1) + self.price_ranks[positions, None]
+        )[:, :, None] + offsets
+        outside = (candidates < self.cell_ptr[cells, None]) | (candidates >= self.cell_ptr[cells + 1, None])
+        candidates = np.clip(candidates, 0, len(self.order) - 1)
+
+        gaps = self.order_price_scores[candidates] - self.order_price_scores[positions, None, None]
+        distances = np.sqrt(spec_squared[row_cells, :searched, None] + gaps ** 2) + penalty[row_cells, :searched, None]
+        prices = self.order_prices[candidates]
+        row_prices = self.order_prices[positions, None, None]
+        outside |= (prices > row_prices * self.price_band) | (prices * self.price_band < row_prices)
+        outside |= candidates == positions[:, None, None]
+        distances[outside] = np.inf
+
+        rows = self.order[positions]
+        candidates = self.order[candidates].reshape(len(positions), -1)
+        distances = distances.reshape(len(positions), -1)
+        if len(self.unpriced):
+            candidates = np.hstack([candidates, np.broadcast_to(self.unpriced, (len(rows), len(self.unpriced)))])
+            distances = np.hstack([distances, self._distances(rows, self.unpriced)])
+        return _closest(candidates, distances, k)
+
+    def _distances(self, rows: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """len(rows) x len(candidates) distances, inf outside the price band and for the row itself"""
+        squared = self.squared[rows, None] + self.squared[None, candidates] - 2 * self.features[rows] @ self.features[candidates].T
+        distances = np.sqrt(np.maximum(squared, 0))
+        distances += self.brand_penalty * (self.brands[rows, None] != self.brands[None, candidates])
+
+        # A missing price is not constrained
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = self.prices[None, candidates] / self.prices[rows, None]
+        distances[(ratio > self.price_band) | (ratio < 1 / self.price_band) | (rows[:, None] == candidates[None, :])] = np.inf
+        return distances
+
+
+def _closest(candidates: np.ndarray, distances: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Each row's k smallest distances and their candidates, nearest first; inf pads short rows"""
+    if candidates.shape[1] < k:
+        pad = k - candidates.shape[1]
+        distances = np.pad(distances, ((0, 0), (0, pad)), constant_values=np.inf)
+        candidates = np.pad(candidates, ((0, 0), (0, pad)))
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+    order = np.argsort(nearest_distances, axis=1, kind="stable")
+    nearest = np.take_along_axis(nearest, order, axis=1)
+    return np.take_along_axis(candidates, nearest, axis=1), np.take_along_axis(nearest_distances, order, axis=1).astype(np.float32)
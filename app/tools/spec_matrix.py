@@ -0,0 +1,101 @@
+"""
+Spec Matrix for DDV Product Advisor
+Every product's numeric specs as one NumPy matrix for comparisons and value ranking
+
+Built at load time from the filter index's parsed columns (so battery is
+mAh from "4676 mAh", not the raw dict, and promotions are VND amounts):
+    values   n x d float64, NaN where a spec is missing
+    scores   n x d float32 percentile of each value within the catalog,
+             flipped so 1.0 is always best (cheapest, biggest battery, ...);
+             missing specs score a neutral 0.5
+
+Per-dimension winners and weighted "best value" scores are array operations
+over these, for a handful of compared products or the whole catalog.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.tools.specs import NUMERIC_FIELDS
+
+# Field -> (winner label, higher is better, value format)
+DIMENSIONS = {
+    "price": ("Giá rẻ nhất", False, "{:,.0f} VND"),
+    "discount": ("Giảm giá nhiều nhất", True, "{:.0f}%"),
+    "rating": ("Đánh giá cao nhất", True, "{:.1f}/5"),
+    "battery_mah": ("Pin tốt nhất", True, "{:,.0f}mAh"),
+    "ram_gb": ("RAM lớn nhất", True, "{:,.0f}GB"),
+    "storage_gb": ("Bộ nhớ lớn nhất", True, "{:,.0f}GB"),
+    "camera_mp": ("Camera chính cao nhất", True, "{:.0f}MP"),
+    "screen_inch": ("Màn hình lớn nhất", True, '{:.1f}"'),
+    "refresh_hz": ("Tần số quét cao nhất", True, "{:.0f}Hz"),
+    "effective_price": ("Giá sau ưu đãi thấp nhất", False, "{:,.0f} VND"),
+    "promo_discount": ("Ưu đãi giảm nhiều nhất", True, "{:,.0f} VND"),
+    "trade_in_bonus": ("Trợ giá thu cũ cao nhất", True, "{:,.0f} VND"),
+    "installment_zero": ("Trả góp 0%", True, "có"),
+}
+
+
+class SpecMatrix:
+    """Numeric specs of every catalog row plus their catalog-wide percentile scores"""
+
+    def __init__(self, columns):
+        """columns: BitmapFilterIndex.columns (NumericColumn per NUMERIC_FIELDS entry)"""
+        self.fields = list(NUMERIC_FIELDS)
+        self.higher_is_better = np.array([DIMENSIONS[field][1] for field in self.fields])
+        self.values = np.column_stack([columns[field].values for field in self.fields]).astype(np.float64)
+        self.scores = np.full(self.values.shape, 0.5, dtype=np.float32)
+
+        for j, field in enumerate(self.fields):
+            sorted_values = columns[field].sorted_values
+            if len(sorted_values) < 2:
+                continue
+            values = self.values[:, j]
+            present = ~np.isnan(values)
+            # Mid-rank among valid values, so ties share a score
+            left = np.searchsorted(sorted_values, values[present], side="left")
+            right = np.searchsorted(sorted_values, values[present], side="right")
+            score = (left + right - 1) / 2 / (len(sorted_values) - 1)
+            self.scores[present, j] = score if self.higher_is_better[j] else 1.0 - score
+
+    def weight_vector(self, weights: Dict[str, float]) -> np.ndarray:
+        """Non-negative weights in field order, summing to 1; unknown fields are ignored"""
+        vector = np.array([max(0.0, float(weights.get(field) or 0)) for field in self.fields])
+        total = vector.sum()
+        if total <= 0:
+            raise ValueError(f"weights need a positive value for one of {', '.join(self.fields)}")
+        return vector / total
+
+    def value_scores(self, weights: Dict[str, float], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Weighted score in [0, 1] per row (all rows when rows is None)"""
+        scores = self.scores if rows is None else self.scores[rows]
+        return scores @ self.weight_vector(weights).astype(np.float32)
+
+    def winners(self, rows: List[int]) -> Dict[str, int]:
+        """Field -> position in rows of the best value
+
+        Fields where no row stands out (all missing, or every known value equal) are left out.
+        """
+        values = self.values[rows]
+        missing = np.isnan(values)
+        signed = np.where(self.higher_is_better, values, -values)
+        best_values = np.where(missing, -np.inf, signed)
+        worst_values = np.where(missing, np.inf, signed)
+        best = np.argmax(best_values, axis=0)
+        decided = (best_values.max(axis=0) > worst_values.min(axis=0)) | ((~missing).sum(axis=0) == 1)
+        return {field: int(best[j]) for j, field in enumerate(self.fields) if decided[j]}
+
+    def rank(self, weights: Dict[str, float], mask: Optional[np.ndarray] = None, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Top k rows by value score among rows where mask is True: (rows, scores), best first"""
+        scores = self.value_scores(weights)
+        rows = np.arange(len(scores)) if mask is None else np.flatnonzero(mask)
+        if not len(rows):
+            return rows, scores[rows]
+        k = min(k, len(rows))
+        keys = -scores[rows]
+        # Rows tied with the k-th score are taken in row order, as the final sort orders them
+        threshold = keys[np.argpartition(keys, k - 1)[k - 1]]
+        top = np.concatenate([rows[keys < threshold], rows[keys == threshold][:k - np.count_nonzero(keys < threshold)]])
+        top = top[np.lexsort((top, -scores[top]))]
+        return top, scores[top]
@@ -0,0 +1,119 @@
+"""
+Spec parsing helpers for DDV Product Advisor
+Turn free-text specs ("4676 mAh", "Fusion 48MP, ...") into numbers
+"""
+
+import math
+import re
+from typing import Dict, Any, Optional
+
+from app.tools.promotions import product_promotions
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+_MEGAPIXELS = re.compile(r"(\d+(?:[.,]\d+)?)\s*MP", re.IGNORECASE)
+_CAPACITY = re.compile(r"(\d+(?:[.,]\d+)?)\s*(TB|GB)", re.IGNORECASE)
+
+MISSING = math.nan
+
+# Numeric columns extracted for every product
+NUMERIC_FIELDS = [
+    "price",
+    "discount",
+    "rating",
+    "battery_mah",
+    "ram_gb",
+    "storage_gb",
+    "camera_mp",
+    "screen_inch",
+    "refresh_hz",
+    # Parsed from the promotion strings
+    "effective_price",
+    "promo_discount",
+    "trade_in_bonus",
+    "installment_zero",
+]
+
+
+def _to_float(text: str) -> float:
+    return float(text.replace(",", "."))
+
+
+def parse_number(value: Any) -> float:
+    """First number in a value, or NaN"""
+    if isinstance(value, bool):
+        return MISSING
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            return _to_float(match.group())
+    return MISSING
+
+
+def parse_battery_mah(battery: Any) -> float:
+    """Battery capacity in mAh from a dict ({"capacity": "4676 mAh"}) or string"""
+    if isinstance(battery, dict):
+        battery = battery.get("capacity")
+    if isinstance(battery, str):
+        # "4.676 mAh" uses a thousands separator
+        battery = battery.replace(".", "").replace(",", "")
+    return parse_number(battery)
+
+
+def parse_camera_mp(camera: Any) -> float:
+    """Highest megapixel count in a camera description"""
+    if not isinstance(camera, str):
+        return parse_number(camera)
+    values = [_to_float(mp) for mp in _MEGAPIXELS.findall(camera)]
+    return max(values) if values else MISSING
+
+
+def parse_capacity_gb(value: Any) -> float:
+    """Memory/storage size in GB ("256GB", "1 TB")"""
+    if not isinstance(value, str):
+        return parse_number(value)
+    match = _CAPACITY.search(value)
+    if not match:
+        return parse_number(value)
+    size = _to_float(match.group(1))
+    return size * 1024 if match.group(2).upper() == "TB" else size
+
+
+def numeric_specs(product: Dict[str, Any]) -> Dict[str, float]:
+    """All NUMERIC_FIELDS for a validated product; missing values are NaN"""
+    specs = product["specs"]
+    display = specs["display"]
+    price = product["price"]
+    reviews = product["reviews"]
+
+    rating = float(reviews["average_rating"]) if reviews["rating_count"] else MISSING
+
+    promotions = product_promotions(product)
+
+    return {
+        "price": float(price["current"]),
+        "discount": float(price["discount_percentage"]),
+        "rating": rating,
+        "battery_mah": parse_battery_mah(specs["battery"]),
+        "ram_gb": parse_capacity_gb(specs["ram"]),
+        "storage_gb": parse_capacity_gb(specs["storage"]),
+        "camera_mp": parse_camera_mp(specs["camera_main"]),
+        "screen_inch": parse_number(display["size"]),
+        "refresh_hz": parse_number(display["refresh_rate"]),
+        "effective_price": promotions.effective_price,
+        "promo_discount": promotions.promo_discount,
+        "trade_in_bonus": promotions.trade_in_bonus,
+        "installment_zero": float(promotions.installment_zero),
+    }
+
+
+def parse_filter_value(value: Any, parser=parse_number) -> Optional[float]:
+    """Parse a user-supplied filter bound ("256GB", "5000", 20000000)"""
+    number = parser(value)
+    return None if math.isnan(number) else number
+
+
+def parse_filter_flag(value: Any) -> Optional[float]:
+    """1.0 for a true flag (True, "true", "1"), else None so the filter is skipped"""
+    return 1.0 if value is True or str(value).strip().lower() in ("1", "true", "yes") else None
@@ -0,0 +1,246 @@
+"""
+SQLite Search Backend for DDV Product Advisor
+Embedded FTS5 full-text search over ddv.sqlite3, no server required
+
+Five tables are derived from merged_products.json next to the crawler's
+normalized schema, sharing one rowid per product:
+    search_fts        FTS5 over name, brand and spec text, pre-folded with
+                      normalize_text (so "đ" and "ip16" match like the local index)
+    search_numeric    typed, indexed columns for enhanced_filters and sorting
+    search_partners   (rowid, partner) pairs for the payment_partner filter
+    search_regions    (rowid, region) pairs, one per region with the product
+                      in stock, for the region filter
+    search_documents  the product document returned as a hit
+
+The index is rebuilt in one transaction on a WAL database, so readers keep
+answering from the previous version until the rebuild commits.
+
+Usage: python -m app.tools.sqlite_search
+"""
+
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.config_simple import SEARCH_BACKEND_CONFIG
+from app.tools.catalog_index import LEXICAL_WEIGHTS
+from app.tools.filter_index import CATEGORICAL_FIELDS, PARTNER_FIELD, RANGE_FILTERS, REGION_FIELD
+from app.tools.promotions import product_promotions
+from app.tools.regions import store_directory
+from app.tools.search_backend import SearchBackend
+from app.tools.specs import NUMERIC_FIELDS, numeric_specs
+from app.tools.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when the search tables change so stale databases are rebuilt
+INDEX_FORMAT = 5
+
+# Typed columns of search_numeric; "name" holds the row's rank in name order
+NUMERIC_COLUMNS = NUMERIC_FIELDS + ["name"]
+
+
+def _spec_text(product: Dict[str, Any]) -> str:
+    specs = product.get("specs", {}) or {}
+    return " ".join(value for value in specs.values() if isinstance(value, str))
+
+
+def build_search_tables(products: List[Dict[str, Any]], path: Path, fingerprint: Optional[str] = None):
+    """(Re)create the search tables in the database at path from the product list"""
+    names = [normalize_text(product.get("name", "")) for product in products]
+    name_rank = [0] * len(products)
+    for rank, row in enumerate(sorted(range(len(products)), key=names.__getitem__)):
+        name_rank[row] = rank
+
+    directory = store_directory()
+    documents, numeric, texts, partners, regions = [], [], [], [], []
+    for row, product in enumerate(products):
+        documents.append((row, product.get("id"), json.dumps(product, ensure_ascii=False)))
+        values = numeric_specs(product)
+        values["name"] = name_rank[row]
+        numeric.append(
+            [row]
+            + [normalize_text(product.get(field) or "") or None for field in CATEGORICAL_FIELDS]
+            + [None if math.isnan(values[column]) else values[column] for column in NUMERIC_COLUMNS]
+        )
+        texts.append((row, names[row], normalize_text(product.get("brand", "")), normalize_text(_spec_text(product))))
+        partners.extend((row, partner) for partner in product_promotions(product).partners)
+        regions.extend((row, region) for region in directory.regions_in_stock(product))
+
+    columns = CATEGORICAL_FIELDS + NUMERIC_COLUMNS
+    connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("BEGIN IMMEDIATE")
+        for table in ("search_fts", "search_numeric", "search_partners", "search_regions", "search_documents",
+                      "search_meta"):
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.execute("CREATE TABLE search_meta (key TEXT PRIMARY KEY, value TEXT)")
+        connection.execute("CREATE TABLE search_documents (rowid INTEGER PRIMARY KEY, id TEXT, document TEXT NOT NULL)")
+        connection.execute("CREATE INDEX search_documents_id ON search_documents (id)")
+        connection.execute(
+            "CREATE TABLE search_numeric (rowid INTEGER PRIMARY KEY, "
+            + ", ".join(f"{column} {'TEXT' if column in CATEGORICAL_FIELDS else 'REAL'}" for column in columns)
+            + ")"
+        )
+        for column in columns:
+            connection.execute(f"CREATE INDEX search_numeric_{column} ON search_numeric ({column})")
+        connection.execute("CREATE TABLE search_partners (rowid INTEGER NOT NULL, partner TEXT NOT NULL)")
+        connection.execute("CREATE INDEX search_partners_partner ON search_partners (partner, rowid)")
+        connection.execute("CREATE TABLE search_regions (rowid INTEGER NOT NULL, region TEXT NOT NULL)")
+        connection.execute("CREATE INDEX search_regions_region ON search_regions (region, rowid)")
+        connection.execute(
+            "CREATE VIRTUAL TABLE search_fts USING fts5(name, brand, specs, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+        connection.executemany("INSERT INTO search_documents VALUES (?, ?, ?)", documents)
+        connection.executemany(
+            f"INSERT INTO search_numeric VALUES ({', '.join('?' * (len(columns) + 1))})", numeric
+        )
+        connection.executemany("INSERT INTO search_fts (rowid, name, brand, specs) VALUES (?, ?, ?, ?)", texts)
+        connection.executemany("INSERT INTO search_partners VALUES (?, ?)", partners)
+        connection.executemany("INSERT INTO search_regions VALUES (?, ?)", regions)
+        connection.executemany("INSERT INTO search_meta VALUES (?, ?)", [
+            ("format", str(INDEX_FORMAT)),
+            ("fingerprint", fingerprint or ""),
+            ("built_at", time.strftime("%Y-%m-%dT%H:%M:%S")),
+        ])
+        connection.execute("COMMIT")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+    logger.info(f"✅ Built SQLite search index: {len(products)} products in {path}")
+
+
+def fts_query(query: str) -> Optional[str]:
+    """FTS5 MATCH expression: every normalized token as a prefix, ANDed; None for an empty query"""
+    tokens = normalize_text(query).split()
+    # Tokens are [a-z0-9]+ after normalization, so quoting is enough
+    return " ".join(f'"{token}"*' for token in tokens) or None
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """Read-only FTS5 search with one connection per thread"""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        meta = dict(self._connection().execute("SELECT key, value FROM search_meta").fetchall())
+        if meta.get("format") != str(INDEX_FORMAT):
+            raise RuntimeError(f"search tables in {self.path} have format {meta.get('format')}, rebuild them")
+        self.fingerprint = meta.get("fingerprint")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+            connection.execute("PRAGMA query_only = ON")
+            self._local.connection = connection
+        return connection
+
+    def _where(self, enhanced_filters: Optional[Dict[str, Any]]) -> Tuple[List[str], List[Any]]:
+        """SQL conditions on search_numeric (alias n), matching BitmapFilterIndex.evaluate"""
+        clauses, params = [], []
+        for key, value in (enhanced_filters or {}).items():
+            if value is None or value == "" or value == []:
+                continue
+            if key in RANGE_FILTERS:
+                column, bound, parser = RANGE_FILTERS[key]
+                number = parser(value)
+                if number is None:
+                    continue
+                clauses.append(f"n.{column} {'>=' if bound == 'min' else '<='} ?")
+                params.append(number)
+            elif key in CATEGORICAL_FIELDS:
+                values = [value] if isinstance(value, str) else list(value)
+                clauses.append(f"n.{key} IN ({', '.join('?' * len(values))})")
+                params.extend(normalize_text(str(v)) for v in values)
+            elif key == PARTNER_FIELD:
+                values = [value] if isinstance(value, str) else list(value)
+                clauses.append(
+                    f"n.rowid IN (SELECT rowid FROM search_partners WHERE partner IN ({', '.join('?' * len(values))}))"
+                )
+                params.extend(normalize_text(str(v)) for v in values)
+            elif key == REGION_FIELD:
+                values = [value] if isinstance(value, str) else list(value)
+                clauses.append(
+                    f"n.rowid IN (SELECT rowid FROM search_regions WHERE region IN ({', '.join('?' * len(values))}))"
+                )
+                directory = store_directory()
+                params.extend(directory.region_key(v) for v in values)
+            elif key == "in_stock" and value:
+                clauses.append("n.availability = ?")
+                # Categorical columns hold normalized values ("in stock")
+                params.append(normalize_text("in_stock"))
+        return clauses, params
+
+    def search(self, query: str, limit: int, offset: int, enhanced_filters: Optional[Dict[str, Any]],
+               sort_spec: Optional[Tuple[str, str, bool]]) -> Dict[str, Any]:
+        clauses, params = self._where(enhanced_filters)
+        match = fts_query(query)
+        if match:
+            source = "search_fts f JOIN search_numeric n ON n.rowid = f.rowid"
+            clauses.insert(0, "search_fts MATCH ?")
+            params.insert(0, match)
+        else:
+            source = "search_numeric n"
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        if sort_spec:
+            _, column, descending = sort_spec
+            # Missing values sort last in either direction, rowid breaks ties
+            order = f"n.{column} IS NULL, n.{column} {'DESC' if descending else 'ASC'}, n.rowid"
+        elif match:
+            order = f"bm25(search_fts, {', '.join(str(float(w)) for w in LEXICAL_WEIGHTS)}), n.rowid"
+        else:
+            order = "n.rowid"
+
+        connection = self._connection()
+        total = connection.execute(f"SELECT count(*) FROM {source} {where}", params).fetchone()[0]
+        rows = connection.execute(
+            f"SELECT d.document FROM {source} JOIN search_documents d ON d.rowid = n.rowid "
+            f"{where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return {"hits": [json.loads(document) for (document,) in rows], "total": total}
+
+    def health_check(self) -> Dict[str, Any]:
+        try:
+            documents = self._connection().execute("SELECT count(*) FROM search_documents").fetchone()[0]
+            return {
+                "status": "healthy",
+                "message": "SQLite FTS5 index is ready",
+                "stats": {"documents": documents, "path": str(self.path), "fingerprint": self.fingerprint}
+            }
+        except sqlite3.Error as e:
+            return {"status": "error", "message": f"SQLite error: {e}"}
+
+
+def main():
+    """Build the search tables in ddv.sqlite3 from merged_products.json"""
+    from app.config_simple import MERGED_PRODUCTS_FILE
+    from app.tools.catalog_snapshot import source_fingerprint
+    from app.tools.catalog_validation import load_catalog
+
+    logging.basicConfig(level=logging.INFO)
+    products = load_catalog(MERGED_PRODUCTS_FILE)
+
+    start = time.perf_counter()
+    path = SEARCH_BACKEND_CONFIG["sqlite_path"]
+    build_search_tables(products, path, source_fingerprint(MERGED_PRODUCTS_FILE))
+    print(f"🎉 Indexed {len(products)} products into {path} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
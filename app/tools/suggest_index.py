@@ -0,0 +1,209 @@
+"""
+Typeahead Suggestions for DDV Product Advisor
+Prefix lookup over diacritic-folded product names, brands and model aliases
+
+Every suggestion is reachable through several keys, all normalized with
+normalize_text and kept in one sorted PackedBytes array:
+    the full product name            "iphone 16 pro max 256 gb chinh hang vn a"
+    each later word of the model     "pro max 256 gb ...", "galaxy s 25 ultra ..."
+    model aliases                    "ip 16 pm" (see entity_matcher.model_aliases)
+    brands and brand aliases         "samsung", "ss", "tao"
+A prefix is answered with two binary searches for its key range, then the
+best-scored suggestions in the range. Prefixes of up to cached_prefix_chars
+characters, whose ranges span much of the catalog, have their top suggestions
+precomputed. The index is part of CatalogIndex, so it is rebuilt on every
+catalog reload.
+"""
+
+import logging
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config_simple import ENTITY_CONFIG
+from app.tools.columnar import PackedBytes
+from app.tools.entity_matcher import model_aliases, split_product_name
+from app.tools.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+PRODUCT, BRAND = 0, 1
+KINDS = ("product", "brand")
+
+# Score factors by where a key starts: a match at the start of a name beats one
+# on a later word, and aliases rank between the two
+NAME_START, WORD_START, ALIAS = 1.0, 0.6, 0.8
+
+# Out-of-stock products are still suggested, below the ones that can be bought
+UNAVAILABLE_FACTOR = 0.5
+
+
+def product_popularity(product: Dict[str, Any]) -> float:
+    """Review volume weighted by rating; availability decides ties between models"""
+    reviews = product["reviews"]
+    count = reviews["rating_count"]
+    rating = reviews["average_rating"] / (reviews["max_rating"] or 5) if count else 0.6
+    popularity = (1.0 + math.log1p(count)) * (0.5 + rating)
+    return popularity if product["availability"] == "in_stock" else popularity * UNAVAILABLE_FACTOR
+
+
+def _bisect(keys: PackedBytes, target: bytes, lo: int, hi: int) -> int:
+    """First index in [lo, hi) whose key is >= target"""
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if keys.get(mid) < target:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class SuggestIndex:
+    """Sorted key arrays pointing into flat suggestion columns"""
+
+    def __init__(self, products: Sequence[Dict[str, Any]], max_limit: int, cached_prefix_chars: int):
+        self.max_limit = max_limit
+        self.cached_prefix_chars = cached_prefix_chars
+
+        labels: List[str] = []
+        kinds: List[int] = []
+        ids: List[str] = []
+        prices: List[int] = []
+        popularity: List[float] = []
+        entries: List[Tuple[str, int, float]] = []   # (key, suggestion, score factor)
+
+        brand_suggestions: Dict[str, int] = {}
+        # Storage variants share a model, and its aliases
+        aliases_by_model: Dict[Tuple[str, ...], List[str]] = {}
+        for product in products:
+            suggestion = len(labels)
+            labels.append(product["name"])
+            kinds.append(PRODUCT)
+            ids.append(product["id"])
+            prices.append(product["price"]["current"])
+            popularity.append(product_popularity(product))
+
+            tokens = normalize_text(product["name"]).split()
+            if tokens:
+                entries.append((" ".join(tokens), suggestion, NAME_START))
+            # Later words of the model part ("pro max ...", "galaxy s 25 ..."), not bare numbers
+            model_tokens, _ = split_product_name(product["name"])
+            for start in range(1, len(model_tokens)):
+                if not tokens[start].isdigit():
+                    entries.append((" ".join(tokens[start:]), suggestion, WORD_START))
+            model = tuple(model_tokens)
+            if model not in aliases_by_model:
+                aliases_by_model[model] = [" ".join(alias) for alias in model_aliases(model_tokens)
+                                           if list(alias) != model_tokens[:len(alias)]]
+            entries.extend((alias, suggestion, ALIAS) for alias in aliases_by_model[model])
+
+            brand = product["brand"]
+            if brand:
+                if brand not in brand_suggestions:
+                    brand_suggestions[brand] = len(labels)
+                    labels.append(brand)
+                    kinds.append(BRAND)
+                    ids.append("")
+                    prices.append(0)
+                    popularity.append(0.0)
+                    entries.append((normalize_text(brand), brand_suggestions[brand], NAME_START))
+                popularity[brand_suggestions[brand]] += popularity[suggestion]
+
+        for brand, aliases in ENTITY_CONFIG["brand_aliases"].items():
+            if brand in brand_suggestions:
+                entries.extend((normalize_text(alias), brand_suggestions[brand], ALIAS) for alias in aliases)
+
+        self.labels = PackedBytes([label.encode("utf-8") for label in labels])
+        self.kinds = np.asarray(kinds, dtype=np.uint8)
+        self.ids = PackedBytes([product_id.encode("utf-8") for product_id in ids])
+        self.prices = np.asarray(prices, dtype=np.int64)
+        self.popularity = np.asarray(popularity, dtype=np.float32)
+
+        entries = [entry for entry in entries if entry[0]]
+        entries.sort(key=lambda entry: entry[0])
+        self.keys = PackedBytes([key.encode("ascii") for key, _, _ in entries])
+        self.key_suggestions = np.asarray([suggestion for _, suggestion, _ in entries], dtype=np.int32)
+        self.key_scores = np.asarray(
+            [self.popularity[suggestion] * factor for _, suggestion, factor in entries], dtype=np.float32
+        )
+
+        # Short prefixes: ranges cover much of the catalog, so their answers are precomputed,
+        # as slices of one flat array
+        self.prefix_ranges: Dict[str, Tuple[int, int]] = {}
+        tops = []
+        offset = 0
+        for length in range(1, cached_prefix_chars + 1):
+            bounds: Dict[str, List[int]] = {}
+            for row, (key, _, _) in enumerate(entries):
+                if len(key) >= length:
+                    bounds.setdefault(key[:length], [row, row])[1] = row + 1
+            for prefix, (lo, hi) in bounds.items():
+                top = self._top(lo, hi, max_limit)
+                self.prefix_ranges[prefix] = (offset, offset + len(top))
+                tops.append(top)
+                offset += len(top)
+        self.prefix_suggestions = np.concatenate(tops) if tops else np.empty(0, dtype=np.int32)
+
+        logger.info(f"✅ Suggest index: {len(self.keys)} keys for {len(self.labels)} suggestions")
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _top(self, lo: int, hi: int, limit: int) -> np.ndarray:
+        """Distinct suggestions of the keys in [lo, hi), best score first"""
+        keys = -self.key_scores[lo:hi]
+        # A suggestion can own several keys in the range; over-fetch before dropping repeats
+        wanted = min(len(keys), limit * 4)
+        if wanted < len(keys):
+            # Keys tied with the cutoff are taken in key order, so a short answer
+            # (or an uncached one) is a prefix of a longer one
+            threshold = keys[np.argpartition(keys, wanted - 1)[wanted - 1]]
+            below = np.flatnonzero(keys < threshold)
+            ties = np.flatnonzero(keys == threshold)[:wanted - len(below)]
+            picked = np.concatenate([below, ties])
+        else:
+            picked = np.arange(len(keys))
+        picked = picked[np.lexsort((picked, keys[picked]))]
+        suggestions = self.key_suggestions[lo:hi][picked]
+        _, first = np.unique(suggestions, return_index=True)
+        return suggestions[np.sort(first)][:limit]
+
+    def lookup(self, prefix: str, limit: int) -> np.ndarray:
+        """Suggestion numbers for a normalized prefix, best first"""
+        limit = min(limit, self.max_limit)
+        if not prefix:
+            return np.empty(0, dtype=np.int32)
+        if len(prefix) <= self.cached_prefix_chars:
+            start, end = self.prefix_ranges.get(prefix, (0, 0))
+            return self.prefix_suggestions[start:min(end, start + limit)]
+        target = prefix.encode("ascii")
+        lo = _bisect(self.keys, target, 0, len(self.keys))
+        hi = _bisect(self.keys, target + b"\x7f", lo, len(self.keys))
+        return self._top(lo, hi, limit) if hi > lo else np.empty(0, dtype=np.int32)
+
+    def suggestion(self, number: int) -> Dict[str, Any]:
+        kind = int(self.kinds[number])
+        item = {"text": self.labels.get(number).decode("utf-8"), "kind": KINDS[kind]}
+        if kind == PRODUCT:
+            item["id"] = self.ids.get(number).decode("utf-8")
+            item["price"] = int(self.prices[number])
+        return item
+
+    def suggest(self, text: str, limit: int, max_words: int) -> Optional[Dict[str, Any]]:
+        """Suggestions for what is being typed at the end of text
+
+        The longest run of trailing words (at most max_words) that is a known
+        prefix wins, so "so sánh ip 16 p" completes "ip 16 p". Returns
+        {"replace_words": how many trailing words a pick replaces, "suggestions": [...]},
+        or None if nothing matches.
+        """
+        words = text.split()
+        for start in range(max(0, len(words) - max_words), len(words)):
+            numbers = self.lookup(normalize_text(" ".join(words[start:])), limit)
+            if len(numbers):
+                return {
+                    "replace_words": len(words) - start,
+                    "suggestions": [self.suggestion(int(number)) for number in numbers],
+                }
+        return None
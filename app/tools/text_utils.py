@@ -0,0 +1,34 @@
+"""
+Text normalization helpers for DDV Product Advisor
+Diacritic folding and tokenization shared by the local indexes
+"""
+
+import re
+import unicodedata
+from typing import List
+
+# Vietnamese letters that do not decompose under NFD
+_SPECIAL_CHARS = str.maketrans({"đ": "d", "Đ": "d"})
+
+# Split letter/digit boundaries so "ip16" and "iphone 16" share tokens
+_LETTER_DIGIT = re.compile(r"(?<=[a-z])(?=[0-9])|(?<=[0-9])(?=[a-z])")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def fold_diacritics(text: str) -> str:
+    """Lowercase and strip Vietnamese diacritics ("Điện thoại" -> "dien thoai")"""
+    decomposed = unicodedata.normalize("NFD", text.translate(_SPECIAL_CHARS))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def normalize_text(text: str) -> str:
+    """Fold diacritics, split letter/digit runs and collapse punctuation to spaces"""
+    if not text:
+        return ""
+    folded = _NON_ALNUM.sub(" ", fold_diacritics(text))
+    return " ".join(_LETTER_DIGIT.sub(" ", folded).split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized tokens"""
+    return normalize_text(text).split()
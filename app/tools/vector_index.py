@@ -0,0 +1,197 @@
+"""
+Character n-gram vector index for DDV Product Advisor
+Offline fuzzy matching for queries like "ip16 pm" or unaccented Vietnamese
+"""
+
+import logging
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config_simple import VECTOR_CONFIG
+from app.tools.entity_matcher import expand_abbreviations
+from app.tools.text_utils import normalize_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Per-thread dense query vectors, zeroed again after each query
+_scratch = threading.local()
+
+
+def _query_vector(dim: int) -> np.ndarray:
+    vector = getattr(_scratch, "vector", None)
+    if vector is None or len(vector) != dim:
+        vector = _scratch.vector = np.zeros(dim, dtype=np.float32)
+    return vector
+
+
+class CharNgramVectorIndex:
+    """Hashed character n-gram TF-IDF vectors stored as a sparse NumPy matrix.
+
+    The matrix is kept column-major (one posting list per hashed n-gram), so
+    a query only touches the postings of its own n-grams. Short n-grams are
+    shared by many products, so scoring is two-phase: the rarest query
+    n-grams are accumulated with ``np.bincount`` to pick candidates, which
+    are then scored exactly from a row-major copy of the same matrix.
+    A filter mask is applied to the postings before candidates are picked,
+    so filtered queries keep their recall.
+    """
+
+    def __init__(self, documents: Sequence[str], dim: int = None, ngram_range: Tuple[int, int] = None):
+        self.dim = dim or VECTOR_CONFIG["dim"]
+        self.ngram_range = tuple(ngram_range or VECTOR_CONFIG["ngram_range"])
+        self.size = len(documents)
+        self._build(documents)
+
+    def _features(self, text: str, gram_cache: Dict[str, int] = None) -> Dict[int, int]:
+        """Hash the character n-grams of a text into feature counts"""
+        padded = f" {normalize_text(text)} "
+        counts: Dict[int, int] = {}
+        if len(padded) <= 2:
+            return counts
+
+        mask = self.dim - 1
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                gram = padded[i:i + n]
+                feature = gram_cache.get(gram) if gram_cache is not None else None
+                if feature is None:
+                    # crc32 is stable across processes, unlike hash()
+                    feature = zlib.crc32(gram.encode("utf-8")) & mask
+                    if gram_cache is not None:
+                        gram_cache[gram] = feature
+                counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def _build(self, documents: Sequence[str]):
+        """Build IDF weights and the column-major TF-IDF matrix"""
+        gram_cache: Dict[str, int] = {}
+        doc_features = [self._features(doc, gram_cache) for doc in documents]
+
+        rows: List[int] = []
+        cols: List[int] = []
+        tfs: List[float] = []
+        for row, features in enumerate(doc_features):
+            for feature, count in features.items():
+                rows.append(row)
+                cols.append(feature)
+                tfs.append(count)
+
+        rows_arr = np.asarray(rows, dtype=np.int32)
+        cols_arr = np.asarray(cols, dtype=np.int32)
+        tf_arr = 1.0 + np.log(np.asarray(tfs, dtype=np.float32))
+
+        df = np.bincount(cols_arr, minlength=self.dim).astype(np.float32)
+        self.idf = (np.log((1.0 + self.size) / (1.0 + df)) + 1.0).astype(np.float32)
+
+        # L2-normalize each document vector
+        weights = tf_arr * self.idf[cols_arr]
+        norms = np.sqrt(np.bincount(rows_arr, weights=weights * weights, minlength=self.size))
+        norms[norms == 0] = 1.0
+        weights = weights / norms[rows_arr]
+
+        # Row-major copy (rows are already grouped) for exact candidate scoring
+        feature_dtype = np.uint16 if self.dim <= 2 ** 16 else np.int32
+        self.doc_features = cols_arr.astype(feature_dtype)
+        self.doc_weights = weights.astype(np.float32)
+        self.doc_indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows_arr, minlength=self.size), out=self.doc_indptr[1:])
+
+        # Sort by feature to get CSC posting lists
+        order = np.argsort(cols_arr, kind="stable")
+        self.rows = rows_arr[order]
+        self.weights = weights[order].astype(np.float32)
+        self.indptr = np.zeros(self.dim + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols_arr, minlength=self.dim), out=self.indptr[1:])
+
+        logger.info(f"✅ Built n-gram vector index: {self.size} docs, {len(self.rows)} postings")
+
+    def query(self, text: str, top_k: int = 10, min_score: float = None,
+              mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Return (row, cosine similarity) pairs for the top_k closest documents within mask"""
+        if min_score is None:
+            min_score = VECTOR_CONFIG["min_score"]
+
+        # Abbreviations share no n-grams with what they stand for ("pm" / "pro max")
+        features = self._features(" ".join(expand_abbreviations(tokenize(text))))
+        if not features or self.size == 0:
+            return []
+
+        feature_ids = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+        query_weights = (1.0 + np.log(np.fromiter(features.values(), dtype=np.float32, count=len(features))))
+        query_weights *= self.idf[feature_ids]
+        query_weights /= np.linalg.norm(query_weights) or 1.0
+
+        max_candidates = VECTOR_CONFIG["rerank_candidates"]
+        allowed = int(np.count_nonzero(mask)) if mask is not None else self.size
+        if allowed == 0:
+            return []
+        if allowed < self.size:
+            if allowed <= max_candidates * 4:
+                # Few rows pass the filters: score all of them exactly
+                candidates = np.flatnonzero(mask)
+            else:
+                candidates = self._candidates(feature_ids, query_weights, mask, len(mask) / allowed)
+        else:
+            candidates = self._candidates(feature_ids, query_weights, None, 1.0)
+        if len(candidates) == 0:
+            return []
+
+        # Phase 2: exact cosine for the candidates from their row-major vectors
+        query_vector = _query_vector(self.dim)
+        query_vector[feature_ids] = query_weights
+        c_starts = self.doc_indptr[candidates]
+        c_lengths = self.doc_indptr[candidates + 1] - c_starts
+        positions = np.repeat(c_starts - (c_lengths.cumsum() - c_lengths), c_lengths) + np.arange(c_lengths.sum())
+        candidate_scores = np.bincount(
+            np.repeat(np.arange(len(candidates)), c_lengths),
+            weights=query_vector[self.doc_features[positions]] * self.doc_weights[positions],
+            minlength=len(candidates),
+        )
+        query_vector[feature_ids] = 0.0
+
+        k = min(top_k, len(candidates))
+        top = np.argpartition(candidate_scores, -k)[-k:]
+        top = top[np.argsort(candidate_scores[top])[::-1]]
+        return [
+            (int(candidates[i]), float(candidate_scores[i]))
+            for i in top if candidate_scores[i] >= min_score
+        ]
+
+    def _candidates(self, feature_ids: np.ndarray, query_weights: np.ndarray, mask: Optional[np.ndarray],
+                    sparsity: float) -> np.ndarray:
+        """Phase 1: rows with the best partial scores over the rarest query n-grams
+
+        sparsity (rows per row that passes the mask) widens the posting budget so
+        about the same number of postings survive the mask.
+        """
+        starts = self.indptr[feature_ids]
+        lengths = self.indptr[feature_ids + 1] - starts
+        if not lengths.any():
+            return np.empty(0, dtype=np.int64)
+
+        order = np.argsort(lengths, kind="stable")
+        budget = VECTOR_CONFIG["posting_budget"] * min(sparsity, VECTOR_CONFIG["max_budget_scale"])
+        n_primary = max(1, int(np.searchsorted(np.cumsum(lengths[order]), budget, side="right")))
+        primary = order[:n_primary]
+
+        p_starts, p_lengths = starts[primary], lengths[primary]
+        positions = np.repeat(p_starts - (p_lengths.cumsum() - p_lengths), p_lengths) + np.arange(p_lengths.sum())
+        touched = self.rows[positions]
+        weights = self.weights[positions] * np.repeat(query_weights[primary], p_lengths)
+        if mask is not None:
+            keep = mask[touched]
+            touched, weights = touched[keep], weights[keep]
+        if len(touched) == 0:
+            return touched
+
+        scores = np.bincount(touched, weights=weights, minlength=self.size)
+        # Scanning the dense scores for distinct rows beats hashing the touched ones
+        rows = np.flatnonzero(scores > 0)
+        max_candidates = VECTOR_CONFIG["rerank_candidates"]
+        if len(rows) > max_candidates:
+            rows = rows[np.argpartition(scores[rows], -max_candidates)[-max_candidates:]]
+        return rows
@@ -0,0 +1,114 @@
+"""
+Session Working Set for DDV Product Advisor
+Recently shown product cards kept in tool_context.state for follow-up questions
+"""
+
+import re
+from typing import List, Dict, Any, Callable, Optional
+
+from app.config_simple import WORKING_SET_CONFIG
+from app.tools.entity_matcher import model_aliases, split_product_name
+from app.tools.formatting import product_card
+from app.tools.text_utils import normalize_text, tokenize
+
+# Vietnamese ordinal words (diacritics folded) -> 1-based position; -1 is the last one
+ORDINAL_WORDS = {
+    "nhat": 1, "dau": 1, "dau tien": 1,
+    "hai": 2, "nhi": 2, "ba": 3, "tu": 4, "bon": 4, "nam": 5,
+    "sau": 6, "bay": 7, "tam": 8, "chin": 9, "muoi": 10,
+    "cuoi": -1, "cuoi cung": -1,
+}
+
+# "cái thứ 2", "sản phẩm thứ hai", "số 3", "#1", "máy cuối cùng"
+_ORDINAL = re.compile(
+    r"^(?:(?:cai|san pham|sp|mau|may|con|dien thoai|lua chon)\s+)?(?:(?:thu|so)\s+)?(?P<value>[a-z0-9 ]+?)$"
+)
+
+
+def parse_ordinal(reference: str) -> Optional[int]:
+    """1-based position in a reference like "cái thứ 2" (-1 for "cái cuối"), or None"""
+    text = normalize_text(reference.replace("#", " "))
+    match = _ORDINAL.match(text)
+    if not match:
+        return None
+    value = match.group("value")
+    if value.isdigit():
+        return int(value) or None
+    # A bare word ("ba", "nam") is too ambiguous without "cái"/"thứ"
+    if value == text and " " not in value:
+        return None
+    return ORDINAL_WORDS.get(value)
+
+
+def load_working_set(tool_context, index_version: Optional[str]) -> Dict[str, Any]:
+    """The session's working set; cards cached for another catalog version are dropped
+
+    The shown order survives a catalog reload so ordinals still resolve, but the
+    cached cards may carry old prices and are looked up again.
+    """
+    working_set = tool_context.state.get(WORKING_SET_CONFIG["state_key"]) or {}
+    if working_set.get("version") != index_version:
+        return {"version": index_version, "shown": working_set.get("shown", []), "cards": {}}
+    return working_set
+
+
+def remember_products(tool_context, cards: List[Dict[str, Any]], index_version: Optional[str], shown: bool = True):
+    """Add cards to the working set; shown=True makes them the list ordinals refer to"""
+    working_set = load_working_set(tool_context, index_version)
+
+    # Most recently seen last, oldest evicted first
+    cached = dict(working_set["cards"])
+    for card in cards:
+        cached.pop(card.get("id"), None)
+        cached[card.get("id")] = card
+    while len(cached) > WORKING_SET_CONFIG["max_items"]:
+        cached.pop(next(iter(cached)))
+
+    shown_ids = [card.get("id") for card in cards] if shown else working_set["shown"]
+    # Reassign rather than mutate so the change lands in the state delta
+    tool_context.state[WORKING_SET_CONFIG["state_key"]] = {
+        "version": index_version,
+        "shown": shown_ids,
+        "cards": cached,
+    }
+
+
+def resolve_reference(tool_context, reference: str, index_version: Optional[str],
+                      lookup: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None) -> Optional[Dict[str, Any]]:
+    """Cached card for an id, an ordinal ("cái thứ 2") or a unique name among recent products
+
+    A name must be a recent product's full name or one of its model aliases
+    (optionally with storage): "ip 16 pm" but not "iPhone 16", which names
+    another product the caller should look up in the catalog.
+    lookup(product_id) fetches a shown product whose card is no longer cached.
+    """
+    working_set = load_working_set(tool_context, index_version)
+    cards = working_set["cards"]
+    if not reference or not (cards or working_set["shown"]):
+        return None
+
+    if reference in cards:
+        return cards[reference]
+
+    position = parse_ordinal(reference)
+    if position is not None:
+        shown = working_set["shown"]
+        index = position - 1 if position > 0 else len(shown) + position
+        if not 0 <= index < len(shown):
+            return None
+        card = cards.get(shown[index])
+        if card is None and lookup is not None:
+            product = lookup(shown[index])
+            card = product_card(product) if product else None
+        return card
+
+    tokens = tokenize(reference)
+    model, storage = split_product_name(reference)
+    matches = []
+    for card in cards.values():
+        name = card.get("name", "")
+        card_model, card_storage = split_product_name(name)
+        if tokens == tokenize(name) or (
+                tuple(model) in model_aliases(card_model) and storage in (None, card_storage)):
+            matches.append(card)
+    return matches[0] if len(matches) == 1 else None
@@ -0,0 +1,205 @@
+"""
+Turn Tracing for DDV Product Advisor
+Lightweight spans for the agent turn, model calls, tools, engine calls and serialization
+
+Spans are keyed by ADK ids, so no context needs threading through the code:
+    agent.turn       invocation_id           (before/after_agent_callback)
+    model.call       invocation_id           (before/after_model_callback)
+    tool.<name>      function_call_id        (before/after_tool_callback)
+    anything else    tracer.span(name, tool_context), child of the open tool span
+
+Finished spans are appended to a JSONL file, one object per line:
+    {"trace", "span", "parent", "name", "start", "ms", "attrs"}
+Render them with trace_report.py. Enable with DDV_TRACING=1.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config_simple import TRACING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace (an agent turn)"""
+    trace: str
+    name: str
+    parent: Optional[str] = None
+    span: str = field(default_factory=lambda: os.urandom(8).hex())
+    start: float = field(default_factory=time.time)
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "trace": self.trace,
+            "span": self.span,
+            "parent": self.parent,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class JsonlExporter:
+    """Buffers finished spans and appends them to a JSONL file"""
+
+    def __init__(self, path: Path, flush_every: int):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+
+    def export(self, record: Dict[str, Any], flush: bool = False):
+        with self._lock:
+            self._buffer.append(json.dumps(record, ensure_ascii=False, default=str))
+            if flush or len(self._buffer) >= self.flush_every:
+                self._flush()
+
+    def _flush(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(self._buffer) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write traces to {self.path}: {e}")
+        self._buffer.clear()
+
+
+class Tracer:
+    """Open spans by key; a span is exported when it ends"""
+
+    def __init__(self, exporter: Optional[JsonlExporter]):
+        self.exporter = exporter
+        self._open: Dict[tuple, Span] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start(self, key: tuple, name: str, trace: str, parent_key: Optional[tuple] = None, **attrs) -> Optional[Span]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            parent = self._open.get(parent_key) if parent_key else None
+            span = Span(trace=trace, name=name, parent=parent.span if parent else None, attrs=attrs)
+            self._open[key] = span
+        return span
+
+    def end(self, key: tuple, **attrs) -> Optional[Span]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            span = self._open.pop(key, None)
+        if span is not None:
+            span.set(**attrs)
+            # A finished turn flushes, so a trace is on disk as soon as the reply is
+            self.exporter.export(span.record(), flush=span.parent is None)
+        return span
+
+    @contextmanager
+    def span(self, name: str, tool_context=None, **attrs):
+        """Time a block inside a tool; yields a span to attach attributes to"""
+        if not self.enabled or tool_context is None:
+            yield _NOOP
+            return
+
+        trace = getattr(tool_context, "invocation_id", None) or "untraced"
+        call_id = getattr(tool_context, "function_call_id", None)
+        with self._lock:
+            parent = self._open.get(("tool", call_id)) or self._open.get(("turn", trace))
+        span = Span(trace=trace, name=name, parent=parent.span if parent else None, attrs=attrs)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            self.exporter.export(span.record())
+
+
+tracer = Tracer(
+    JsonlExporter(TRACING_CONFIG["file"], TRACING_CONFIG["flush_every"]) if TRACING_CONFIG["enabled"] else None
+)
+
+
+# ADK agent callbacks; each returns None so the agent proceeds normally
+
+def _before_agent(callback_context):
+    tracer.start(("turn", callback_context.invocation_id), "agent.turn", callback_context.invocation_id,
+                 agent=callback_context.agent_name)
+
+
+def _after_agent(callback_context):
+    tracer.end(("turn", callback_context.invocation_id))
+
+
+def _before_model(callback_context, llm_request):
+    invocation_id = callback_context.invocation_id
+    tracer.start(("model", invocation_id), "model.call", invocation_id, ("turn", invocation_id),
+                 model=getattr(llm_request, "model", None))
+
+
+def _after_model(callback_context, llm_response):
+    usage = getattr(llm_response, "usage_metadata", None)
+    tracer.end(
+        ("model", callback_context.invocation_id),
+        prompt_tokens=getattr(usage, "prompt_token_count", None),
+        output_tokens=getattr(usage, "candidates_token_count", None),
+    )
+
+
+def _on_model_error(callback_context, llm_request, error):
+    tracer.end(("model", callback_context.invocation_id), error=type(error).__name__)
+
+
+def _before_tool(tool, args, tool_context):
+    invocation_id = tool_context.invocation_id
+    tracer.start(("tool", tool_context.function_call_id), f"tool.{tool.name}", invocation_id,
+                 ("turn", invocation_id), args=json.dumps(args, ensure_ascii=False, default=str)[:200])
+
+
+def _after_tool(tool, args, tool_context, tool_response):
+    tracer.end(("tool", tool_context.function_call_id), response_chars=len(str(tool_response)))
+
+
+def _on_tool_error(tool, args, tool_context, error):
+    tracer.end(("tool", tool_context.function_call_id), error=type(error).__name__)
+
+
+def tracing_callbacks() -> Dict[str, Any]:
+    """Agent(...) keyword arguments that record spans; empty when tracing is off"""
+    if not tracer.enabled:
+        return {}
+    return {
+        "before_agent_callback": _before_agent,
+        "after_agent_callback": _after_agent,
+        "before_model_callback": _before_model,
+        "after_model_callback": _after_model,
+        "on_model_error_callback": _on_model_error,
+        "before_tool_callback": _before_tool,
+        "after_tool_callback": _after_tool,
+        "on_tool_error_callback": _on_tool_error,
+    }
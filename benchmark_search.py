@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the local search indexes
+Replicates merged_products.json into a synthetic catalog and times queries
+
+Usage: python benchmark_search.py [num_products]
+"""
+
+import copy
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+import numpy as np
+
+from app.config_simple import MERGED_PRODUCTS_FILE, OUTPUT_CONFIG
+from app.tools.catalog_index import CatalogIndex
+from app.tools.catalog_snapshot import save_snapshot, load_snapshot
+from app.tools.catalog_validation import load_catalog
+from app.tools.formatting import product_card, compact_payload, estimate_tokens
+
+SAMPLE_QUERIES = [
+    "ip16 pm",
+    "iphone 16 pro max 256gb",
+    "sam sung s25 ultra",
+    "dien thoai samsung gap",
+    "z fold7",
+    "a56 5g",
+]
+
+
+SYNTHETIC_SERIES = {
+    "Apple": ["iPhone", "iPad", "iPad Air", "iPad Pro"],
+    "Samsung": ["Galaxy A", "Galaxy S", "Galaxy M", "Galaxy Z Fold", "Galaxy Z Flip", "Galaxy Tab S"],
+    "Xiaomi": ["Redmi Note", "Redmi", "Poco X", "Poco F", "Xiaomi"],
+    "OPPO": ["Reno", "Find X", "A"],
+    "vivo": ["V", "Y", "X"],
+    "realme": ["C", "GT", "Note"],
+    "Nokia": ["G", "C", "X"],
+    "Honor": ["X", "Magic", "Play"],
+    "Tecno": ["Spark", "Camon", "Pova"],
+    "Infinix": ["Hot", "Note", "Zero"],
+}
+SYNTHETIC_SUFFIXES = ["", "Pro", "Pro Max", "Plus", "Ultra", "Lite", "FE", "Neo", "5G", "Mini"]
+SYNTHETIC_STORAGE = ["64GB", "128GB", "256GB", "512GB", "1TB"]
+
+
+def synthetic_catalog(size: int) -> List[Dict[str, Any]]:
+    """Real catalog followed by randomly generated model names, up to `size` products"""
+    base = load_catalog(MERGED_PRODUCTS_FILE, workers=1)
+
+    rng = random.Random(42)
+    products = base[:size]
+    for i in range(len(products), size):
+        brand = rng.choice(list(SYNTHETIC_SERIES))
+        series = rng.choice(SYNTHETIC_SERIES[brand])
+        storage = rng.choice(SYNTHETIC_STORAGE)
+        name = f"{series} {rng.randint(1, 99)}{rng.choice(['', 'e', 's', 'i'])} {rng.choice(SYNTHETIC_SUFFIXES)} {storage} Chính Hãng"
+
+        product = copy.deepcopy(base[i % len(base)])
+        product["id"] = f"synthetic-{i}"
+        product["name"] = " ".join(name.split())
+        product["brand"] = brand
+        product["price"]["current"] = rng.randrange(1_000_000, 50_000_000, 10_000)
+        product.setdefault("specs", {})["storage"] = storage
+        products.append(product)
+    return products
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    products = synthetic_catalog(size)
+    print(f"📦 Synthetic catalog: {len(products)} products")
+
+    start = time.perf_counter()
+    catalog = CatalogIndex(products)
+    print(f"🏗️  Index build: {time.perf_counter() - start:.2f}s")
+
+    report_snapshot(catalog)
+    report("Vector search", catalog.vector_search)
+    apple = catalog.filter_mask({"brand": "Apple"})
+    report("Vector search (brand=Apple)", lambda query: catalog.vector_search(query, mask=apple))
+    report("Entity lookup", catalog.mentioned_products)
+    report("Cheapest top-10", lambda query: cheapest(catalog, query))
+    report("Cheapest top-10, filters only", lambda query: cheapest(catalog, query, filters={"brand": "Apple"}),
+           queries=[""])
+    report_tokens(catalog)
+
+
+def cheapest(catalog: CatalogIndex, query: str, k: int = 10, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """Matches ordered by price via partial selection, as the local sorted search does"""
+    rows = np.flatnonzero(catalog.match_mask(query, catalog.filter_mask(filters)))
+    return [catalog.products[row] for row in catalog.filter_index.top_k(rows, "price", False, k)]
+
+
+def report_snapshot(catalog: CatalogIndex):
+    """Time saving and loading the catalog snapshot that workers start from"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "catalog_snapshot.pkl"
+        start = time.perf_counter()
+        save_snapshot(catalog, path, "bench")
+        saved = time.perf_counter()
+        load_snapshot(path, "bench")
+        loaded = time.perf_counter()
+        print(f"💾 Snapshot: {path.stat().st_size / 1e6:.1f}MB, save {saved - start:.2f}s, "
+              f"load {(loaded - saved) * 1000:.0f}ms")
+
+
+def report_tokens(catalog: CatalogIndex, queries: List[str] = SAMPLE_QUERIES, k: int = 10):
+    """Estimated model input tokens per tool call: full payload vs compact summary"""
+    full_total = compact_total = 0
+    for query in queries:
+        payload = {
+            "type": "product-display",
+            "message": f"Tìm thấy {k} sản phẩm phù hợp với '{query}'",
+            "products": [product_card(p) for p in cheapest(catalog, query, k)]
+        }
+        full = estimate_tokens(json.dumps(payload, ensure_ascii=False))
+        compact = estimate_tokens(json.dumps(compact_payload(payload), ensure_ascii=False))
+        full_total, compact_total = full_total + full, compact_total + compact
+        print(f"🧮 Tokens '{query}': full={full} compact={compact}")
+
+    print(f"🧮 Tokens per call: full={full_total / len(queries):.0f} "
+          f"compact={compact_total / len(queries):.0f} "
+          f"(budget {OUTPUT_CONFIG['token_budget']})")
+
+
+def report(label: str, func, queries: List[str] = SAMPLE_QUERIES, repeat: int = 50):
+    """Time func over the sample queries and print latency percentiles"""
+    timings = []
+    for query in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        top = func(query)[:3]
+        print(f"🔍 {label} '{query}': {[p['name'] for p in top]}")
+
+    print(f"⏱️  {label} p50={percentile(timings, 0.5):.3f}ms "
+          f"p95={percentile(timings, 0.95):.3f}ms p99={percentile(timings, 0.99):.3f}ms")
+
+if __name__ == "__main__":
+    main()
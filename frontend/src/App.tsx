@@ -151,6 +151,7 @@ export default function App() {
       let lastCoordinatorResponse = undefined;
       let functionCall = null;
       let functionResponse = null;
+      let productDisplay = null;
       let sources = null;
 
       // Check if content.parts exists and has text
@@ -198,6 +199,16 @@ export default function App() {
         console.log('[SSE EXTRACT] Found last coordinator response:', lastCoordinatorResponse.substring(0, 200) + '...');
       }
 
+      // Full product-display payload published by the tools (the model only sees a summary)
+      if (
+        parsed.actions &&
+        parsed.actions.stateDelta &&
+        parsed.actions.stateDelta.product_display
+      ) {
+        productDisplay = parsed.actions.stateDelta.product_display;
+        console.log('[SSE EXTRACT] Found product display with', productDisplay.products?.length || 0, 'products');
+      }
+
       // Extract website count from research agents
       let sourceCount = 0;
       if (parsed.actions && parsed.actions.stateDelta) {
@@ -212,10 +223,10 @@ export default function App() {
         sources = sourceCount;
       }
 
-      return { textParts, agent, finalReportWithCitations, lastCoordinatorResponse, functionCall, functionResponse, sources };
+      return { textParts, agent, finalReportWithCitations, lastCoordinatorResponse, functionCall, functionResponse, productDisplay, sources };
     } catch (error) {
       console.error('[SSE EXTRACT] Error parsing SSE data:', error);
-      return { textParts: [], agent: '', finalReportWithCitations: undefined, lastCoordinatorResponse: undefined, functionCall: null, functionResponse: null, sources: null };
+      return { textParts: [], agent: '', finalReportWithCitations: undefined, lastCoordinatorResponse: undefined, functionCall: null, functionResponse: null, productDisplay: null, sources: null };
     }
   };
 
@@ -256,7 +267,7 @@ export default function App() {
   // };
 
   const processSseEventData = (jsonData: string, aiMessageId: string) => {
-    const { textParts, agent, finalReportWithCitations, lastCoordinatorResponse, functionCall, functionResponse, sources } = extractDataFromSSE(jsonData);
+    const { textParts, agent, finalReportWithCitations, lastCoordinatorResponse, functionCall, functionResponse, productDisplay, sources } = extractDataFromSSE(jsonData);
 
     if (agent && agent !== currentAgentRef.current) {
       currentAgentRef.current = agent;
@@ -287,6 +298,22 @@ export default function App() {
       }
     }
 
+    // Handle product display published through session state
+    if (productDisplay && productDisplay.type === 'product-display') {
+      setMessages(prev => {
+        const updated = [...prev];
+        const aiMessageIndex = updated.findIndex(m => m.id === aiMessageId);
+        if (aiMessageIndex !== -1) {
+          updated[aiMessageIndex] = {
+            ...updated[aiMessageIndex],
+            agent: agent || updated[aiMessageIndex].agent,
+            productData: productDisplay
+          };
+        }
+        return updated;
+      });
+    }
+
     // Handle last coordinator response (contains product display JSON)
     if (lastCoordinatorResponse) {
       console.log('[SSE HANDLER] Last coordinator response found, updating message');
@@ -429,6 +456,10 @@ export default function App() {
           let finalText = '';
           
           for (const event of responseData) {
+            // Full product-display payload published by the tools through session state
+            if (event.actions?.stateDelta?.product_display?.type === 'product-display') {
+              productData = event.actions.stateDelta.product_display;
+            }
             if (event.content?.parts) {
               for (const part of event.content.parts) {
                 if (part.functionResponse?.response?.result) {
@@ -3,7 +3,9 @@ import { Button } from "@/components/ui/button";
 import { Textarea } from "@/components/ui/textarea";
 import { Card, CardContent } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
-import { Loader2, Send, Mic, Image as ImageIcon, X, Check, Play, Pause, Square, Info } from "lucide-react";
+import { Loader2, Send, Mic, Image as ImageIcon, X, Check, Play, Pause, Square, Info, Search, Tag } from "lucide-react";
+import { suggestService } from "@/services/suggestService";
+import { Suggestion } from "@/types/suggest";
 
 interface InputFormProps {
   onSubmit: (query: string, imageFile: File | null, audioFile: File | null) => void;
@@ -20,6 +22,9 @@ export function InputForm({ onSubmit, isLoading, context = 'homepage' }: InputFo
   const [isPlaying, setIsPlaying] = useState(false);
   const [waveformData, setWaveformData] = useState<number[]>(new Array(32).fill(0));
   const [showRecordingHelp, setShowRecordingHelp] = useState(false);
+  const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
+  const [replaceWords, setReplaceWords] = useState(0);
+  const [activeSuggestion, setActiveSuggestion] = useState(-1);
   const textareaRef = useRef<HTMLTextAreaElement>(null);
   const fileInputRef = useRef<HTMLInputElement>(null);
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
@@ -346,12 +351,42 @@ export function InputForm({ onSubmit, isLoading, context = 'homepage' }: InputFo
     }
   };
 
+  const closeSuggestions = () => {
+    suggestService.cancel();
+    setSuggestions([]);
+    setActiveSuggestion(-1);
+  };
+
+  // Typeahead: ask for completions of the last words on every keystroke
+  const handleInputChange = async (value: string) => {
+    setInputValue(value);
+    // A trailing space means the word is finished
+    if (!value.trim() || /\s$/.test(value)) {
+      closeSuggestions();
+      return;
+    }
+    const result = await suggestService.suggest(value);
+    if (result === null) return; // superseded by a newer keystroke, or failed
+    setSuggestions(result.suggestions);
+    setReplaceWords(result.replace_words);
+    setActiveSuggestion(-1);
+  };
+
+  const pickSuggestion = (suggestion: Suggestion) => {
+    const words = inputValue.trimEnd().split(/\s+/);
+    const kept = words.slice(0, Math.max(0, words.length - replaceWords));
+    setInputValue([...kept, suggestion.text].join(" ") + " ");
+    closeSuggestions();
+    textareaRef.current?.focus();
+  };
+
   const handleSubmit = (e: React.FormEvent) => {
     e.preventDefault();
     if (isLoading) return;
     
     if (!inputValue.trim() && !selectedImage && !recordedAudio) return;
     
+    closeSuggestions();
     onSubmit(inputValue.trim(), selectedImage, recordedAudio);
     setInputValue("");
     setSelectedImage(null);
@@ -360,6 +395,25 @@ export function InputForm({ onSubmit, isLoading, context = 'homepage' }: InputFo
   };
 
   const handleKeyDown = (e: React.KeyboardEvent<HTMLTextAreaElement>) => {
+    if (suggestions.length > 0) {
+      if (e.key === "ArrowDown" || e.key === "ArrowUp") {
+        e.preventDefault();
+        // -1 is the text itself, so stepping past either end returns to it
+        const next = activeSuggestion + (e.key === "ArrowDown" ? 1 : -1);
+        setActiveSuggestion(next >= suggestions.length ? -1 : next < -1 ? suggestions.length - 1 : next);
+        return;
+      }
+      if ((e.key === "Enter" || e.key === "Tab") && !e.shiftKey && activeSuggestion >= 0) {
+        e.preventDefault();
+        pickSuggestion(suggestions[activeSuggestion]);
+        return;
+      }
+      if (e.key === "Escape") {
+        e.preventDefault();
+        closeSuggestions();
+        return;
+      }
+    }
     if (e.key === "Enter" && !e.shiftKey) {
       e.preventDefault();
       handleSubmit(e);
@@ -409,14 +463,57 @@ export function InputForm({ onSubmit, isLoading, context = 'homepage' }: InputFo
               <Textarea
                 ref={textareaRef}
                 value={inputValue}
-                onChange={(e) => setInputValue(e.target.value)}
+                onChange={(e) => handleInputChange(e.target.value)}
                 onKeyDown={handleKeyDown}
+                onBlur={closeSuggestions}
                 placeholder={placeholderText}
                 rows={3}
                 className="resize-none pr-16 min-h-[80px]"
                 disabled={isRecording}
               />
               
+              {/* Typeahead suggestions */}
+              {suggestions.length > 0 && !isRecording && (
+                <ul
+                  role="listbox"
+                  aria-label="Gợi ý sản phẩm"
+                  className="absolute bottom-full left-0 right-0 mb-2 z-20 max-h-72 overflow-y-auto rounded-lg border border-border bg-popover shadow-lg py-1"
+                >
+                  {suggestions.map((suggestion, index) => (
+                    <li
+                      key={`${suggestion.kind}-${suggestion.id ?? suggestion.text}`}
+                      role="option"
+                      aria-selected={index === activeSuggestion}
+                      // mousedown, not click: the textarea's blur would close the list first
+                      onMouseDown={(e) => {
+                        e.preventDefault();
+                        pickSuggestion(suggestion);
+                      }}
+                      onMouseEnter={() => setActiveSuggestion(index)}
+                      className={`flex items-center justify-between px-3 py-1.5 text-sm cursor-pointer ${
+                        index === activeSuggestion ? "bg-muted" : ""
+                      }`}
+                    >
+                      <span className="flex items-center space-x-2 min-w-0">
+                        {suggestion.kind === "brand" ? (
+                          <Tag className="h-3.5 w-3.5 text-blue-500 flex-shrink-0" />
+                        ) : (
+                          <Search className="h-3.5 w-3.5 text-muted-foreground flex-shrink-0" />
+                        )}
+                        <span className="truncate">{suggestion.text}</span>
+                      </span>
+                      {suggestion.kind === "brand" ? (
+                        <Badge variant="secondary" className="ml-2 text-xs">Thương hiệu</Badge>
+                      ) : suggestion.price ? (
+                        <span className="ml-2 text-xs text-muted-foreground whitespace-nowrap">
+                          {suggestion.price.toLocaleString('vi-VN')} ₫
+                        </span>
+                      ) : null}
+                    </li>
+                  ))}
+                </ul>
+              )}
+
               {/* Input controls positioned at bottom right */}
               <div className="absolute bottom-3 right-3 flex items-center space-x-2">
                 {/* Recording Help Button */}
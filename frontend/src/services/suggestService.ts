@@ -0,0 +1,52 @@
+import { SuggestResponse } from '@/types/suggest';
+
+class SuggestService {
+  private readonly API_BASE = this.getApiBase();
+  // Only the latest keystroke matters; older requests are aborted
+  private controller: AbortController | null = null;
+
+  private getApiBase(): string {
+    if ((import.meta as any).env?.VITE_API_BASE_URL) {
+      return (import.meta as any).env.VITE_API_BASE_URL;
+    }
+    if (typeof window !== "undefined" && (window.location.hostname === "localhost" || window.location.hostname === "127.0.0.1")) {
+      return "/api";
+    }
+    return "https://mm-agent-backend.onrender.com";
+  }
+
+  /**
+   * Typeahead suggestions for the end of the chat input; null if superseded or failed
+   */
+  async suggest(query: string, limit = 8): Promise<SuggestResponse | null> {
+    this.cancel();
+    if (!query.trim()) return null;
+
+    const controller = new AbortController();
+    this.controller = controller;
+    try {
+      const params = new URLSearchParams({ q: query, k: String(limit) });
+      const response = await fetch(`${this.API_BASE}/suggest?${params}`, { signal: controller.signal });
+      if (!response.ok) return null;
+      return await response.json();
+    } catch (error) {
+      if (!(error instanceof DOMException && error.name === 'AbortError')) {
+        console.warn('Suggest request failed:', error);
+      }
+      return null;
+    } finally {
+      if (this.controller === controller) {
+        this.controller = null;
+      }
+    }
+  }
+
+  cancel(): void {
+    this.controller?.abort();
+    this.controller = null;
+  }
+}
+
+// Export singleton instance
+export const suggestService = new SuggestService();
+export default suggestService;
@@ -0,0 +1,14 @@
+export interface Suggestion {
+  text: string;
+  kind: 'product' | 'brand';
+  id?: string; // products only
+  price?: number; // products only
+}
+
+export interface SuggestResponse {
+  query: string;
+  replace_words: number; // trailing words of the query that a picked suggestion replaces
+  suggestions: Suggestion[];
+  index_version: string | null;
+  ms: number;
+}
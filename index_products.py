@@ -3,26 +3,158 @@
 Script to index products from merged_products.json into Meilisearch
 """
 
+import asyncio
 import json
+import math
 import meilisearch
 import os
+import time
 from typing import List, Dict, Any
 
+from app.config_simple import (
+    STARTUP_CONFIG, SHARED_CATALOG_CONFIG, SEARCH_BACKEND_CONFIG, REVIEW_CONFIG, HEAD_QUERY_CONFIG, QUERY_LOG_CONFIG,
+    VALIDATION_CONFIG, CATALOG_BLOCKS_CONFIG
+)
+from app.tools.catalog_blocks import write_catalog_blocks
+from app.tools.catalog_index import CatalogIndex
+from app.tools.catalog_snapshot import save_snapshot, source_fingerprint
+from app.tools.catalog_validation import validate_catalog, write_quarantine
+from app.tools.head_queries import mine_query_log, read_query_list
+from app.tools.meilisearch_simple import SimpleMeilisearchEngine
+from app.tools.query_log import log_files
+from app.tools.search import materialize_head_queries
+from app.tools.shared_catalog import publish_catalog
+from app.tools.promotions import product_promotions
+from app.tools.regions import store_directory
+from app.tools.reviews import ReviewAggregator, read_reviews
+from app.tools.specs import NUMERIC_FIELDS, numeric_specs
+from app.tools.sqlite_search import build_search_tables
+
 # Meilisearch configuration
 MEILISEARCH_URL = "http://127.0.0.1:7700"
 INDEX_NAME = "products"
 
 def load_products(file_path: str) -> List[Dict[str, Any]]:
-    """Load products from JSON file"""
+    """Load products from JSON file, validated and normalized on every core"""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
-        print(f"✅ Loaded {len(products)} products from {file_path}")
-        return products
+            records = json.load(f)
+        report = validate_catalog(records)
+        print(f"✅ Loaded {len(report.products)} products from {file_path} ({report.summary()})")
+        if report.rejects:
+            write_quarantine(report.rejects, VALIDATION_CONFIG["quarantine_file"])
+            print(f"⚠️ Quarantined {len(report.rejects)} invalid products to {VALIDATION_CONFIG['quarantine_file']}")
+        return report.products
     except Exception as e:
         print(f"❌ Error loading products: {e}")
         return []
 
+def prepare_documents(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add flattened numeric specs (battery mAh, camera MP, promotions, ...), payment partners and
+    the regions with stock for filtering"""
+    directory = store_directory()
+    documents = []
+    for product in products:
+        numeric = {
+            field: value for field, value in numeric_specs(product).items()
+            if not math.isnan(value)
+        }
+        partners = list(product_promotions(product).partners)
+        documents.append({**product, "specs_numeric": numeric, "payment_partners": partners,
+                          "regions_in_stock": directory.regions_in_stock(product)})
+    return documents
+
+def apply_reviews(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Products with the running review aggregates applied, after taking in new reviews"""
+    if not REVIEW_CONFIG["enabled"]:
+        return products
+    try:
+        aggregator = ReviewAggregator.load(
+            REVIEW_CONFIG["state_file"], REVIEW_CONFIG["half_life_days"],
+            REVIEW_CONFIG["snippets"], REVIEW_CONFIG["snippet_chars"]
+        )
+        if aggregator.ingest(read_reviews(REVIEW_CONFIG["file"])):
+            aggregator.save(REVIEW_CONFIG["state_file"])
+        keys = {}
+        for product in products:
+            keys.setdefault(product.get("sku"), product.get("id"))
+            keys[product.get("id")] = product.get("id")
+        reviewed = {keys[product_id]: product_id for product_id in aggregator.aggregates if product_id in keys}
+        print(f"✅ Applied review aggregates to {len(reviewed)} products")
+        return [
+            aggregator.apply(product, reviewed[product.get("id")]) if product.get("id") in reviewed else product
+            for product in products
+        ]
+    except Exception as e:
+        print(f"❌ Error applying reviews: {e}")
+        return products
+
+def write_snapshot(products: List[Dict[str, Any]], products_file: str) -> bool:
+    """Build the local indexes once and save them for fast worker startup"""
+    try:
+        start = time.perf_counter()
+        catalog = CatalogIndex(products)
+        built = time.perf_counter()
+        snapshot_file = STARTUP_CONFIG["snapshot_file"]
+        save_snapshot(catalog, snapshot_file, source_fingerprint(products_file))
+        print(f"✅ Wrote catalog snapshot {snapshot_file} "
+              f"(build {built - start:.2f}s, save {time.perf_counter() - built:.2f}s)")
+        if SHARED_CATALOG_CONFIG["enabled"]:
+            generation = publish_catalog(
+                catalog, SHARED_CATALOG_CONFIG["directory"], source_fingerprint(products_file),
+                SHARED_CATALOG_CONFIG["keep_generations"]
+            )
+            print(f"✅ Published shared catalog generation {generation}")
+        return True
+    except Exception as e:
+        print(f"❌ Error writing catalog snapshot: {e}")
+        return False
+
+def write_blocks(products: List[Dict[str, Any]], products_file: str) -> bool:
+    """Write the validated products as compressed blocks, which load_catalog reads instead of the JSON"""
+    try:
+        start = time.perf_counter()
+        path = CATALOG_BLOCKS_CONFIG["file"]
+        header = write_catalog_blocks(products, path, source_fingerprint(products_file))
+        print(f"✅ Wrote block catalog {path} ({header['blocks']} {header['codec']} blocks, "
+              f"{path.stat().st_size / 1024:.0f} KB, {time.perf_counter() - start:.2f}s)")
+        return True
+    except Exception as e:
+        print(f"❌ Error writing block catalog: {e}")
+        return False
+
+def write_sqlite_index(products: List[Dict[str, Any]], products_file: str) -> bool:
+    """Rebuild the FTS5 search tables in ddv.sqlite3 for the embedded SQLite backend"""
+    try:
+        start = time.perf_counter()
+        path = SEARCH_BACKEND_CONFIG["sqlite_path"]
+        build_search_tables(products, path, source_fingerprint(products_file))
+        print(f"✅ Wrote SQLite search index {path} ({time.perf_counter() - start:.2f}s)")
+        return True
+    except Exception as e:
+        print(f"❌ Error writing SQLite search index: {e}")
+        return False
+
+def write_head_queries() -> bool:
+    """Materialize search_products payloads for the head queries against the freshly built indexes"""
+    if not HEAD_QUERY_CONFIG["enabled"]:
+        return True
+    try:
+        start = time.perf_counter()
+        queries = list(HEAD_QUERY_CONFIG["queries"]) + read_query_list(HEAD_QUERY_CONFIG["queries_file"])
+        logs = log_files(QUERY_LOG_CONFIG["file"])
+        mined = mine_query_log(logs, HEAD_QUERY_CONFIG["mine_top"]) if logs else []
+        
+        engine = SimpleMeilisearchEngine()
+        table = asyncio.run(materialize_head_queries(engine, queries + mined, HEAD_QUERY_CONFIG["limits"]))
+        table.save(HEAD_QUERY_CONFIG["file"])
+        print(f"✅ Materialized {len(table)} head query payloads ({len(mined)} queries mined from logs) "
+              f"for {table.index_version} in {time.perf_counter() - start:.2f}s")
+        return True
+    except Exception as e:
+        print(f"❌ Error materializing head queries: {e}")
+        return False
+
 def setup_meilisearch_client():
     """Setup Meilisearch client"""
     try:
@@ -63,18 +195,17 @@ def configure_index(index):
         
         # Set filterable attributes
         filterable_attributes = [
-            "brand", "category", "price.current", "price.original",
-            "specs.ram", "specs.storage", "specs.camera", "specs.battery",
-            "specs.screen_size", "reviews.average_rating", "promotions_count"
-        ]
+            "brand", "category", "availability", "price.current", "price.original",
+            "reviews.average_rating", "promotions_count", "payment_partners", "regions_in_stock"
+        ] + [f"specs_numeric.{field}" for field in NUMERIC_FIELDS]
         index.update_filterable_attributes(filterable_attributes)
         print(f"✅ Set filterable attributes: {filterable_attributes}")
         
         # Set sortable attributes
         sortable_attributes = [
-            "price.current", "price.original", "reviews.average_rating",
-            "specs.ram", "specs.storage", "specs.camera", "specs.battery"
-        ]
+            "name", "price.current", "price.original", "price.discount_percentage",
+            "reviews.average_rating"
+        ] + [f"specs_numeric.{field}" for field in NUMERIC_FIELDS]
         index.update_sortable_attributes(sortable_attributes)
         print(f"✅ Set sortable attributes: {sortable_attributes}")
         
@@ -142,6 +273,24 @@ def main():
     if not products:
         return
     
+    # Validated catalog in random-access blocks, so later loads skip the JSON
+    if CATALOG_BLOCKS_CONFIG["enabled"]:
+        write_blocks(products, products_file)
+    
+    # Local index snapshot, used by the agent even when Meilisearch is down
+    write_snapshot(products, products_file)
+    
+    # The snapshot keeps the scraped ratings (the agent applies reviews on load);
+    # search backends get the current ones
+    products = apply_reviews(products)
+    
+    # Embedded backend needs no server
+    if SEARCH_BACKEND_CONFIG["backend"] == "sqlite":
+        write_sqlite_index(products, products_file)
+        write_head_queries()
+        print("🎉 Product indexing completed successfully!")
+        return
+    
     # Setup Meilisearch
     client = setup_meilisearch_client()
     if not client:
@@ -157,12 +306,15 @@ def main():
         return
     
     # Index products
-    if not index_products(index, products):
+    if not index_products(index, prepare_documents(products)):
         return
     
     # Verify indexing
     verify_indexing(index)
     
+    # Head query payloads come from the live backend, so build them last
+    write_head_queries()
+    
     print("🎉 Product indexing completed successfully!")
     print(f"🌐 You can now test at: http://127.0.0.1:7700/")
 
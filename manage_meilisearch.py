@@ -8,7 +8,6 @@ import subprocess
 import sys
 import time
 import requests
-import json
 import os
 from pathlib import Path
 
@@ -139,8 +138,9 @@ class MeilisearchManager:
             # Load and add products data
             if Path(self.products_file).exists():
                 print(f"Loading data from {self.products_file}...")
-                with open(self.products_file, 'r', encoding='utf-8') as f:
-                    products = json.load(f)
+                # Same validated, normalized documents the agent's tools expect
+                from app.tools.catalog_validation import load_catalog
+                products = load_catalog(Path(self.products_file))
                 
                 print(f"Adding {len(products)} products to index...")
                 response = requests.post(f"{self.base_url}/indexes/products/documents", 
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Query replay for DDV Product Advisor
+Runs a query log written with DDV_QUERY_LOG=1 (see app/tools/query_log.py) against
+the engine as configured by the environment, and reports latency distributions
+and how the results differ from the logged ones
+
+Usage: python replay_queries.py [queries.ndjson] [concurrency] [save.ndjson]
+    DDV_SEARCH_BACKEND=sqlite python replay_queries.py logs/queries.ndjson 4
+
+A log is read with its rotated backups (queries.ndjson.N). To compare two
+configurations, replay once with save.ndjson, then replay save.ndjson under
+the other configuration.
+"""
+
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+# A replay must not log itself, and needs no watcher threads
+os.environ["DDV_QUERY_LOG"] = "0"
+os.environ.setdefault("DDV_HOT_RELOAD", "0")
+
+from app.tools.meilisearch_simple import SimpleMeilisearchEngine
+from app.tools.query_log import log_entry, log_files
+
+DEFAULT_QUERY_LOG = Path(__file__).parent / "logs" / "queries.ndjson"
+MOST_CHANGED = 10
+
+
+def load_records(path: Path) -> List[Dict[str, Any]]:
+    """Logged requests, oldest first; lines cut off by a crash are skipped"""
+    records = []
+    for file in log_files(path):
+        with open(file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and record.get("op"):
+                    records.append(record)
+    return records
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)] if ordered else 0.0
+
+
+def replay(engine: SimpleMeilisearchEngine, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one logged request again; returns it in log format"""
+    op, query, filters, sort = record["op"], record.get("q", ""), record.get("f") or None, record.get("s")
+    limit, offset, exclude_ids = record.get("l") or 10, record.get("o") or 0, record.get("x")
+    started = time.perf_counter()
+    # search_products tries the materialized head queries before searching
+    entry = None
+    if record.get("tool") == "search_products" and op in ("search_page", "materialized") and not filters \
+            and not sort and not offset:
+        entry = engine.materialized(query, limit)
+    if entry is not None:
+        op = "materialized"
+        products = entry["payload"]["products"]
+        page = {"hits": products, "total": len(products), "source": "materialized"}
+    elif op == "lookup":
+        products = engine.lookup_mentioned_products(query)
+        page = {"hits": products, "total": len(products), "source": "local"}
+    elif op == "faceted_search":
+        page = engine.faceted_search(query, limit, filters, sort, offset, exclude_ids)
+    else:
+        page = engine.search_page(query, limit, filters, sort, offset, exclude_ids)
+    ms = (time.perf_counter() - started) * 1000
+    return log_entry(op, record.get("tool"), query, filters, sort, limit, offset, exclude_ids,
+                     engine.index_version, page, ms)
+
+
+def overlap(logged: List[str], replayed: List[str]) -> float:
+    """Shared ids over the larger page; 1.0 when both are empty"""
+    if not logged and not replayed:
+        return 1.0
+    return len(set(logged) & set(replayed)) / max(len(logged), len(replayed))
+
+
+def latency_row(label: str, values: List[float]) -> str:
+    return (f"  {label:<22} {len(values):>6} {percentile(values, 0.5):>9.2f} {percentile(values, 0.95):>9.2f} "
+            f"{percentile(values, 0.99):>9.2f} {max(values, default=0.0):>9.2f}")
+
+
+def describe(record: Dict[str, Any]) -> str:
+    parts = [f'"{record.get("q", "")}"']
+    if record.get("f"):
+        parts.append(json.dumps(record["f"], ensure_ascii=False))
+    if record.get("s"):
+        parts.append(record["s"])
+    if record.get("o"):
+        parts.append(f"offset {record['o']}")
+    return " ".join(parts)
+
+
+def report(records: List[Dict[str, Any]], replayed: List[Dict[str, Any]], elapsed: float, concurrency: int):
+    engine = SimpleMeilisearchEngine()
+    backend = engine.backend.name if engine.backend else "local"
+    print(f"📼 Replayed {len(records)} requests in {elapsed:.2f}s "
+          f"(backend {backend}, concurrency {concurrency}, {len(engine.products)} products)")
+
+    print(f"\n⏱️ Latency (ms)              count       p50       p95       p99       max")
+    print(latency_row("logged", [r.get("ms") or 0.0 for r in records]))
+    print(latency_row("replayed", [r["ms"] for r in replayed]))
+    by_op: Dict[str, List[float]] = defaultdict(list)
+    for result in replayed:
+        by_op[f"{result['op']}[{result['backend']}]"].append(result["ms"])
+    for label, values in sorted(by_op.items()):
+        print(latency_row(label, values))
+
+    print(f"\n🔀 Backends: logged {dict(Counter(r.get('backend') for r in records))}, "
+          f"replayed {dict(Counter(r['backend'] for r in replayed))}")
+
+    scored: List[Tuple[float, Dict[str, Any], Dict[str, Any]]] = []
+    identical = same_set = 0
+    for record, result in zip(records, replayed):
+        logged_ids, replayed_ids = record.get("ids") or [], result["ids"]
+        identical += logged_ids == replayed_ids
+        same_set += set(logged_ids) == set(replayed_ids)
+        scored.append((overlap(logged_ids, replayed_ids), record, result))
+    total = max(len(scored), 1)
+    versions = sum(1 for record in records if record.get("v") and record.get("v") != engine.index_version)
+    print(f"\n🎯 Results vs log: {identical / total:.1%} identical, {same_set / total:.1%} same ids in any order, "
+          f"mean overlap {sum(score for score, _, _ in scored) / total:.2f}")
+    if versions:
+        print(f"   {versions} requests were logged against another catalog version")
+
+    changed = sorted((item for item in scored if item[1].get("ids") != item[2]["ids"]), key=lambda item: item[0])
+    if changed:
+        print(f"\n🔍 Most changed ({min(MOST_CHANGED, len(changed))} of {len(changed)}):")
+    for score, record, result in changed[:MOST_CHANGED]:
+        logged_ids, replayed_ids = record.get("ids") or [], result["ids"]
+        gone = [i for i in logged_ids if i not in replayed_ids]
+        new = [i for i in replayed_ids if i not in logged_ids]
+        print(f"  {score:.2f}  {record['op']:<15} {describe(record)}")
+        if gone or new:
+            print(f"        - {', '.join(gone) or '∅'}\n        + {', '.join(new) or '∅'}")
+        else:
+            print("        (reordered)")
+
+
+def main():
+    """Replay the log and print the report"""
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_QUERY_LOG
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    save_path = Path(sys.argv[3]) if len(sys.argv) > 3 else None
+    if not path.exists():
+        print(f"❌ Query log not found: {path} (run the agent with DDV_QUERY_LOG=1)")
+        return
+
+    records = load_records(path)
+    if not records:
+        print(f"❌ No requests in {path}")
+        return
+
+    engine = SimpleMeilisearchEngine()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        replayed = list(pool.map(lambda record: replay(engine, record), records))
+    elapsed = time.perf_counter() - start
+
+    report(records, replayed, elapsed, concurrency)
+
+    if save_path:
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(save_path, 'w', encoding='utf-8') as f:
+            for result in replayed:
+                f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        print(f"\n💾 Saved replayed results to {save_path}")
+
+
+if __name__ == "__main__":
+    main()
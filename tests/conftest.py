@@ -0,0 +1,32 @@
+"""
+Test fixtures for DDV Product Advisor
+The bundled catalog, validated as at load time, and the indexes built over it
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.config_simple import MERGED_PRODUCTS_FILE  # noqa: E402
+from app.tools.catalog_validation import validate_records  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def products():
+    """Validated products of profiles/merged_products.json (18 Apple and Samsung phones)"""
+    with open(MERGED_PRODUCTS_FILE, "r", encoding="utf-8") as f:
+        valid, rejects, _ = validate_records(json.load(f))
+    assert not rejects
+    return valid
+
+
+@pytest.fixture(scope="session")
+def catalog(products):
+    from app.tools.catalog_index import CatalogIndex
+    return CatalogIndex(products)
@@ -0,0 +1,94 @@
+"""Admission control: bounded concurrency, shedding, and tool lookups off the event loop"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.tools.admission import AdmissionController
+
+
+def test_admits_up_to_the_limit_and_releases_on_exit():
+    admission = AdmissionController(max_concurrent=2, max_queue=0, queue_timeout=0.01)
+    with admission.admit() as first, admission.admit() as second:
+        assert first is None and second is None
+        assert admission.stats()["in_flight"] == 2
+    stats = admission.stats()
+    assert (stats["in_flight"], stats["admitted"]) == (0, 2)
+
+
+def test_sheds_when_the_queue_is_full():
+    admission = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1.0)
+    with admission.admit() as held:
+        assert held is None
+        with admission.admit() as shed:
+            assert shed == "queue_full"
+    assert admission.stats()["shed_queue_full"] == 1
+    with admission.admit() as again:
+        assert again is None
+
+
+def test_sheds_after_the_queue_timeout():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.02)
+    with admission.admit():
+        with admission.admit() as shed:
+            assert shed == "timeout"
+    stats = admission.stats()
+    assert (stats["queued"], stats["shed_timeout"], stats["waiting"]) == (1, 1, 0)
+
+
+def test_queued_request_is_admitted_when_a_slot_frees():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=2.0)
+    entered, results = threading.Event(), []
+
+    def holder():
+        with admission.admit():
+            entered.set()
+            while admission.stats()["waiting"] == 0:
+                pass
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    entered.wait()
+    with admission.admit() as shed:
+        results.append(shed)
+    thread.join()
+    assert results == [None]
+    assert admission.stats()["queue_ms"]["max"] >= 0.0
+
+
+class _BlockingEngine:
+    """Engine double whose lookups record the thread they ran on"""
+    index_version = "test"
+    threads = []
+
+    def get_product(self, product_id):
+        return None
+
+    def find_product(self, identifier, tool=None):
+        self.threads.append(threading.get_ident())
+        return None
+
+    def search(self, query, limit=20, tool=None, **kwargs):
+        self.threads.append(threading.get_ident())
+        return [{"id": "p1", "name": "Máy thử"}]
+
+
+@pytest.mark.parametrize("module, call", [
+    ("app.tools.explore", lambda tool, ctx: tool.explore_product("máy thử", ctx)),
+    ("app.tools.similar", lambda tool, ctx: tool.find_similar_products("máy thử", ctx)),
+    ("app.tools.compare", lambda tool, ctx: tool.compare_products(["máy một", "máy hai"], ctx)),
+])
+def test_tool_lookups_run_off_the_event_loop(monkeypatch, module, call):
+    tool = pytest.importorskip(module)
+    _BlockingEngine.threads = []
+    monkeypatch.setattr(tool, "SimpleMeilisearchEngine", _BlockingEngine)
+    context = SimpleNamespace(state={}, invocation_id=None, function_call_id=None)
+
+    async def run():
+        return threading.get_ident(), await call(tool, context)
+
+    loop_thread, _ = asyncio.run(run())
+    assert _BlockingEngine.threads
+    assert loop_thread not in _BlockingEngine.threads
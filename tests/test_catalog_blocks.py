@@ -0,0 +1,127 @@
+"""Block catalog: round trips, random access by row and key, and when load_catalog trusts it"""
+
+import copy
+import gzip
+import json
+import os
+
+import pytest
+
+from app.config_simple import CATALOG_BLOCKS_CONFIG, VALIDATION_CONFIG
+from app.tools import catalog_blocks
+from app.tools.catalog_blocks import BlockCatalog, index_path, open_blocks, write_catalog_blocks
+from app.tools.catalog_snapshot import source_fingerprint
+from app.tools.catalog_validation import load_catalog
+
+
+@pytest.fixture
+def written(products, tmp_path):
+    """The bundled catalog in gzip blocks of about two products each"""
+    path = tmp_path / "products.blocks"
+    header = write_catalog_blocks(products, path, "fp-1", codec="gzip", block_bytes=4096)
+    blocks = BlockCatalog(path)
+    yield path, header, blocks
+    blocks.close()
+
+
+def test_round_trip_and_random_access(products, written):
+    path, header, blocks = written
+    assert header["codec"] == "gzip" and header["products"] == len(blocks) == len(products)
+    assert 1 < header["blocks"] < len(products)
+    assert list(blocks) == products
+    for row in reversed(range(len(products))):
+        assert blocks[row] == products[row]
+    assert blocks[-1] == products[-1]
+    with pytest.raises(IndexError):
+        blocks[len(products)]
+    # The blocks are concatenated gzip members, so the file still streams as one
+    assert [json.loads(line) for line in gzip.decompress(path.read_bytes()).splitlines()] == products
+
+
+def test_lookup_by_id_and_sku(products, written):
+    _, _, blocks = written
+    for product in products:
+        assert blocks.get(product["id"]) == product
+        if product.get("sku"):
+            assert blocks.get(product["sku"])["id"] == product["id"]
+    assert blocks.get("khong-co") is None and blocks.get("") is None and blocks.get(None) is None
+
+
+def test_hash_collisions_are_resolved_by_the_decoded_id(products, tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_blocks, "key_hash", lambda key: 7)
+    path = tmp_path / "products.blocks"
+    write_catalog_blocks(products, path, None, codec="gzip", block_bytes=4096)
+    blocks = BlockCatalog(path)
+    assert set(blocks.key_hashes.tolist()) == {7}
+    assert [blocks.get(product["id"])["id"] for product in products] == [product["id"] for product in products]
+    assert blocks.get("khong-co") is None
+    blocks.close()
+
+
+def test_empty_catalog(tmp_path):
+    path = tmp_path / "empty.blocks"
+    assert write_catalog_blocks([], path, "fp")["blocks"] == 0
+    blocks = BlockCatalog(path)
+    assert len(blocks) == 0 and list(blocks) == [] and blocks.get("x") is None
+    blocks.close()
+
+
+def test_unavailable_codec_falls_back_to_gzip(products, tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_blocks, "ZSTD_AVAILABLE", False)
+    path = tmp_path / "products.blocks"
+    assert write_catalog_blocks(products[:3], path, None, codec="zstd")["codec"] == "gzip"
+    blocks = BlockCatalog(path)
+    assert list(blocks) == products[:3]
+    blocks.close()
+
+
+@pytest.mark.skipif(not catalog_blocks.ZSTD_AVAILABLE, reason="zstandard is not installed")
+def test_zstd_round_trip(products, tmp_path):
+    path = tmp_path / "products.blocks"
+    assert write_catalog_blocks(products, path, None, codec="zstd", block_bytes=4096)["codec"] == "zstd"
+    blocks = BlockCatalog(path)
+    assert list(blocks) == products and blocks.get(products[5]["id"]) == products[5]
+    blocks.close()
+
+
+def test_open_blocks_rejects_stale_or_broken_files(products, written, tmp_path):
+    path, _, blocks = written
+    assert open_blocks(tmp_path / "missing.blocks") is None
+    assert open_blocks(path, "fp-2") is None
+    opened = open_blocks(path, "fp-1")
+    assert opened is not None and opened.fingerprint == "fp-1"
+    opened.close()
+
+    # New data written under the old index no longer matches its size
+    index = index_path(path).read_bytes()
+    write_catalog_blocks(products[:2], path, "fp-1", codec="gzip")
+    index_path(path).write_bytes(index)
+    assert open_blocks(path, "fp-1") is None
+
+    header, _, arrays = index.partition(b"\n")
+    bumped = json.dumps(dict(json.loads(header), format=catalog_blocks.BLOCKS_FORMAT + 1)).encode()
+    index_path(path).write_bytes(bumped + b"\n" + arrays)
+    assert open_blocks(path) is None
+
+
+def test_load_catalog_reads_blocks_built_from_the_same_source(products, tmp_path, monkeypatch):
+    source = tmp_path / "merged_products.json"
+    source.write_text(json.dumps(products, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setitem(CATALOG_BLOCKS_CONFIG, "enabled", True)
+    monkeypatch.setitem(CATALOG_BLOCKS_CONFIG, "file", tmp_path / "merged_products.blocks")
+    monkeypatch.setitem(VALIDATION_CONFIG, "quarantine_file", tmp_path / "quarantine.ndjson")
+
+    assert load_catalog(source, workers=1) == products
+    marked = copy.deepcopy(products)
+    marked[0]["name"] = "Từ khối"
+    write_catalog_blocks(marked, CATALOG_BLOCKS_CONFIG["file"], source_fingerprint(source), codec="gzip")
+    assert load_catalog(source, workers=1) == marked
+
+    # Touching the source makes the blocks stale
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_catalog(source, workers=1) == products
+    monkeypatch.setitem(CATALOG_BLOCKS_CONFIG, "enabled", False)
+    write_catalog_blocks(marked, CATALOG_BLOCKS_CONFIG["file"], source_fingerprint(source), codec="gzip")
+    assert load_catalog(source, workers=1) == products
+    assert not (tmp_path / "quarantine.ndjson").exists()
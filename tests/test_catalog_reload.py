@@ -0,0 +1,57 @@
+"""Catalog generations and the watcher that confirms a change before reloading"""
+
+from app.tools.catalog_reload import CatalogGeneration, CatalogWatcher
+
+
+def run_watcher(markers, reload, marker="m0"):
+    """Drive the watcher loop over a fixed sequence of probe results"""
+    markers = list(markers)
+    reloads = []
+
+    def probe():
+        if not markers:
+            watcher.stop()
+            return None
+        value = markers.pop(0)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def on_reload():
+        reloads.append(watcher.marker)
+        return reload()
+
+    watcher = CatalogWatcher(probe, on_reload, marker, interval=0.0)
+    watcher._run()
+    return reloads, watcher
+
+
+def test_change_is_confirmed_on_the_next_poll():
+    reloads, watcher = run_watcher(["m0", "m1", "m1", "m1", "m2", "m2"], lambda: True)
+    assert reloads == ["m1", "m2"] and watcher.marker == "m2"
+
+
+def test_a_file_still_being_written_is_not_reloaded():
+    reloads, _ = run_watcher(["m1", "m2", "m3", "m3"], lambda: True)
+    assert reloads == ["m3"]
+
+
+def test_missing_source_and_probe_errors_are_skipped():
+    reloads, _ = run_watcher(["m1", None, "m1", OSError("gone"), "m1"], lambda: True)
+    assert reloads == ["m1"]
+
+
+def test_failed_reload_waits_for_the_next_change():
+    def fail():
+        raise RuntimeError("bad catalog")
+
+    reloads, watcher = run_watcher(["m1", "m1", "m1", "m1"], fail)
+    assert reloads == ["m1"] and watcher.marker == "m1"
+
+
+def test_generation_status(catalog, products):
+    current = CatalogGeneration(catalog, "v1", 3, "json", marker="m", load_ms=12.34)
+    status = current.status()
+    assert (status["generation"], status["index_version"], status["source"]) == (3, "v1", "json")
+    assert status["products"] == len(products) and status["load_ms"] == 12.3
+    assert CatalogGeneration(None, None, 0, "empty").status()["products"] == 0
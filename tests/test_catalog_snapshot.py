@@ -0,0 +1,52 @@
+"""Catalog snapshot: memory-mapped round trip and staleness checks"""
+
+import numpy as np
+import pytest
+
+from app.tools.catalog_snapshot import SNAPSHOT_FORMAT, load_snapshot, save_snapshot
+from app.tools.columnar import ProductStore
+
+
+@pytest.fixture
+def snapshot(catalog, tmp_path):
+    path = tmp_path / "catalog_snapshot.pkl"
+    save_snapshot(catalog, path, "fingerprint-1")
+    return path
+
+
+def test_round_trip_answers_like_the_built_catalog(catalog, snapshot):
+    loaded = load_snapshot(snapshot, "fingerprint-1")
+    assert isinstance(loaded.products, ProductStore)
+    assert list(loaded.products) == list(catalog.products)
+    mask = catalog.filter_mask({"brand": "Apple"})
+    for query in ("iphone 16 pro max", "samsung galaxy", "ip16 pm"):
+        assert list(loaded.lexical_rows(query, mask)) == list(catalog.lexical_rows(query, mask))
+        assert loaded.vector_rows(query, mask=mask) == catalog.vector_rows(query, mask=mask)
+    assert loaded.get(catalog.products[3]["id"]) == catalog.products[3]
+    np.testing.assert_array_equal(loaded.spec_matrix.scores, catalog.spec_matrix.scores)
+
+
+def test_arrays_are_read_only_views_of_the_file(snapshot):
+    loaded = load_snapshot(snapshot, "fingerprint-1")
+    assert not loaded.spec_matrix.scores.flags.writeable
+    assert not loaded.spec_matrix.scores.flags.owndata
+
+
+def test_other_fingerprint_is_stale(snapshot):
+    assert load_snapshot(snapshot, "fingerprint-2") is None
+    assert load_snapshot(snapshot, None) is None
+
+
+def test_missing_or_foreign_files_are_ignored(tmp_path):
+    assert load_snapshot(tmp_path / "missing.pkl", "fingerprint-1") is None
+    path = tmp_path / "old.pkl"
+    path.write_bytes(b"\x80\x05not a snapshot")
+    assert load_snapshot(path, "fingerprint-1") is None
+    path.write_bytes(b"")
+    assert load_snapshot(path, "fingerprint-1") is None
+
+
+def test_format_is_checked_before_unpickling(catalog, snapshot, monkeypatch):
+    monkeypatch.setattr("app.tools.catalog_snapshot.SNAPSHOT_FORMAT", SNAPSHOT_FORMAT + 1)
+    monkeypatch.setattr("app.tools.catalog_snapshot.pickle.loads", pytest.fail)
+    assert load_snapshot(snapshot, "fingerprint-1") is None
@@ -0,0 +1,87 @@
+"""Catalog validation: coercion of crawler output, rejects and the parallel path"""
+
+import copy
+import json
+
+import pytest
+
+from app.tools.catalog_validation import validate_catalog, validate_records, write_quarantine
+
+
+def raw(product_id="p1", **fields):
+    return dict({"id": product_id, "name": "Máy thử", "price": {"current": 10_000_000}}, **fields)
+
+
+def one(record):
+    products, rejects, stats = validate_records([record])
+    assert not rejects, rejects
+    return products[0], stats
+
+
+def test_crawler_formats_are_coerced():
+    product, stats = one(raw(
+        price={"current": "29.690.000đ", "original": 34_990_000.0, "discount_percentage": "abc"},
+        specs={"battery": "5000 mAh", "display": None, "ram": 8},
+        reviews={"average_rating": "4,5", "rating_count": "12 đánh giá"},
+        colors="Đen", promotions=None, store_info={"branches": []},
+    ))
+    assert product["price"]["current"] == 29_690_000 and product["price"]["original"] == 34_990_000
+    assert product["price"]["discount_percentage"] == round((1 - 29_690_000 / 34_990_000) * 100, 2)
+    assert product["price"]["currency"] == "VND"
+    assert product["specs"]["battery"]["capacity"] == "5000 mAh"
+    assert product["specs"]["display"]["size"] == "" and product["specs"]["ram"] == "8"
+    assert (product["reviews"]["average_rating"], product["reviews"]["rating_count"]) == (4.5, 12)
+    assert product["colors"] == ["Đen"] and product["promotions"]["free_gifts"] == []
+    assert product["store_info"] == {"branches": []}
+    assert stats[("price.current", "coerced")] == 1 and stats[("specs.display.size", "missing")] == 1
+
+
+def test_bare_price_and_out_of_range_rating():
+    product, _ = one(raw(price="7.790.000", reviews={"average_rating": 9, "rating_count": 3}))
+    assert product["price"]["current"] == 7_790_000
+    assert (product["reviews"]["average_rating"], product["reviews"]["rating_count"]) == (0.0, 0)
+
+
+@pytest.mark.parametrize("record, field", [
+    (raw(price=None), "price.current"),
+    (raw(price={"current": 0}), "price.current"),
+    (raw(price={"current": "liên hệ"}), "price.current"),
+    (raw(product_id=""), "id"),
+    (raw(name=None), "name"),
+])
+def test_unrepairable_records_are_rejected(record, field):
+    products, rejects, stats = validate_records([raw("ok"), record], start=10)
+    assert [p["id"] for p in products] == ["ok"]
+    reject, = rejects
+    assert reject["index"] == 11 and field in [error["field"] for error in reject["errors"]]
+    assert stats[(field, "rejected")] == 1
+
+
+def test_bundled_catalog_is_already_clean(products):
+    assert len(products) == 18
+    assert all(isinstance(p["price"]["current"], int) and p["price"]["current"] > 0 for p in products)
+
+
+def test_parallel_validation_matches_serial(products):
+    records = [copy.deepcopy(p) for _ in range(3) for p in products]
+    for i, record in enumerate(records):
+        record["id"] = f"{record['id']}-{i}"
+    records[5]["price"] = None
+    records.append(copy.deepcopy(records[0]))
+
+    serial = validate_catalog(records, workers=1, chunk_size=7)
+    parallel = validate_catalog(records, workers=3, chunk_size=7)
+    assert parallel.workers == 3 and serial.workers == 1
+    assert parallel.products == serial.products and len(parallel.products) == len(records) - 2
+    assert [(r["index"], r["id"]) for r in parallel.rejects] == [(r["index"], r["id"]) for r in serial.rejects] == [
+        (5, records[5]["id"]), (None, records[0]["id"])]
+    assert parallel.stats == serial.stats and parallel.stats[("id", "rejected")] == 1
+    assert parallel.summary().startswith(f"{len(records) - 2}/{len(records)} products valid, 2 quarantined")
+
+
+def test_quarantine_file(tmp_path):
+    _, rejects, _ = validate_records([raw(price=None)])
+    path = tmp_path / "quarantine" / "quarantine.ndjson"
+    write_quarantine(rejects, path)
+    line, = path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(line)["record"]["name"] == "Máy thử"
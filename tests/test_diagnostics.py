@@ -0,0 +1,71 @@
+"""Step timing of instrumented tools and the slow-step watchdog"""
+
+import asyncio
+import logging
+import time
+
+import pytest
+
+from app.config_simple import DIAGNOSTICS_CONFIG
+from app.tools import diagnostics
+from app.tools.diagnostics import Diagnostics, instrument_tool
+
+
+@pytest.fixture
+def collector(monkeypatch):
+    monkeypatch.setitem(DIAGNOSTICS_CONFIG, "enabled", True)
+    collector = Diagnostics(slow_step_ms=20, lag_interval=0.01, watchdog_interval=0.005, report_interval=3600)
+    monkeypatch.setattr(diagnostics, "_diagnostics", collector)
+    return collector
+
+
+def blocking_lookup(seconds):
+    time.sleep(seconds)
+
+
+async def search_tool(seconds):
+    """Blocks the loop, yields, then blocks briefly again"""
+    blocking_lookup(seconds)
+    await asyncio.sleep(0)
+    return "xong"
+
+
+def test_disabled_tools_are_returned_unwrapped(monkeypatch):
+    monkeypatch.setitem(DIAGNOSTICS_CONFIG, "enabled", False)
+    assert instrument_tool(search_tool) is search_tool
+
+
+def test_steps_between_awaits_are_timed(collector):
+    tool = instrument_tool(search_tool)
+    assert tool.__name__ == "search_tool" and tool.__doc__ == search_tool.__doc__
+    assert asyncio.run(tool(0.04)) == "xong"
+
+    stats = collector.tools["search_tool"]
+    assert (stats.calls, stats.errors, stats.slow_steps) == (1, 0, 1)
+    assert 40 <= stats.max_step_ms <= stats.blocking_ms <= stats.total_ms
+    assert collector.report()["tools"]["search_tool"]["calls"] == 1
+
+
+def test_failures_and_cancellation_are_counted(collector):
+    async def failing_tool():
+        await asyncio.sleep(0)
+        raise ValueError("không tìm thấy")
+
+    async def waiting_tool():
+        await asyncio.sleep(1)
+
+    with pytest.raises(ValueError):
+        asyncio.run(instrument_tool(failing_tool)())
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(instrument_tool(waiting_tool)(), 0.01))
+    assert collector.tools["failing_tool"].errors == 1
+    assert collector.tools["waiting_tool"].errors == 1
+    assert not collector._active
+
+
+def test_watchdog_logs_the_blocking_stack(collector, caplog):
+    with caplog.at_level(logging.WARNING, logger=diagnostics.__name__):
+        asyncio.run(instrument_tool(search_tool)(0.1))
+    warnings = [record.getMessage() for record in caplog.records if "held the event loop" in record.getMessage()]
+    assert len(warnings) == 1
+    assert "search_tool" in warnings[0] and "blocking_lookup" in warnings[0]
@@ -0,0 +1,69 @@
+"""Product mention extraction with the token automaton"""
+
+import pytest
+
+from app.tools.entity_matcher import (
+    CompiledAutomaton, ProductEntityMatcher, TokenAutomaton, expand_abbreviations, split_product_name,
+)
+from app.tools.text_utils import tokenize
+
+
+@pytest.fixture(scope="module")
+def matcher(products):
+    return ProductEntityMatcher(products)
+
+
+def test_compiled_automaton_matches_the_dict_automaton():
+    automaton = TokenAutomaton()
+    for pattern in (["a", "b"], ["b", "c"], ["a", "b", "c", "d"], ["c"], ["b"]):
+        automaton.add(pattern, tuple(pattern))
+    automaton.build()
+    payloads = {}
+    compiled = CompiledAutomaton(automaton, lambda payload: payloads.setdefault(payload, len(payloads)))
+    names = {i: payload for payload, i in payloads.items()}
+
+    tokens = "x a b c d a b x b c".split()
+    expected = sorted(automaton.find(tokens))
+    assert sorted((start, end, names[i]) for start, end, i in compiled.find(tokens)) == expected
+    assert (1, 5, ("a", "b", "c", "d")) in expected and (8, 10, ("b", "c")) in expected
+
+
+def test_product_names_split_into_model_and_storage():
+    assert split_product_name("Samsung Galaxy Z Flip7 5G 512GB Chính Hãng") == (
+        ["samsung", "galaxy", "z", "flip", "7", "5", "g"], 512)
+    assert split_product_name("iPhone 16 Pro Max 1TB") == (["iphone", "16", "pro", "max"], 1024)
+    assert expand_abbreviations(tokenize("ip 16 pm")) == ["iphone", "16", "pro", "max"]
+
+
+def test_abbreviated_model_and_storage_resolve_to_one_product(matcher):
+    extraction = matcher.extract("ip16 pm 256")
+    assert extraction.unambiguous
+    assert extraction.brands == {"Apple"}
+    mention = extraction.mentions[0]
+    assert (mention.model, mention.storage_gb, mention.product_ids) == (
+        "iphone 16 pro max", 256, ["iphone-16-pro-max-256gb"])
+
+
+def test_longest_model_wins(matcher):
+    mention, = matcher.extract("iphone 16 pro").mentions
+    assert mention.model == "iphone 16 pro"
+    assert mention.product_ids == ["iphone-16-pro-128gb", "iphone-16-pro-256gb"]
+
+
+def test_storage_goes_to_the_preceding_mention(matcher):
+    extraction = matcher.extract("so sánh iphone 16 pro max 512gb với s25 ultra")
+    assert not extraction.unambiguous
+    first, second = extraction.mentions
+    assert (first.storage_gb, first.product_ids) == (512, ["iphone-16-pro-max-512gb"])
+    assert (second.storage_gb, second.product_ids) == (None, ["samsung-galaxy-s25-ultra-5g-256gb"])
+
+
+def test_brand_alone_is_not_a_mention(matcher):
+    extraction = matcher.extract("điện thoại samsung")
+    assert extraction.mentions == [] and extraction.brands == {"Samsung"}
+
+
+def test_catalog_routes_single_mentions_to_the_id_index(catalog):
+    assert [product["id"] for product in catalog.mentioned_products("ip16 pm 256")] == ["iphone-16-pro-max-256gb"]
+    assert catalog.mentioned_products("iphone 16 pro max với s25 ultra") == []
+    assert catalog.mentioned_products("điện thoại chụp ảnh đẹp") == []
@@ -0,0 +1,64 @@
+"""Bitmap filter evaluation and facet counts against a row-by-row scan"""
+
+import numpy as np
+import pytest
+
+from app.tools.filter_index import BitmapFilterIndex
+from app.tools.specs import numeric_specs
+
+
+def scan(products, predicate):
+    return np.array([bool(predicate(product)) for product in products])
+
+
+@pytest.mark.parametrize("filters, predicate", [
+    (None, lambda p: True),
+    ({}, lambda p: True),
+    ({"brand": "apple"}, lambda p: p["brand"] == "Apple"),
+    ({"brand": ["Apple", "samsung"]}, lambda p: True),
+    ({"brand": "Xiaomi"}, lambda p: False),
+    ({"in_stock": True}, lambda p: p["availability"] == "in_stock"),
+    ({"in_stock": False}, lambda p: True),
+    ({"availability": "preorder"}, lambda p: p["availability"] == "preorder"),
+    ({"price_max": "20000000"}, lambda p: p["price"]["current"] <= 20_000_000),
+    ({"price_min": 20_000_000, "price_max": 30_000_000, "brand": "Samsung"},
+     lambda p: 20_000_000 <= p["price"]["current"] <= 30_000_000 and p["brand"] == "Samsung"),
+    ({"storage_min": "512GB"}, lambda p: numeric_specs(p)["storage_gb"] >= 512),
+    ({"price_max": "", "brand": []}, lambda p: True),
+])
+def test_evaluate_matches_a_scan(catalog, products, filters, predicate):
+    assert np.array_equal(catalog.filter_index.evaluate(filters), scan(products, predicate))
+
+
+def test_missing_values_never_match_a_range(products):
+    index = BitmapFilterIndex(products)
+    column = index.columns["rating"]
+    missing = np.isnan(column.values)
+    assert not (column.range_bitmap(index.size, low=0.0) & missing).any()
+    assert np.array_equal(column.range_bitmap(index.size), ~missing)
+
+
+def test_facets_count_the_masked_rows(catalog, products):
+    mask = catalog.filter_index.evaluate({"in_stock": True})
+    facets = catalog.filter_index.facets(mask)
+    in_stock = [p for p, keep in zip(products, mask) if keep]
+    assert facets["brand"] == {
+        brand: sum(p["brand"] == brand for p in in_stock) for brand in ("Apple", "Samsung")
+        if any(p["brand"] == brand for p in in_stock)
+    }
+    assert facets["availability"] == {"in_stock": len(in_stock)}
+    assert sum(facets["price_buckets"].values()) == len(in_stock)
+    prices = [p["price"]["current"] for p in in_stock]
+    assert facets["price_range"] == {"min": min(prices), "max": max(prices)}
+    assert list(facets["brand"].values()) == sorted(facets["brand"].values(), reverse=True)
+
+
+def test_with_numeric_rows_copies_only_changed_columns(catalog, products):
+    index = catalog.filter_index
+    specs = numeric_specs(products[0])
+    updated = index.with_numeric_rows({0: dict(specs, rating=1.0)})
+    assert updated.columns["rating"] is not index.columns["rating"]
+    assert updated.columns["price"] is index.columns["price"]
+    assert updated.bitmaps is index.bitmaps
+    assert updated.evaluate({"rating_min": 1})[0] and not updated.evaluate({"rating_min": 2})[0]
+    assert np.array_equal(updated.columns["rating"].values[1:], index.columns["rating"].values[1:], equal_nan=True)
@@ -0,0 +1,90 @@
+"""Product cards and model-facing summaries"""
+
+import json
+from types import SimpleNamespace
+
+from app.config_simple import OUTPUT_CONFIG
+from app.tools.formatting import compact_payload, estimate_tokens, product_card, product_summary, render_tool_output
+from app.tools.promotions import product_promotions
+
+
+def test_card_of_a_validated_row(products):
+    product = products[0]
+    card = product_card(product)
+    assert card["id"] == product["id"]
+    assert card["price"]["current"] == product["price"]["current"]
+    assert card["specs"]["display"]["size"] == product["specs"]["display"]["size"]
+    assert card["specs"]["battery"]["charging"] == product["specs"]["battery"]["wired_charging"]
+    assert card["promotions"]["effective_price"] <= product["price"]["current"]
+    assert len(card["promotions"]["free_gifts"]) <= 3
+
+
+def test_card_of_a_raw_backend_document():
+    raw = {
+        "id": "new-1",
+        "name": "Máy mới",
+        "price": {"current": 10_000_000},
+        "specs": {"ram": "8GB", "battery": {"capacity": "5000 mAh"}},
+        "promotions": {"special_discounts": ["Giảm 500.000đ khi thanh toán qua VNPAY"]},
+    }
+    card = product_card(raw)
+    assert card["specs"]["display"] == {"size": "", "technology": "", "resolution": ""}
+    assert card["specs"]["battery"] == {"capacity": "5000 mAh", "charging": ""}
+    assert card["price"] == {"current": 10_000_000, "original": None, "currency": "VND", "discount": None}
+    assert card["rating"] == {"average": 0, "count": 0}
+    assert card["availability"] == "unknown"
+    assert card["promotions"]["free_gifts"] == []
+    assert card["promotions"]["special_discounts"] == raw["promotions"]["special_discounts"]
+
+
+def test_card_of_a_bare_document():
+    card = product_card({"id": "bare"})
+    assert card["id"] == "bare" and card["image"]["url"] == ""
+    assert card["promotions"]["best_discount"] == 0.0
+
+
+def test_promotions_without_price_or_sections():
+    deals = product_promotions({"promotions": {"free_gifts": ["Ốp lưng"]}})
+    assert deals.effective_price == 0.0 and deals.promo_discount == 0.0
+    assert [offer.kind for offer in deals.offers] == ["gift"]
+
+
+def payload(products, count=None):
+    cards = [product_card(product) for product in products[:count]]
+    return {"type": "product-display", "message": "Kết quả tìm kiếm", "products": cards}
+
+
+def test_summary_keeps_what_the_model_needs(products):
+    card = product_card(products[0])
+    summary = product_summary(card)
+    assert summary["id"] == card["id"] and summary["price"] == card["price"]["current"]
+    assert card["specs"]["chipset"] in summary["specs"]
+    assert "availability" not in summary
+    assert len(summary["name"]) <= OUTPUT_CONFIG["max_field_chars"]
+
+
+def test_compact_payload_fits_the_budget_in_result_order(products):
+    full = payload(products)
+    summary = compact_payload(full, budget=300)
+    kept = summary["products"]
+    assert 0 < len(kept) < len(products)
+    assert [item["id"] for item in kept] == [card["id"] for card in full["products"][:len(kept)]]
+    assert summary["omitted"] == len(products) - len(kept)
+    assert summary["shown_to_user"] == len(products) and summary["message"] == full["message"]
+    assert estimate_tokens(json.dumps(summary, ensure_ascii=False)) <= 300 + 10
+    assert compact_payload(full, budget=300) == summary
+
+
+def test_compact_payload_keeps_at_least_one_product(products):
+    summary = compact_payload(payload(products, 2), budget=1)
+    assert len(summary["products"]) == 1 and summary["omitted"] == 1
+
+
+def test_render_tool_output_splits_frontend_and_model(products):
+    full = payload(products, 3)
+    context = SimpleNamespace(state={}, invocation_id=None, function_call_id=None)
+    output = json.loads(render_tool_output(full, context))
+    assert context.state[OUTPUT_CONFIG["display_state_key"]] is full
+    assert output["type"] == "product-summary" and len(output["products"]) == 3
+    assert render_tool_output(full, context, summary="đã hiển thị") == "đã hiển thị"
+    assert json.loads(render_tool_output(full, None)) == full
@@ -0,0 +1,71 @@
+"""Materialized head queries: mining, keys and the version-checked sidecar"""
+
+import json
+import os
+
+from app.tools.head_queries import (
+    HeadQuerySidecar, HeadQueryTable, head_key, mine_query_log, read_query_list, unique_queries,
+)
+
+
+def entry(name):
+    return {"payload": {"type": "product-display", "products": [{"name": name}]}, "summary": name}
+
+
+def test_keys_fold_diacritics_and_spacing():
+    assert head_key("Điện  Thoại", 10) == head_key("dien thoai", 10) == "dien thoai|10"
+    assert head_key("iphone 16", 5) != head_key("iphone 16", 10)
+    assert unique_queries(["Điện thoại", "dien thoai", "", "iPhone", "iphone "]) == ["Điện thoại", "iPhone"]
+
+
+def test_mining_counts_only_plain_search_products_calls(tmp_path):
+    records = (
+        [{"tool": "search_products", "op": "search_page", "q": "iphone 16", "f": {}, "o": 0}] * 3
+        + [{"tool": "search_products", "op": "lookup", "q": "s25 ultra"}] * 2
+        + [{"tool": "search_products", "op": "search_page", "q": "samsung", "f": {"in_stock": True}}] * 5
+        + [{"tool": "search_products", "op": "search_page", "q": "samsung", "s": "price.current:asc"}] * 5
+        + [{"tool": "search_products", "op": "search_page", "q": "samsung", "o": 10}] * 5
+        + [{"tool": "explore_product", "op": "search_page", "q": "iphone 16e"}] * 5
+        + [{"tool": "search_products", "op": "faceted_search", "q": "oppo"}] * 5
+    )
+    log = tmp_path / "queries.ndjson"
+    log.write_text("\n".join(json.dumps(record) for record in records) + '\n{"cut off', encoding="utf-8")
+    assert mine_query_log([log], top=10) == ["iphone 16", "s25 ultra"]
+    assert mine_query_log([log], top=1) == ["iphone 16"]
+
+
+def test_query_list_skips_comments(tmp_path):
+    path = tmp_path / "head_queries.txt"
+    path.write_text("# top queries\niphone 16\n\n  galaxy a56  \n", encoding="utf-8")
+    assert read_query_list(path) == ["iphone 16", "galaxy a56"]
+    assert read_query_list(tmp_path / "missing.txt") == []
+
+
+def test_table_round_trip_and_format_check(tmp_path):
+    path = tmp_path / "head_queries.json"
+    HeadQueryTable("v1", {head_key("iphone 16", 10): entry("iPhone 16")}, built_at=1.5).save(path)
+    table = HeadQueryTable.load(path)
+    assert (table.index_version, table.built_at, len(table)) == ("v1", 1.5, 1)
+    assert table.get("IPHONE  16", 10) == entry("iPhone 16") and table.get("iphone 16", 5) is None
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    path.write_text(json.dumps(dict(data, format=0)), encoding="utf-8")
+    assert HeadQueryTable.load(path) is None
+    path.write_text("{", encoding="utf-8")
+    assert HeadQueryTable.load(path) is None
+
+
+def test_sidecar_serves_only_its_index_version(tmp_path):
+    path = tmp_path / "head_queries.json"
+    sidecar = HeadQuerySidecar(path)
+    assert sidecar.lookup("iphone 16", 10, "v1") is None
+
+    HeadQueryTable("v1", {head_key("iphone 16", 10): entry("old")}).save(path)
+    assert sidecar.lookup("iphone 16", 10, "v1") == entry("old")
+    assert sidecar.lookup("iphone 16", 10, "v2") is None
+
+    # A reindex writes the table for the new catalog after it
+    HeadQueryTable("v2", {head_key("iphone 16", 10): entry("new catalog")}).save(path)
+    os.utime(path, ns=(1, 1))
+    assert sidecar.lookup("iphone 16", 10, "v2") == entry("new catalog")
+    assert sidecar.status() == {"entries": 1, "index_version": "v2"}
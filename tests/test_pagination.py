@@ -0,0 +1,51 @@
+"""Next-page cursors and the ranked result cache"""
+
+import base64
+
+import pytest
+
+from app.tools.pagination import RankedResultCache, decode_cursor, encode_cursor, results_key
+
+
+def test_cursor_round_trip():
+    state = {"q": "điện thoại gập", "f": {"brand": ["Samsung"], "price_max": 30_000_000},
+             "s": "price.current:asc", "o": 20, "v": "abc123", "x": ["iphone-16-pro-128gb"]}
+    cursor = encode_cursor(state)
+    assert decode_cursor(cursor) == state
+    # URL-safe and unpadded, so it survives being pasted back by the model
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+
+def test_cursor_is_canonical():
+    assert encode_cursor({"a": 1, "b": 2}) == encode_cursor({"b": 2, "a": 1})
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "next",
+    "!!!not base64!!!",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    base64.urlsafe_b64encode(b"[1, 2, 3]").decode(),
+    base64.urlsafe_b64encode(b'{"q": ').decode(),
+])
+def test_malformed_cursors_decode_to_none(cursor):
+    assert decode_cursor(cursor) is None
+
+
+def test_results_key_ignores_filter_order():
+    assert results_key("s25", {"brand": "Samsung", "in_stock": True}, None) == \
+        results_key("s25", {"in_stock": True, "brand": "Samsung"}, None)
+    assert results_key("s25", None, None) == results_key("s25", {}, None)
+    assert results_key("s25", None, ("price.current", "price", False)) != results_key("s25", None, None)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = RankedResultCache(maxsize=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert cache.get("a") == [1]
+    cache.put("c", [3])
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ([1], [3])
+    cache.clear()
+    assert cache.get("a") is None
@@ -0,0 +1,122 @@
+"""Promotion strings parsed into typed offers and the values indexed from them"""
+
+import numpy as np
+import pytest
+
+from app.tools.promotions import parse_offer, product_promotions
+
+
+@pytest.mark.parametrize("text, kind, fields", [
+    ("Giảm 7% tối đa 1 triệu cho đơn hàng từ 700K khi thanh toán bằng thẻ Muadee (qua OnePay)", "discount",
+     {"percent": 7.0, "cap": 1_000_000, "min_order": 700_000, "amount": None, "partner": "Muadee"}),
+    ("Giảm tới 1,3 triệu đơn hàng 20 triệu khi thanh toán qua thẻ Sacombank", "discount",
+     {"amount": 1_300_000, "min_order": 20_000_000, "partner": "Sacombank"}),
+    ("Thu cũ đổi mới: Tặng thêm đến 2.500.000đ", "discount", {"amount": 2_500_000, "trade_in": True}),
+    ("Giảm 300K và miễn phí chuyển đổi trả góp 0% kỳ hạn 6 Tháng", "discount",
+     {"amount": 300_000, "percent": None, "installment_zero": True}),
+    ("Galaxy Buds Core mua kèm máy giá chỉ 990.000đ", "bundle", {"price": 990_000, "add_on": True}),
+    ("Tặng Củ sạc Samsung 25W", "gift", {"amount": None, "price": None}),
+    ("Tiết kiệm đến 296.900đ với D.MEMBER", "discount", {"amount": 296_900, "partner": "D.MEMBER"}),
+    ("Giảm 500K từ 15.08 - 31.08", "discount", {"amount": 500_000, "valid_from": (15, 8), "valid_to": (31, 8)}),
+    ("Giá chỉ còn 19.990.000đ duy nhất 20.8", "discount", {"price": 19_990_000, "valid_to": (20, 8)}),
+    # Strings from the bundled catalog
+    ("Mở Thẻ MB JCB KOC – Giảm 1.000.000đ mua iPhone 16 Series", "discount",
+     {"amount": 1_000_000, "partner": "MB JCB KOC", "scope": "iphone 16", "conditional": True}),
+    ("Miếng dán bảo vệ máy giảm ngay 10%", "discount", {"percent": 10.0, "add_on": True, "scope": None}),
+    ("Giảm thêm 5% khi mua ốp lưng", "discount", {"add_on": True, "scope": None}),
+    ("Giảm thêm đến 6% cho thành viên của Di Động Việt", "discount", {"percent": 6.0, "conditional": True}),
+    ("Tiết kiệm đến 1% với D.MEMBER", "discount", {"percent": 1.0, "conditional": True}),
+    ("HSSV - Tài xế công nghệ giảm thêm 5% tối đa 600.000đ", "discount", {"cap": 600_000, "conditional": True}),
+    ("Giảm 300K và miễn phí chuyển đổi trả góp 0% kỳ hạn 6 Tháng", "discount", {"conditional": False, "scope": None}),
+    ("Deal Sốc Samsung | Duy nhất 13.06: Giảm thêm 100.000đ", "voucher",
+     {"amount": 100_000, "conditional": False, "valid_to": (13, 6)}),
+])
+def test_parse_offer(text, kind, fields):
+    offer = parse_offer(text, kind)
+    assert offer.kind == kind and offer.text == text
+    for field, value in fields.items():
+        assert getattr(offer, field) == value, field
+
+
+@pytest.mark.parametrize("text, kind, price, savings", [
+    ("Giảm 7% tối đa 500.000đ khi thanh toán qua Kredivo", "discount", 20_000_000, 500_000),
+    ("Giảm 7% tối đa 500.000đ khi thanh toán qua Kredivo", "discount", 5_000_000, 350_000),
+    ("Giảm 400K đơn hàng 10 triệu khi thanh toán qua thẻ Home Credit", "discount", 9_000_000, 0),
+    ("Giảm 400K đơn hàng 10 triệu khi thanh toán qua thẻ Home Credit", "discount", 12_000_000, 400_000),
+    ("Giá chỉ còn 19.990.000đ", "discount", 21_990_000, 2_000_000),
+    ("Thu cũ đổi mới: Tặng thêm đến 2.500.000đ", "discount", 20_000_000, 0),
+    ("Giảm thêm 200.000đ khi mua AirPods 4 ANC", "bundle", 20_000_000, 0),
+    ("Miếng dán bảo vệ máy giảm ngay 10%", "discount", 20_000_000, 0),
+    ("Giảm 300K", "discount", 0, 0),
+])
+def test_savings_on_the_phone(text, kind, price, savings):
+    assert parse_offer(text, kind).savings(price) == pytest.approx(savings)
+
+
+def test_product_rollup_takes_the_best_single_offer():
+    product = {
+        "price": {"current": 20_000_000},
+        "promotions": {
+            "special_discounts": ["Giảm 7% tối đa 500.000đ khi thanh toán qua Kredivo",
+                                  "Thu cũ đổi mới: Tặng thêm đến 2.500.000đ",
+                                  "Giảm 300K và miễn phí chuyển đổi trả góp 0% kỳ hạn 6 Tháng"],
+            "vouchers": ["Voucher giảm 800.000đ"],
+            "bundle_offers": ["Giảm thêm 200.000đ khi mua AirPods 4 ANC"],
+            "free_gifts": ["Tặng Củ sạc Samsung 25W"],
+        },
+    }
+    deals = product_promotions(product)
+    assert len(deals.offers) == 6
+    assert deals.promo_discount == 800_000 and deals.effective_price == 19_200_000
+    assert deals.trade_in_bonus == 2_500_000 and deals.installment_zero
+    assert deals.partners == ("kredivo",)
+
+
+def rollup(name, brand, price, discounts):
+    return product_promotions({"name": name, "brand": brand, "price": {"current": price},
+                               "promotions": {"special_discounts": discounts}})
+
+
+def test_offers_scoped_to_another_product_line_are_dropped():
+    discounts = ["Mở Thẻ MB JCB KOC – Giảm 1.000.000đ mua iPhone 16 Series",
+                 "Giảm 300K và miễn phí chuyển đổi trả góp 0% kỳ hạn 6 Tháng"]
+    galaxy = rollup("Samsung Galaxy A56 5G 128GB Chính Hãng (BHĐT)", "Samsung", 7_790_000, discounts)
+    assert [offer.text for offer in galaxy.offers] == discounts[1:]
+    assert galaxy.partners == () and galaxy.promo_discount == 300_000
+    iphone = rollup("iPhone 16 Pro 128GB Chính Hãng (VN/A)", "Apple", 24_690_000, discounts)
+    assert len(iphone.offers) == 2 and iphone.partners == ("mb jcb koc",)
+    # Kept for the card filter, but only card holders get it
+    assert iphone.promo_discount == 300_000
+
+
+def test_conditional_offers_stay_out_of_the_effective_price():
+    deals = rollup("Samsung Galaxy Z Fold7 5G 512GB Chính Hãng", "Samsung", 45_490_000, [
+        "Giảm thêm đến 6% cho thành viên của Di Động Việt",
+        "Giảm 7% tối đa 500.000đ khi thanh toán qua Kredivo",
+        "HSSV giảm thêm 5% tối đa 200.000đ",
+        "Miếng dán bảo vệ máy giảm ngay 10%",
+    ])
+    assert deals.promo_discount == 0 and deals.effective_price == 45_490_000
+    assert deals.partners == ("kredivo",)
+
+
+def test_bundled_catalog_deals(products):
+    deals = {product["id"]: product_promotions(product) for product in products}
+    assert deals["samsung-galaxy-z-fold7-5g-512gb"].promo_discount == 300_000
+    for product_id in ("samsung-galaxy-a56-5g-128gb-bhdt", "samsung-galaxy-a34-5g-128gb"):
+        assert "mb jcb koc" not in deals[product_id].partners
+        assert deals[product_id].promo_discount < 1_000_000
+    for product in products:
+        assert all(not offer.scope or product["name"].lower().startswith("iphone 16")
+                   for offer in deals[product["id"]].offers)
+
+
+def test_indexed_columns_follow_the_rollup(catalog, products):
+    columns = catalog.filter_index.columns
+    deals = [product_promotions(product) for product in products]
+    assert np.array_equal(columns["effective_price"].values, [d.effective_price for d in deals])
+    assert np.array_equal(columns["promo_discount"].values, [d.promo_discount for d in deals])
+    with_zero = catalog.filter_mask({"installment_0": True})
+    assert with_zero.tolist() == [d.installment_zero for d in deals]
+    # A false flag skips the filter rather than excluding 0% installment offers
+    assert catalog.filter_mask({"installment_0": "no"}).all()
@@ -0,0 +1,68 @@
+"""Query log entries, batched writes, rotation and dropping under backpressure"""
+
+import json
+import time
+
+from app.tools.query_log import QueryLog, log_entry, log_files, normalize_keywords
+
+
+def page(*ids, **fields):
+    return dict({"hits": [{"id": product_id} for product_id in ids], "total": len(ids), "source": "local"}, **fields)
+
+
+def read(path):
+    return [json.loads(line) for file in log_files(path) for line in file.read_text(encoding="utf-8").splitlines()]
+
+
+def test_entry_is_compact_and_replayable():
+    entry = log_entry("search_page", "search_products", "  iPhone  16 Pro\tMáy ", {"brand": "Apple"},
+                      "price.current:asc", 10, 20, ["a"], "v1", page("p1", "p2", cache="hit"), 12.34567)
+    assert entry["q"] == "iphone 16 pro máy"
+    assert (entry["f"], entry["s"], entry["l"], entry["o"], entry["x"]) == (
+        {"brand": "Apple"}, "price.current:asc", 10, 20, ["a"])
+    assert (entry["ids"], entry["hits"], entry["total"], entry["backend"], entry["cache"]) == (
+        ["p1", "p2"], 2, 2, "local", "hit")
+    assert entry["ms"] == 12.346
+    assert "x" not in log_entry("search_page", None, "", None, None, 5, 0, None, None, page(), 1.0)
+    assert normalize_keywords(None) == ""
+
+
+def test_background_writer_persists_every_record(tmp_path):
+    log = QueryLog(tmp_path / "queries.ndjson", max_bytes=1 << 20, backups=2, flush_interval=0.01, max_pending=100)
+    for i in range(20):
+        log.record("search_page", "search_products", f"q{i}", None, None, 10, 0, None, "v1", page(f"p{i}"), 1.0)
+    deadline = time.monotonic() + 5
+    while log.stats()["written"] < 20 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(entry["q"] for entry in read(log.path)) == sorted(f"q{i}" for i in range(20))
+    assert log.stats()["dropped"] == 0 and log.stats()["pending"] == 0
+
+
+def test_rotation_keeps_the_configured_backups(tmp_path):
+    path = tmp_path / "queries.ndjson"
+    log = QueryLog(path, max_bytes=400, backups=2, flush_interval=1.0, max_pending=100)
+    for i in range(30):
+        log._write([log_entry("search_page", None, f"q{i}", None, None, 10, 0, None, None, page(), 1.0)])
+    files = log_files(path)
+    assert [file.name for file in files] == ["queries.ndjson.2", "queries.ndjson.1", "queries.ndjson"]
+    assert all(file.stat().st_size <= 400 for file in files)
+    queries = [entry["q"] for entry in read(path)]
+    assert queries == [f"q{i}" for i in range(30 - len(queries), 30)]
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path, monkeypatch):
+    log = QueryLog(tmp_path / "queries.ndjson", max_bytes=1 << 20, backups=1, flush_interval=1.0, max_pending=3)
+    monkeypatch.setattr(log, "_start", lambda: None)
+    for i in range(5):
+        log.record("search_page", None, f"q{i}", None, None, 10, 0, None, None, page(), 1.0)
+    assert log.stats()["dropped"] == 2 and log.stats()["pending"] == 3
+    log.flush()
+    assert [entry["q"] for entry in read(log.path)] == ["q0", "q1", "q2"]
+
+
+def test_unwritable_log_counts_drops(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    log = QueryLog(blocker / "queries.ndjson", max_bytes=1 << 20, backups=1, flush_interval=1.0, max_pending=10)
+    log._write([log_entry("search_page", None, "q", None, None, 10, 0, None, None, page(), 1.0)])
+    assert (log.written, log.dropped) == (0, 1)
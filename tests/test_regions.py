@@ -0,0 +1,96 @@
+"""Store regions: region keys, in-stock regions per product and the filter index's region bitmaps"""
+
+import json
+import os
+
+import numpy as np
+
+from app.config_simple import REGION_CONFIG
+from app.tools import regions
+from app.tools.regions import StoreDirectory, load_stores, store_directory
+from app.tools.text_utils import normalize_text
+
+STORES = [
+    {"name": "Cửa hàng Biên Hòa", "region": "Đồng Nai", "city": "Biên Hòa"},
+    {"name": "Cửa hàng Quận 10", "region": "Hồ Chí Minh", "city": "Hồ Chí Minh"},
+    # A city named like another region never shadows it
+    {"name": "Cửa hàng lạ", "region": "Đồng Nai", "city": "Hà Nội"},
+    {"name": "Không vùng"},
+]
+ALIASES = {"Hồ Chí Minh": ["hcm", "sài gòn"], "Hà Nội": ["hn"]}
+
+
+def directory():
+    return StoreDirectory(STORES, ALIASES, ["con hang"])
+
+
+def branch(name, address="", stock_status="Còn hàng"):
+    return {"name": name, "address": address, "stock_status": stock_status}
+
+
+def test_region_keys():
+    stores = directory()
+    assert stores.region_key("HCM") == stores.region_key("Sài Gòn") == stores.region_key("Hồ Chí Minh") == "ho chi minh"
+    assert stores.region_key("Biên Hòa") == "dong nai"
+    assert stores.region_key("Hà Nội") == stores.region_key("hn") == "ha noi"
+    assert stores.region_key("Cần Thơ") == "can tho"
+    assert stores.label("dong nai") == "Đồng Nai" and stores.label("can tho") == "can tho"
+
+
+def test_stock_regions_follow_branch_order():
+    stores = directory()
+    product = {"store_info": {"branches": [
+        branch("Cửa hàng Biên Hòa"),
+        branch("Cửa hàng Quận 10", stock_status="Hết hàng"),
+        branch("Kho Cần Thơ", "12 Đường 30/4, Ninh Kiều, Cần Thơ", "còn hàng (2 máy)"),
+        branch("Cửa hàng khác", "1 Lê Lợi, Quận 1, TP HCM"),
+        branch("Cửa hàng Biên Hòa"),
+        "not a branch",
+        branch("Không địa chỉ"),
+    ]}}
+    assert stores.stock_regions(product) == {"dong nai": "Đồng Nai", "can tho": "Cần Thơ", "tp hcm": "TP HCM"}
+    assert stores.regions_in_stock(product) == ["dong nai", "can tho", "tp hcm"]
+    # Branch results are cached by signature; a repeat product gets the same answer
+    assert stores.stock_regions(product) == stores.stock_regions(json.loads(json.dumps(product)))
+    assert stores.stock_regions({}) == {} and stores.stock_regions({"store_info": None}) == {}
+
+
+def test_load_stores(tmp_path):
+    assert load_stores(tmp_path / "missing.json") == []
+    (tmp_path / "bad.json").write_text("{", encoding="utf-8")
+    assert load_stores(tmp_path / "bad.json") == []
+    (tmp_path / "dict.json").write_text('{"name": "x"}', encoding="utf-8")
+    assert load_stores(tmp_path / "dict.json") == []
+    (tmp_path / "stores.json").write_text(json.dumps(STORES + [1, None]), encoding="utf-8")
+    assert load_stores(tmp_path / "stores.json") == STORES
+
+
+def test_store_directory_is_reread_when_the_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "stores.json"
+    path.write_text(json.dumps(STORES[:1]), encoding="utf-8")
+    monkeypatch.setitem(REGION_CONFIG, "stores_file", path)
+    monkeypatch.setattr(regions, "_directory", (None, None))
+    first = store_directory()
+    assert store_directory() is first and first.region_key("Biên Hòa") == "dong nai"
+
+    path.write_text(json.dumps([{"name": "x", "region": "Bình Dương", "city": "Thủ Dầu Một"}]), encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = store_directory()
+    assert second is not first
+    assert second.region_key("Thủ Dầu Một") == "binh duong" and second.region_key("Biên Hòa") == "bien hoa"
+
+
+def test_region_filter_matches_branch_stock(catalog, products):
+    stores = store_directory()
+    index = catalog.filter_index
+    assert index.bitmaps["region"], "bundled catalog has in-stock branches"
+    for key, label in index.labels["region"].items():
+        expected = [key in stores.stock_regions(product) for product in products]
+        for name in {key, label, normalize_text(label).upper()}:
+            assert np.array_equal(index.evaluate({"region": name}), expected), name
+    hcm = index.evaluate({"region": "hcm"})
+    assert np.array_equal(hcm, index.evaluate({"region": "Hồ Chí Minh"}))
+    either = index.evaluate({"region": ["hcm", "hn"]})
+    assert np.array_equal(either, hcm | index.evaluate({"region": "Hà Nội"}))
+    assert not index.evaluate({"region": "Sao Hỏa"}).any()
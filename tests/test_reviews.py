@@ -0,0 +1,75 @@
+"""Incremental review aggregation and the product overlay it is applied through"""
+
+import numpy as np
+import pytest
+
+from app.tools.catalog_index import CatalogIndex
+from app.tools.columnar import ProductOverlay, ProductStore
+from app.tools.reviews import ReviewAggregator
+
+
+def review(review_id, product_id, rating, updated="2025-08-25T15:52:14Z", comment="Máy dùng tốt"):
+    return {"id": review_id, "product_id": product_id, "rating": rating, "comment": comment,
+            "created_at": "2025-08-25T15:52:14Z", "last_updated_at": updated}
+
+
+@pytest.fixture
+def aggregator():
+    return ReviewAggregator(half_life_days=90, snippets=2, snippet_chars=100)
+
+
+def test_each_review_is_applied_once(aggregator):
+    assert aggregator.ingest([review("r1", "p1", 5), review("r2", "p1", 3)]) == {"p1"}
+    assert aggregator.ingest([review("r1", "p1", 5)]) == set()
+    aggregate = aggregator.aggregates["p1"]
+    assert (aggregate.count, aggregate.rating_sum) == (2, 8)
+    assert aggregator.version == 1
+
+
+def test_edit_replaces_the_old_contribution(aggregator):
+    aggregator.ingest([review("r1", "p1", 5), review("r2", "p1", 3)])
+    assert aggregator.ingest([review("r2", "p2", 1, updated="2025-09-01T00:00:00Z")]) == {"p1", "p2"}
+    assert (aggregator.aggregates["p1"].count, aggregator.aggregates["p1"].rating_sum) == (1, 5)
+    assert (aggregator.aggregates["p2"].count, aggregator.aggregates["p2"].rating_sum) == (1, 1)
+
+
+def test_invalid_records_are_skipped(aggregator):
+    assert aggregator.ingest([review("", "p1", 5), review("r1", "p1", 0), review("r2", "p1", True)]) == set()
+
+
+def test_apply_merges_with_catalog_baseline_and_is_idempotent(aggregator):
+    product = {"id": "p1", "reviews": {"average_rating": 4.0, "rating_count": 2}}
+    aggregator.ingest([review("r1", "p1", 5)])
+    once = aggregator.apply(product, "p1")
+    assert once["reviews"]["rating_count"] == 3
+    assert once["reviews"]["average_rating"] == round((4.0 * 2 + 5) / 3, 2)
+    assert once["reviews"]["histogram"]["5"] == 1
+    assert aggregator.apply(once, "p1")["reviews"] == once["reviews"]
+    assert product["reviews"] == {"average_rating": 4.0, "rating_count": 2}
+
+
+def test_with_products_overlays_a_shared_store(products):
+    base = CatalogIndex(products)
+    base.products = ProductStore(products)
+    row = 2
+    updated = {**products[row], "reviews": {**products[row]["reviews"], "average_rating": 1.0}}
+
+    catalog = base.with_products({row: updated})
+    assert isinstance(catalog.products, ProductOverlay)
+    assert catalog.products.base is base.products
+    assert catalog.products[row] is updated
+    assert catalog.get(products[row]["id"]) is updated
+    assert catalog.products[row + 1] == products[row + 1]
+    assert list(catalog.products)[row] is updated and len(catalog.products) == len(products)
+    assert base.products[row]["reviews"] == products[row]["reviews"]
+
+    rating = catalog.filter_index.columns["rating"].values
+    assert rating[row] == 1.0
+    assert base.filter_index.columns["rating"].values[row] == products[row]["reviews"]["average_rating"]
+    assert np.all(catalog.filter_mask({"rating_min": 4.5}) <= base.filter_mask({"rating_min": 4.5}))
+
+    again = catalog.with_products({row + 1: products[row + 1]})
+    assert again.products.base is base.products
+    assert set(again.products.replacements) == {row, row + 1}
+    with pytest.raises(IndexError):
+        again.products[len(products)]
@@ -0,0 +1,61 @@
+"""Publishing the catalog to the shared store and attaching it read-only"""
+
+import json
+
+import numpy as np
+import pytest
+
+from app.tools.columnar import IdHashIndex, PackedBytes, ProductStore
+from app.tools.shared_catalog import attach_catalog, current_generation, publish_catalog
+
+
+def test_packed_columns_round_trip(products):
+    items = ["", "iPhone 16", "điện thoại"]
+    packed = PackedBytes([item.encode("utf-8") for item in items])
+    assert [packed.get(i).decode("utf-8") for i in range(len(packed))] == items
+
+    store = ProductStore(products)
+    assert len(store) == len(products) and store[-1] == products[-1] and list(store) == products
+    with pytest.raises(IndexError):
+        store[len(products)]
+
+    ids = IdHashIndex({f"id-{i}": i for i in range(1000)})
+    assert all(ids.get(f"id-{i}") == i for i in range(1000))
+    assert ids.get("id-1000") is None and ids.get(None) is None and ids.get("", -1) == -1
+
+
+def test_attached_catalog_matches_the_published_one(catalog, products, tmp_path):
+    assert attach_catalog(tmp_path) is None
+    generation = publish_catalog(catalog, tmp_path, "fingerprint")
+    attached_generation, fingerprint, attached = attach_catalog(tmp_path)
+    assert (attached_generation, fingerprint) == (generation, "fingerprint")
+
+    assert isinstance(attached.products, ProductStore) and list(attached.products) == products
+    assert attached.get("apple-iphone-16e-128gb") == catalog.get("apple-iphone-16e-128gb")
+    for filters in ({"brand": "Samsung"}, {"in_stock": True, "price_max": 25_000_000}):
+        assert np.array_equal(attached.filter_mask(filters), catalog.filter_mask(filters))
+    assert attached.vector_rows("ip16 pm") == catalog.vector_rows("ip16 pm")
+    assert [p["id"] for p in attached.mentioned_products("s25 ultra")] == \
+        [p["id"] for p in catalog.mentioned_products("s25 ultra")]
+
+    # Arrays are views of the read-only mapping, not per-process copies
+    values = attached.filter_index.columns["price"].values
+    assert not values.flags.writeable
+    with pytest.raises(ValueError):
+        values[0] = 0
+
+
+def test_generations_advance_and_old_ones_are_pruned(catalog, tmp_path):
+    for expected in (1, 2, 3):
+        assert publish_catalog(catalog, tmp_path, None, keep=2) == expected
+    assert current_generation(tmp_path) == 3
+    assert sorted(path.name for path in tmp_path.glob("gen-*")) == ["gen-000002", "gen-000003"]
+    assert attach_catalog(tmp_path, generation=2)[0] == 2
+
+
+def test_other_formats_are_ignored(catalog, tmp_path):
+    publish_catalog(catalog, tmp_path, None)
+    meta_path = tmp_path / "gen-000001" / "meta.json"
+    meta = json.loads(meta_path.read_text())
+    meta_path.write_text(json.dumps(dict(meta, format=meta["format"] - 1)))
+    assert attach_catalog(tmp_path) is None
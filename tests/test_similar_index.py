@@ -0,0 +1,85 @@
+"""Neighbor lists from the cell search agree with a brute-force scan"""
+
+import numpy as np
+import pytest
+
+from app.config_simple import SIMILAR_CONFIG
+from app.tools import similar_index
+from app.tools.filter_index import NumericColumn
+from app.tools.similar_index import SimilarityIndex
+from app.tools.spec_matrix import SpecMatrix
+from app.tools.specs import NUMERIC_FIELDS
+
+K = 8
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    """600 variants of 40 models: shared specs per model, storage-tier prices with ties, some unpriced"""
+    rng = np.random.default_rng(3)
+    models = rng.integers(0, 40, size=600)
+    model_specs = {field: rng.choice([1, 2, 3, 4, 6, 8], size=40).astype(np.float64) for field in NUMERIC_FIELDS}
+    columns = {field: values[models] for field, values in model_specs.items()}
+    columns["price"] = (models * 400_000 + 3_000_000 + rng.integers(0, 4, size=600) * 2_000_000).astype(np.float64)
+    columns["price"][rng.choice(600, size=12, replace=False)] = np.nan
+    columns["rating"][rng.choice(600, size=60, replace=False)] = np.nan
+    specs = SpecMatrix({field: NumericColumn(values) for field, values in columns.items()})
+    products = [{"brand": ["Apple", "Samsung", "Xiaomi"][model % 3]} for model in models]
+    return specs, products
+
+
+def build(specs, products):
+    return SimilarityIndex(specs, products, K, SIMILAR_CONFIG["price_band"], SIMILAR_CONFIG["brand_penalty"],
+                           SIMILAR_CONFIG["feature_weights"])
+
+
+def brute_force(specs, index):
+    weights = np.array([SIMILAR_CONFIG["feature_weights"].get(field, 0.0) for field in specs.fields])
+    features = specs.scores.astype(np.float64) * np.sqrt(weights)
+    prices = specs.values[:, specs.fields.index("price")]
+    band = SIMILAR_CONFIG["price_band"]
+    expected = []
+    for row in range(len(prices)):
+        distances = np.sqrt(((features - features[row]) ** 2).sum(axis=1))
+        distances += SIMILAR_CONFIG["brand_penalty"] * (index.brands != index.brands[row])
+        with np.errstate(invalid="ignore"):
+            ratio = prices / prices[row]
+        distances[(ratio > band) | (ratio < 1 / band)] = np.inf
+        distances[row] = np.inf
+        nearest = np.sort(distances)[:K]
+        expected.append(nearest[np.isfinite(nearest)])
+    return expected
+
+
+@pytest.mark.parametrize("max_cells", [similar_index.MAX_CELLS, 1])
+def test_neighbors_equal_a_full_scan(synthetic, monkeypatch, max_cells):
+    monkeypatch.setattr(similar_index, "MAX_CELLS", max_cells)
+    specs, products = synthetic
+    index = build(specs, products)
+    prices = specs.values[:, specs.fields.index("price")]
+    for row, expected in enumerate(brute_force(specs, index)):
+        rows, distances = index.neighbors(row)
+        assert row not in rows
+        assert np.all(np.diff(distances) >= 0)
+        np.testing.assert_allclose(distances, expected, rtol=1e-4, atol=1e-5)
+        if not np.isnan(prices[row]):
+            neighbor_prices = prices[rows][~np.isnan(prices[rows])]
+            assert np.all(neighbor_prices <= prices[row] * 2) and np.all(neighbor_prices * 2 >= prices[row])
+
+
+def test_bundled_catalog_neighbors(catalog, products):
+    index = catalog.similar_index
+    row = next(i for i, p in enumerate(products) if p["id"] == "iphone-16-pro-256gb")
+    rows, distances = index.neighbors(row)
+    assert len(rows) and np.isfinite(distances).all()
+    # Another brand pays a fixed penalty, so the closest alternative is another iPhone
+    assert products[rows[0]]["brand"] == "Apple"
+    price = products[row]["price"]["current"]
+    assert all(price / 2 <= products[r]["price"]["current"] <= price * 2 for r in rows)
+
+
+def test_tiny_catalogs(synthetic):
+    specs, products = synthetic
+    one = SpecMatrix({field: NumericColumn(specs.values[:1, j].copy()) for j, field in enumerate(specs.fields)})
+    index = build(one, products[:1])
+    assert len(index.neighbors(0)[0]) == 0
@@ -0,0 +1,75 @@
+"""Percentile spec scores, per-spec winners and catalog-wide value ranking"""
+
+import numpy as np
+import pytest
+
+from app.tools.filter_index import NumericColumn
+from app.tools.spec_matrix import SpecMatrix
+from app.tools.specs import NUMERIC_FIELDS
+
+
+def matrix(**fields):
+    """SpecMatrix over the given columns; other fields are missing"""
+    size = len(next(iter(fields.values())))
+    return SpecMatrix({
+        field: NumericColumn(np.array(fields.get(field, [np.nan] * size), dtype=np.float64))
+        for field in NUMERIC_FIELDS
+    })
+
+
+def score(specs, field):
+    return specs.scores[:, specs.fields.index(field)].tolist()
+
+
+def test_scores_are_flipped_percentiles_with_shared_ties():
+    specs = matrix(price=[10, 20, 20, 40, np.nan], battery_mah=[4000, 5000, np.nan, 3000, 4000])
+    assert score(specs, "price") == pytest.approx([1.0, 0.5, 0.5, 0.0, 0.5])
+    assert score(specs, "battery_mah") == pytest.approx([0.5, 1.0, 0.5, 0.0, 0.5])
+    assert score(specs, "rating") == [0.5] * 5
+
+
+def test_winners_skip_undecided_fields():
+    specs = matrix(price=[30, 10, 20], ram_gb=[8, 8, 8], battery_mah=[np.nan, np.nan, 5000],
+                   camera_mp=[48, 200, 50])
+    assert specs.winners([0, 1, 2]) == {"price": 1, "battery_mah": 2, "camera_mp": 1}
+    assert specs.winners([2, 0]) == {"price": 0, "battery_mah": 0, "camera_mp": 0}
+
+
+def test_weights_are_normalized_and_validated():
+    specs = matrix(price=[1, 2])
+    vector = specs.weight_vector({"price": 3, "rating": 1, "colour": 5, "ram_gb": -2})
+    assert vector.sum() == pytest.approx(1.0)
+    assert vector[specs.fields.index("price")] == pytest.approx(0.75)
+    with pytest.raises(ValueError):
+        specs.weight_vector({"colour": 1})
+
+
+@pytest.mark.parametrize("weights", [{"price": 1}, {"battery_mah": 3, "camera_mp": 2, "price": 1}, None])
+def test_rank_matches_a_full_sort(catalog, weights):
+    specs = catalog.spec_matrix
+    weights = weights or {"price": 0.3, "rating": 0.2, "battery_mah": 0.1, "camera_mp": 0.1, "storage_gb": 0.1}
+    mask = catalog.filter_mask({"in_stock": True})
+    rows, scores = specs.rank(weights, mask, k=5)
+    all_scores = specs.value_scores(weights)
+    expected = sorted(np.flatnonzero(mask), key=lambda row: (-all_scores[row], row))[:5]
+    assert rows.tolist() == expected
+    assert scores.tolist() == all_scores[expected].tolist()
+
+
+def test_rank_of_an_empty_mask(catalog):
+    rows, scores = catalog.spec_matrix.rank({"price": 1}, np.zeros(len(catalog), dtype=bool))
+    assert len(rows) == len(scores) == 0
+
+
+def test_cheapest_phone_wins_on_price(catalog, products):
+    rows, _ = catalog.spec_matrix.rank({"price": 1}, k=1)
+    assert products[rows[0]]["price"]["current"] == min(p["price"]["current"] for p in products)
+
+
+def test_rank_breaks_ties_by_row():
+    prices = np.random.default_rng(7).integers(0, 5, size=200).astype(np.float64)
+    specs = matrix(price=prices)
+    scores = specs.value_scores({"price": 1})
+    for k in (1, 7, 60):
+        rows, _ = specs.rank({"price": 1}, k=k)
+        assert rows.tolist() == sorted(range(200), key=lambda row: (-scores[row], row))[:k]
@@ -0,0 +1,80 @@
+"""SQLite FTS5 backend: filters agree with BitmapFilterIndex over the same catalog"""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from app.tools.filter_index import parse_sort
+from app.tools.search_backend import SearchBackend
+from app.tools.sqlite_search import SQLiteSearchBackend, build_search_tables
+
+
+@pytest.fixture(scope="module")
+def backend(products, tmp_path_factory):
+    path = tmp_path_factory.mktemp("sqlite") / "ddv.sqlite3"
+    build_search_tables(products, path, fingerprint="test")
+    return SQLiteSearchBackend(path)
+
+
+def ids(result):
+    return {hit["id"] for hit in result["hits"]}
+
+
+def test_in_stock_filter_matches_normalized_availability(backend, products):
+    # The availability column holds normalized values ("in stock"), not "in_stock"
+    result = backend.search("", 50, 0, {"in_stock": True}, None)
+    expected = {p["id"] for p in products if p["availability"] == "in_stock"}
+    assert result["total"] == len(expected) > 0
+    assert ids(result) == expected
+
+
+@pytest.mark.parametrize("filters", [
+    {"brand": "Apple"},
+    {"brand": ["apple", "SAMSUNG"], "in_stock": True},
+    {"price_max": 20000000},
+    {"price_min": 20000000, "brand": "Samsung"},
+    {"region": "hcm"},
+    {"region": ["Hà Nội", "Đà Nẵng"], "in_stock": True},
+])
+def test_filters_match_bitmap_index(backend, catalog, filters):
+    expected = {catalog.products[row]["id"] for row in np.flatnonzero(catalog.filter_index.evaluate(filters))}
+    result = backend.search("", 50, 0, filters, None)
+    assert result["total"] == len(expected)
+    assert ids(result) == expected
+
+
+def test_text_query_with_filter(backend):
+    result = backend.search("iphone", 50, 0, {"in_stock": True}, None)
+    assert result["total"] > 0
+    assert all(hit["brand"] == "Apple" and hit["availability"] == "in_stock" for hit in result["hits"])
+
+
+def test_sort_and_pagination(backend, products):
+    sort_spec = parse_sort("price.current:asc")
+    first = backend.search("", 5, 0, None, sort_spec)
+    second = backend.search("", 5, 5, None, sort_spec)
+    prices = [hit["price"]["current"] for hit in first["hits"] + second["hits"]]
+    assert prices == sorted(prices)
+    assert first["total"] == len(products)
+    assert not ids(first) & ids(second)
+
+
+def test_stale_format_is_rejected(products, tmp_path):
+    path = tmp_path / "stale.sqlite3"
+    build_search_tables(products[:2], path)
+    connection = sqlite3.connect(path)
+    connection.execute("UPDATE search_meta SET value = '0' WHERE key = 'format'")
+    connection.commit()
+    connection.close()
+    with pytest.raises(RuntimeError):
+        SQLiteSearchBackend(path)
+
+
+def test_incomplete_backend_fails_when_created():
+    class NoHealthCheck(SearchBackend):
+        def search(self, query, limit, offset, enhanced_filters, sort_spec):
+            return {"hits": [], "total": 0}
+
+    with pytest.raises(TypeError):
+        NoHealthCheck()
@@ -0,0 +1,69 @@
+"""Typeahead suggestions: prefix lookups against a scan of every key, and trailing-word completion"""
+
+import pytest
+
+from app.tools.suggest_index import SuggestIndex
+from app.tools.text_utils import normalize_text
+
+
+@pytest.fixture(scope="module")
+def index(products):
+    return SuggestIndex(products, max_limit=20, cached_prefix_chars=2)
+
+
+def best_scores(index, prefix):
+    """Suggestion -> best score of its keys starting with prefix, by scanning every key"""
+    scores = {}
+    for row in range(len(index.keys)):
+        if index.keys.get(row).decode("ascii").startswith(prefix):
+            suggestion = int(index.key_suggestions[row])
+            scores[suggestion] = max(scores.get(suggestion, 0.0), float(index.key_scores[row]))
+    return scores
+
+
+def prefixes(index, max_chars=8):
+    keys = {index.keys.get(row).decode("ascii") for row in range(len(index.keys))}
+    return sorted({key[:length] for key in keys for length in range(1, min(len(key), max_chars) + 1)})
+
+
+@pytest.mark.parametrize("limit", [1, 3, 20])
+def test_lookup_matches_key_scan(index, limit):
+    for prefix in prefixes(index):
+        scores = best_scores(index, prefix)
+        numbers = [int(number) for number in index.lookup(prefix, limit)]
+        assert len(numbers) == len(set(numbers)) == min(limit, len(scores)), prefix
+        got = [scores[number] for number in numbers]
+        assert got == sorted(scores.values(), reverse=True)[:len(got)], prefix
+
+
+def test_cached_prefixes_match_uncached(products, index):
+    uncached = SuggestIndex(products, max_limit=20, cached_prefix_chars=0)
+    assert not uncached.prefix_ranges
+    for prefix in prefixes(index, max_chars=2):
+        assert list(index.lookup(prefix, 5)) == list(uncached.lookup(prefix, 5)), prefix
+
+
+def test_trailing_words_are_completed(index):
+    result = index.suggest("so sánh ip 16 p", limit=4, max_words=6)
+    assert result["replace_words"] == 3
+    assert {item["kind"] for item in result["suggestions"]} == {"product"}
+    assert all(normalize_text(item["text"]).startswith("iphone 16 pro") for item in result["suggestions"])
+    assert [item["text"] for item in index.suggest("pro max", 4, 6)["suggestions"]] == [
+        "iPhone 16 Pro Max 256GB Chính Hãng (VN/A)", "iPhone 16 Pro Max 512GB Chính Hãng (VN/A)"]
+
+
+def test_brands_and_aliases(index, products):
+    assert index.suggest("ss", 4, 6)["suggestions"] == [{"text": "Samsung", "kind": "brand"}]
+    assert index.suggest("táo", 4, 6)["suggestions"][0] == {"text": "Apple", "kind": "brand"}
+    # A brand is as popular as all its models together, so it leads its own prefix
+    assert index.suggest("sam", 4, 6)["suggestions"][0]["kind"] == "brand"
+    product = index.suggest("Galaxy", 4, 6)["suggestions"][1]
+    catalog = {p["id"]: p for p in products}
+    assert product["price"] == catalog[product["id"]]["price"]["current"] and product["text"] == catalog[product["id"]]["name"]
+
+
+def test_no_match_and_limits(index):
+    assert index.suggest("xyz", 4, 6) is None
+    assert index.suggest("", 4, 6) is None
+    assert len(index.lookup("i", 100)) <= index.max_limit
+    assert len(index) == 18 + 2
@@ -0,0 +1,58 @@
+"""Partial top-k selection agrees with a full stable sort"""
+
+import numpy as np
+import pytest
+
+from app.tools.filter_index import NumericColumn, parse_sort
+
+
+class _Index:
+    """Just the column lookup top_k needs"""
+
+    def __init__(self, values):
+        self.columns = {"value": NumericColumn(np.asarray(values, dtype=np.float64))}
+
+    from app.tools.filter_index import BitmapFilterIndex
+    top_k = BitmapFilterIndex.top_k
+
+
+def full_sort(values, rows, descending):
+    keys = [(np.inf if np.isnan(values[row]) else (-values[row] if descending else values[row]), row) for row in rows]
+    return [row for _, row in sorted(keys)]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("k", [1, 5, 40, 500])
+def test_matches_full_sort_with_ties_and_missing_values(descending, k):
+    rng = np.random.default_rng(k)
+    values = rng.integers(0, 20, size=300).astype(np.float64)
+    values[rng.choice(300, size=30, replace=False)] = np.nan
+    index = _Index(values)
+    rows = np.sort(rng.choice(300, size=200, replace=False))
+    assert index.top_k(rows, "value", descending, k).tolist() == full_sort(values, rows, descending)[:k]
+
+
+def test_empty_selection():
+    index = _Index([3.0, 1.0])
+    assert index.top_k(np.array([0, 1]), "value", False, 0).tolist() == []
+    assert index.top_k(np.array([], dtype=np.int64), "value", False, 3).tolist() == []
+
+
+def test_catalog_price_sort(catalog, products):
+    rows = np.flatnonzero(catalog.filter_index.evaluate({"brand": "Samsung"}))
+    cheapest = catalog.filter_index.top_k(rows, "price", False, 3)
+    expected = sorted((p["price"]["current"], i) for i, p in enumerate(products) if p["brand"] == "Samsung")[:3]
+    assert cheapest.tolist() == [i for _, i in expected]
+
+
+@pytest.mark.parametrize("sort, expected", [
+    ("price.current:asc", ("price.current", "price", False)),
+    ("price.current", ("price.current", "price", False)),
+    ("reviews.average_rating:desc", ("reviews.average_rating", "rating", True)),
+    ("specs_numeric.battery_mah:desc", ("specs_numeric.battery_mah", "battery_mah", True)),
+    ("price.current:down", None),
+    ("color:asc", None),
+    ("", None),
+])
+def test_parse_sort(sort, expected):
+    assert parse_sort(sort) == expected
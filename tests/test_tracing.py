@@ -0,0 +1,68 @@
+"""Turn traces: span parentage from ADK ids and the JSONL export"""
+
+import json
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+
+from app import tracing
+from app.tracing import JsonlExporter, Tracer, tracing_callbacks
+from trace_report import load_spans
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "tracer", Tracer(JsonlExporter(path, flush_every=100)))
+    return path
+
+
+def run_turn(callbacks, fail_tool=False):
+    context = SimpleNamespace(invocation_id="turn-1", agent_name="ddv", function_call_id="call-1", state={})
+    tool = SimpleNamespace(name="search_products")
+    callbacks["before_agent_callback"](context)
+    callbacks["before_model_callback"](context, SimpleNamespace(model="gemini"))
+    callbacks["after_model_callback"](context, SimpleNamespace(usage_metadata=SimpleNamespace(
+        prompt_token_count=120, candidates_token_count=30)))
+    callbacks["before_tool_callback"](tool, {"keywords": "iphone 16"}, context)
+    with pytest.raises(RuntimeError) if fail_tool else nullcontext():
+        with tracing.tracer.span("engine.search_page", context, offset=0) as span:
+            span.set(hits=3)
+            if fail_tool:
+                raise RuntimeError("backend down")
+    callbacks["after_tool_callback"](tool, {}, context, "[...]")
+    callbacks["after_agent_callback"](context)
+
+
+def test_turn_spans_nest_and_flush_when_the_turn_ends(trace_file):
+    run_turn(tracing_callbacks())
+    spans = {span["name"]: span for span in load_spans(trace_file)}
+    assert set(spans) == {"agent.turn", "model.call", "tool.search_products", "engine.search_page"}
+    turn = spans["agent.turn"]
+    assert turn["parent"] is None and all(span["trace"] == "turn-1" for span in spans.values())
+    assert spans["model.call"]["parent"] == turn["span"]
+    assert spans["tool.search_products"]["parent"] == turn["span"]
+    assert spans["engine.search_page"]["parent"] == spans["tool.search_products"]["span"]
+    assert spans["engine.search_page"]["attrs"] == {"offset": 0, "hits": 3}
+    assert spans["model.call"]["attrs"]["prompt_tokens"] == 120
+    assert turn["ms"] >= spans["tool.search_products"]["ms"] >= spans["engine.search_page"]["ms"]
+
+
+def test_errors_are_recorded_on_the_span(trace_file):
+    run_turn(tracing_callbacks(), fail_tool=True)
+    engine, = [span for span in load_spans(trace_file) if span["name"] == "engine.search_page"]
+    assert engine["attrs"]["error"] == "RuntimeError"
+
+
+def test_disabled_tracer_records_nothing(monkeypatch):
+    monkeypatch.setattr(tracing, "tracer", Tracer(None))
+    assert tracing_callbacks() == {}
+    with tracing.tracer.span("engine.search_page", SimpleNamespace(invocation_id="t")) as span:
+        span.set(hits=1)
+
+
+def test_report_skips_lines_cut_off_by_a_crash(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    path.write_text(json.dumps({"name": "agent.turn"}) + "\n" + '{"name": "tool.se')
+    assert load_spans(path) == [{"name": "agent.turn"}]
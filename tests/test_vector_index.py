@@ -0,0 +1,68 @@
+"""Character n-gram vector index and rank fusion"""
+
+import numpy as np
+import pytest
+
+from app.tools.catalog_index import fuse_results, fuse_rows, product_document
+from app.tools.vector_index import CharNgramVectorIndex
+
+
+@pytest.fixture(scope="module")
+def index(products):
+    return CharNgramVectorIndex([product_document(product) for product in products])
+
+
+def dense(index, row):
+    vector = np.zeros(index.dim)
+    start, end = index.doc_indptr[row], index.doc_indptr[row + 1]
+    np.add.at(vector, index.doc_features[start:end].astype(np.int64), index.doc_weights[start:end])
+    return vector
+
+
+def test_documents_are_unit_vectors(index, products):
+    for row in range(len(products)):
+        assert np.linalg.norm(dense(index, row)) == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("ip16 pm", "iPhone 16 Pro Max"),
+    ("dien thoai samsung s25 utra", "Samsung Galaxy S25 Ultra"),
+    ("galaxy zfold 7", "Samsung Galaxy Z Fold7"),
+])
+def test_fuzzy_queries_find_the_model(index, products, query, expected):
+    rows = [row for row, _ in index.query(query, top_k=3)]
+    assert rows and products[rows[0]]["name"].startswith(expected)
+
+
+def test_scores_are_exact_cosines_in_order(index):
+    results = index.query("iphone 16 pro", top_k=5, min_score=0.0)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    # Exact scores of all candidates: the top result is the best cosine over the catalog
+    features = index._features("iphone 16 pro")
+    query = np.zeros(index.dim)
+    for feature, count in features.items():
+        query[feature] = (1.0 + np.log(count)) * index.idf[feature]
+    query /= np.linalg.norm(query)
+    cosines = np.array([dense(index, row) @ query for row in range(index.size)])
+    assert results[0][1] == pytest.approx(cosines.max(), abs=1e-4)
+
+
+def test_mask_restricts_results(index, products):
+    mask = np.array([product["brand"] == "Samsung" for product in products])
+    results = index.query("iphone 16 pro max", top_k=5, min_score=0.0, mask=mask)
+    assert all(mask[row] for row, _ in results)
+    assert index.query("iphone", mask=np.zeros(len(products), dtype=bool)) == []
+
+
+def test_empty_query(index):
+    assert index.query("") == []
+    assert index.query("   ") == []
+
+
+def test_fuse_rows_matches_fuse_results():
+    lexical, semantic = [3, 1, 4, 5], [5, 9, 3, 2]
+    expected = [hit["id"] for hit in fuse_results([{"id": r} for r in lexical], [{"id": r} for r in semantic], None)]
+    assert list(fuse_rows(np.array(lexical), semantic)) == expected
+    assert expected[:2] == [3, 5]
+    assert len(fuse_rows(np.array([], dtype=np.int64), [])) == 0
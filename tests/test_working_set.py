@@ -0,0 +1,92 @@
+"""Ordinal references to products shown earlier in the session"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.config_simple import WORKING_SET_CONFIG
+from app.tools.formatting import product_card
+from app.tools.working_set import parse_ordinal, remember_products, resolve_reference
+
+
+@pytest.mark.parametrize("reference, position", [
+    ("cái thứ 2", 2),
+    ("sản phẩm thứ hai", 2),
+    ("Cái đầu tiên", 1),
+    ("máy cuối cùng", -1),
+    ("cái cuối", -1),
+    ("số 3", 3),
+    ("#1", 1),
+    ("thứ năm", 5),
+    ("2", 2),
+    ("ba", None),
+    ("cái thứ 0", None),
+    ("iphone 16 pro", None),
+    ("samsung galaxy s25", None),
+])
+def test_parse_ordinal(reference, position):
+    assert parse_ordinal(reference) == position
+
+
+@pytest.fixture
+def session(products):
+    context = SimpleNamespace(state={})
+    cards = [product_card(product) for product in products[:4]]
+    remember_products(context, cards, "v1")
+    return context, cards
+
+
+def test_ordinals_follow_the_shown_order(session):
+    context, cards = session
+    assert resolve_reference(context, "cái thứ 2", "v1") is cards[1]
+    assert resolve_reference(context, "cái cuối cùng", "v1") is cards[-1]
+    assert resolve_reference(context, "cái thứ 5", "v1") is None
+
+
+def test_details_do_not_change_what_ordinals_refer_to(session, products):
+    context, cards = session
+    remember_products(context, [product_card(products[10])], "v1", shown=False)
+    assert resolve_reference(context, "cái đầu tiên", "v1") is cards[0]
+    assert resolve_reference(context, products[10]["id"], "v1")["id"] == products[10]["id"]
+
+
+def test_unique_name_among_recent_products(session):
+    context, cards = session
+    assert resolve_reference(context, "a56", "v1") is cards[3]
+    assert resolve_reference(context, "samsung galaxy", "v1") is None
+    # Both Pro Max variants were shown; storage or the full name tells them apart
+    assert resolve_reference(context, "ip 16 pm", "v1") is None
+    assert resolve_reference(context, "iPhone 16 Pro Max 512GB", "v1") is cards[2]
+    assert resolve_reference(context, cards[0]["name"], "v1") is cards[0]
+
+
+@pytest.mark.parametrize("reference", ["iPhone 16", "iphone", "iPhone 16 Pro", "Galaxy S25", "s25 ultra 512gb"])
+def test_other_models_are_left_to_the_catalog(products, reference):
+    context = SimpleNamespace(state={})
+    cards = [product_card(products[0]), product_card(products[17])]
+    remember_products(context, cards, "v1")
+    assert resolve_reference(context, reference, "v1") is None
+    assert resolve_reference(context, "iphone 16 promax", "v1") is cards[0]
+    assert resolve_reference(context, "s25 ultra", "v1") is cards[1]
+
+
+def test_new_catalog_version_refetches_shown_products(session, products):
+    context, cards = session
+    fetched = []
+
+    def lookup(product_id):
+        fetched.append(product_id)
+        return next(product for product in products if product["id"] == product_id)
+
+    card = resolve_reference(context, "cái thứ 2", "v2", lookup)
+    assert fetched == [cards[1]["id"]] and card == cards[1] and card is not cards[1]
+    assert resolve_reference(context, cards[0]["id"], "v2") is None
+
+
+def test_cache_evicts_the_oldest_cards(products, monkeypatch):
+    monkeypatch.setitem(WORKING_SET_CONFIG, "max_items", 5)
+    context = SimpleNamespace(state={})
+    for product in products:
+        remember_products(context, [product_card(product)], "v1")
+    cached = context.state[WORKING_SET_CONFIG["state_key"]]["cards"]
+    assert list(cached) == [product["id"] for product in products[-5:]]
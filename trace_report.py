@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Trace report for DDV Product Advisor
+Flame-style summary, latency percentiles and slowest turns from the JSONL spans
+written with DDV_TRACING=1 (see app/tracing.py)
+
+Usage: python trace_report.py [traces.jsonl] [num_slowest_turns]
+"""
+
+import json
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Dict, Any
+
+DEFAULT_TRACE_FILE = Path(__file__).parent / "logs" / "traces.jsonl"
+BAR_WIDTH = 30
+
+
+def load_spans(path: Path) -> List[Dict[str, Any]]:
+    """Spans from a JSONL file; lines cut off by a crash are skipped"""
+    spans = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)] if ordered else 0.0
+
+
+def label(span: Dict[str, Any]) -> str:
+    """Span name, split by backend for engine calls"""
+    backend = (span.get("attrs") or {}).get("backend")
+    return f"{span['name']}[{backend}]" if backend else span["name"]
+
+
+def span_paths(spans: List[Dict[str, Any]]) -> Dict[str, tuple]:
+    """span id -> path of labels from the root span; spans whose parent was not recorded become roots"""
+    by_id = {span["span"]: span for span in spans}
+    paths: Dict[str, tuple] = {}
+
+    def path_of(span):
+        if span["span"] not in paths:
+            parent = by_id.get(span.get("parent"))
+            paths[span["span"]] = (path_of(parent) if parent else ()) + (label(span),)
+        return paths[span["span"]]
+
+    for span in spans:
+        path_of(span)
+    return paths
+
+
+def print_flame(spans: List[Dict[str, Any]], paths: Dict[str, tuple]):
+    """Time per call path, as a share of all root time, with self time and percentiles"""
+    durations = defaultdict(list)
+    child_ms = defaultdict(float)
+    for span in spans:
+        durations[paths[span["span"]]].append(span["ms"])
+        if span.get("parent") in paths:
+            child_ms[paths[span["parent"]]] += span["ms"]
+
+    children = defaultdict(list)
+    for path in durations:
+        children[path[:-1]].append(path)
+
+    def walk(parent):
+        # Heaviest path first at every level
+        for path in sorted(children[parent], key=lambda p: -sum(durations[p])):
+            yield path
+            yield from walk(path)
+
+    root_ms = sum(sum(durations[path]) for path in children[()]) or 1.0
+    print(f"{'path':<48} {'n':>6} {'total s':>9} {'self s':>8} {'p50 ms':>8} {'p95 ms':>8}  share")
+    for path in walk(()):
+        values = durations[path]
+        total = sum(values)
+        share = total / root_ms
+        bar = "█" * max(1, round(share * BAR_WIDTH)) if share > 0 else ""
+        name = "  " * (len(path) - 1) + path[-1]
+        print(f"{name[:48]:<48} {len(values):>6} {total / 1000:>9.2f} {(total - child_ms[path]) / 1000:>8.2f} "
+              f"{percentile(values, 0.5):>8.1f} {percentile(values, 0.95):>8.1f}  {bar} {share:.0%}")
+
+
+def print_percentiles(spans: List[Dict[str, Any]]):
+    """Latency distribution per span label"""
+    durations = defaultdict(list)
+    for span in spans:
+        durations[label(span)].append(span["ms"])
+
+    print(f"{'span':<40} {'n':>6} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for name, values in sorted(durations.items(), key=lambda kv: -sum(kv[1])):
+        print(f"{name[:40]:<40} {len(values):>6} " + " ".join(
+            f"{percentile(values, q):>8.1f}" for q in (0.5, 0.9, 0.95, 0.99)
+        ) + f" {max(values):>8.1f}")
+
+    # Engine cache effectiveness
+    caches = defaultdict(int)
+    for span in spans:
+        cache = (span.get("attrs") or {}).get("cache")
+        if cache:
+            caches[cache] += 1
+    if caches:
+        print(f"\nLocal ranking cache: {caches['hit']} hits, {caches['miss']} misses")
+
+
+def print_slowest(spans: List[Dict[str, Any]], count: int):
+    """Timeline of the slowest turns"""
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span["trace"]].append(span)
+
+    turns = [span for span in spans if span["name"] == "agent.turn"]
+    for turn in sorted(turns, key=lambda s: -s["ms"])[:count]:
+        print(f"\nTurn {turn['trace']}: {turn['ms']:.0f}ms")
+        for span in sorted(by_trace[turn["trace"]], key=lambda s: s["start"]):
+            if span is turn:
+                continue
+            offset = (span["start"] - turn["start"]) * 1000
+            attrs = {k: v for k, v in (span.get("attrs") or {}).items() if k != "args"}
+            print(f"  +{offset:>7.0f}ms {span['ms']:>8.1f}ms  {label(span):<36} {json.dumps(attrs, ensure_ascii=False)}")
+
+
+def main():
+    """Print the report"""
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TRACE_FILE
+    slowest = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if not path.exists():
+        print(f"❌ Trace file not found: {path} (run the agent with DDV_TRACING=1)")
+        return
+
+    spans = load_spans(path)
+    if not spans:
+        print(f"❌ No spans in {path}")
+        return
+    traces = {span["trace"] for span in spans}
+    print(f"📊 {len(spans)} spans from {len(traces)} turns in {path}\n")
+
+    print_flame(spans, span_paths(spans))
+    print()
+    print_percentiles(spans)
+    print_slowest(spans, slowest)
+
+
+if __name__ == "__main__":
+    main()